@@ -27,6 +27,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'reservation.metrics.MetricsMiddleware',  # no-op unless METRICS_ENABLED
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -56,24 +57,45 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'MovieReservation.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Database: SQLite by default, PostgreSQL with DB_ENGINE=postgresql (needs psycopg).
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before reuse.
+# Under ASGI set DB_CONN_MAX_AGE=0 and pool with PgBouncer instead.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'movie_reservation'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', '5'))},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            # Seconds a writer waits for the lock before "database is locked"
+            'OPTIONS': {'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', '20'))},
+        }
     }
-}
 
-# For production, consider using a more robust database like PostgreSQL:
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql_psycopg2',
-#         'NAME': 'your_db_name',
-#         'USER': 'your_db_user',
-#         'PASSWORD': 'your_db_password',
-#         'HOST': 'localhost',
-#         'PORT': '',
-#     }
-# }
+# Applied to every new SQLite connection by reservation.db. WAL lets readers
+# run alongside the single writer, and synchronous=normal is safe with WAL.
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'normal'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', '20')) * 1000,
+}
 
 # Temporarily disabled for development - enable in production
 AUTH_PASSWORD_VALIDATORS = [
@@ -111,6 +133,82 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Minutes a theater stays blocked after each showing, for cleaning and seating
+SHOWTIME_CLEANING_BUFFER_MINUTES = int(os.environ.get('SHOWTIME_CLEANING_BUFFER_MINUTES', '0'))
+
+# Trending movies (/movies/trending/): bookings and ratings lose half their weight every
+# TRENDING_HALF_LIFE_HOURS and drop out after TRENDING_WINDOW_DAYS. A five-star rating
+# counts as TRENDING_RATING_WEIGHT booked seats. Run refresh_trending periodically.
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', '72'))
+TRENDING_WINDOW_DAYS = int(os.environ.get('TRENDING_WINDOW_DAYS', '14'))
+TRENDING_RATING_WEIGHT = float(os.environ.get('TRENDING_RATING_WEIGHT', '2'))
+
+# Showtimes with at most this share of their seats left are flagged almost_full
+SHOWTIME_ALMOST_FULL_RATIO = float(os.environ.get('SHOWTIME_ALMOST_FULL_RATIO', '0.1'))
+
+# How long a seat hold placed during checkout lasts before it expires
+SEAT_HOLD_TTL_SECONDS = int(os.environ.get('SEAT_HOLD_TTL_SECONDS', '300'))
+# Most seats one user may hold for a showtime at a time
+SEAT_HOLD_MAX_SEATS = int(os.environ.get('SEAT_HOLD_MAX_SEATS', '10'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Persistent TMDB response cache shared by every worker on the host
+    'tmdb': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('TMDB_CACHE_DIR', str(BASE_DIR / 'tmdb_cache')),
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+    # Serialized catalog responses (movies, theaters, showtimes). Local memory is per
+    # process, which is fine because entries are only found through the versions below.
+    'responses': {
+        'BACKEND': os.environ.get('RESPONSE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('RESPONSE_CACHE_LOCATION', 'responses'),
+        'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TTL', '600')),
+    },
+    # Invalidation versions of the response cache, shared by every worker on the host so
+    # that a write in one worker retires the cached responses of all. Use Redis across hosts.
+    'response_versions': {
+        'BACKEND': os.environ.get('RESPONSE_CACHE_VERSIONS_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('RESPONSE_CACHE_VERSIONS_LOCATION', str(BASE_DIR / 'response_versions')),
+        'TIMEOUT': None,
+    },
+}
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_VERSIONS_ALIAS = 'response_versions'
+# Bookings don't invalidate the cache; showtime and trending lists follow them within this many seconds
+RESPONSE_CACHE_BOOKING_TTL = int(os.environ.get('RESPONSE_CACHE_BOOKING_TTL', '10'))
+
+# Keeps the versions cache above out of the checkout during test runs
+TEST_RUNNER = 'reservation.test_runner.TestRunner'
+
+TMDB_API_KEY = os.environ.get('TMDB_API_KEY', 'c8a254596ddcb52c68b7d5ed82d49efa')
+TMDB_BASE_URL = os.environ.get('TMDB_BASE_URL', 'https://api.themoviedb.org/3')
+TMDB_TIMEOUT = (3.05, float(os.environ.get('TMDB_READ_TIMEOUT', '10')))  # (connect, read) seconds
+TMDB_CACHE_TTL = int(os.environ.get('TMDB_CACHE_TTL', str(24 * 60 * 60)))
+TMDB_GENRE_CACHE_TTL = int(os.environ.get('TMDB_GENRE_CACHE_TTL', str(7 * 24 * 60 * 60)))
+
+# Live seat updates (GET /showtimes/{id}/events/, needs the ASGI app).
+# Swap the broker for one backed by a shared pub/sub when running several processes.
+SEAT_EVENT_BROKER = os.environ.get('SEAT_EVENT_BROKER', 'reservation.events.InProcessBroker')
+SEAT_EVENTS_HEARTBEAT_SECONDS = int(os.environ.get('SEAT_EVENTS_HEARTBEAT_SECONDS', '15'))
+SEAT_EVENTS_QUEUE_SIZE = int(os.environ.get('SEAT_EVENTS_QUEUE_SIZE', '256'))
+
+# Number of rendered ticket QR codes kept in memory per process
+QR_CODE_CACHE_SIZE = int(os.environ.get('QR_CODE_CACHE_SIZE', '1024'))
+
+# Per-request timing (reservation.metrics): Server-Timing headers, GET /metrics for
+# Prometheus, and a warning on the reservation.slow_requests logger with the SQL of
+# requests slower than METRICS_SLOW_REQUEST_MS. Set METRICS_TOKEN to require
+# "Authorization: Bearer <token>" on /metrics.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'False') == 'True'
+METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', 'True') == 'True'
+METRICS_SLOW_REQUEST_MS = int(os.environ.get('METRICS_SLOW_REQUEST_MS', '500'))
+METRICS_SLOW_QUERY_MS = int(os.environ.get('METRICS_SLOW_QUERY_MS', '100'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 AUTHENTICATION_BACKENDS = (
     'django.contrib.auth.backends.ModelBackend',
     'rest_framework_simplejwt.authentication.JWTAuthentication',
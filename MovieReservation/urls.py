@@ -18,7 +18,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from reservation.views import is_admin_view, total_seats_booked_view, total_revenue_view
+from reservation.views import is_admin_view, total_seats_booked_view, total_revenue_view, sales_stats_view, response_cache_stats_view, metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -28,4 +28,7 @@ urlpatterns = [
     path('is_admin/', is_admin_view, name='is_admin'),
     path('total_seats_booked/', total_seats_booked_view, name='total_seats_booked'),
     path('total_revenue/', total_revenue_view, name='total_revenue'),
+    path('stats/', sales_stats_view, name='sales_stats'),
+    path('cache_stats/', response_cache_stats_view, name='response_cache_stats'),
+    path('metrics', metrics_view, name='metrics'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -413,9 +413,9 @@ const MovieDetails = () => {
 
           <Grid container spacing={3}>
             {showtimes.map((showtime, index) => {
-              const availableSeats = showtime.total_theater_seats - showtime.reserved_seat_count;
-              const isAlmostFull = availableSeats <= 10;
-              const isSoldOut = availableSeats <= 0;
+              const availableSeats = showtime.seats_available;
+              const isAlmostFull = showtime.availability === 'almost_full';
+              const isSoldOut = showtime.availability === 'sold_out';
               
               return (
                 <Grid item xs={12} sm={6} md={4} key={showtime.id}>
@@ -5,14 +5,20 @@ import { motion, AnimatePresence } from 'framer-motion';
 import { EventSeat, ArrowBack, Payment, ConfirmationNumber, AccessTime, LocationOn, AttachMoney, Person, CheckCircle } from '@mui/icons-material';
 import axios from 'axios';
 
+// Seat-map bitsets are base64, least significant bit first within each byte
+const decodeBitset = (encoded) => Uint8Array.from(atob(encoded), c => c.charCodeAt(0));
+const isBitSet = (bits, bit) => (bits[bit >> 3] & (1 << (bit & 7))) !== 0;
+
 const Reservation = () => {
   const { id } = useParams(); // showtime_id
   const navigate = useNavigate();
   const [showtime, setShowtime] = useState(null);
   const [theater, setTheater] = useState(null);
   const [allSeats, setAllSeats] = useState([]);
-  const [reservedSeatIds, setReservedSeatIds] = useState([]);
+  const [takenSeatIds, setTakenSeatIds] = useState([]);
+  const [heldSeatIds, setHeldSeatIds] = useState([]);
   const [selectedSeatIds, setSelectedSeatIds] = useState([]);
+  const [reloadCount, setReloadCount] = useState(0);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [openSnackbar, setOpenSnackbar] = useState(false);
@@ -21,10 +27,13 @@ const Reservation = () => {
 
   const steps = ['Select Seats', 'Review & Pay', 'Confirmation'];
 
+  // Seats held by other customers during checkout can't be picked either
+  const reservedSeatIds = [...takenSeatIds, ...heldSeatIds.filter(seatId => !selectedSeatIds.includes(seatId))];
+
   useEffect(() => {
     const fetchData = async () => {
       try {
-        setLoading(true);
+        if (reloadCount === 0) setLoading(true);
         const token = localStorage.getItem('token');
         const config = token ? {
           headers: {
@@ -32,25 +41,25 @@ const Reservation = () => {
           },
         } : {};
 
-        const showtimeResponse = await axios.get(`http://localhost:8000/showtimes/${id}/`);
-        const currentShowtime = showtimeResponse.data;
-        setShowtime(currentShowtime);
-
-        const theaterResponse = await axios.get(`http://localhost:8000/theaters/${currentShowtime.theater.id}/`);
-        const currentTheater = theaterResponse.data;
-        setTheater(currentTheater);
+        // One request returns the showtime summary, seat grid and availability
+        const { data: seatmap } = await axios.get(`http://localhost:8000/showtimes/${id}/seatmap/`, config);
+        setShowtime(seatmap.showtime);
+        setTheater({ ...seatmap.showtime.theater, rows: seatmap.rows, seats_per_row: seatmap.seats_per_row });
 
-        // Fetch all seats for the current theater
-        const allSeatsResponse = await axios.get(`http://localhost:8000/seats/?theater=${currentTheater.id}`);
-        setAllSeats(allSeatsResponse.data);
+        // Runs of [row_number, first_seat_number, first_seat_id, length]
+        const seats = [];
+        seatmap.seats.forEach(([row, firstSeat, firstId, length]) => {
+          for (let i = 0; i < length; i++) {
+            seats.push({ id: firstId + i, row_number: row, seat_number: firstSeat + i });
+          }
+        });
+        setAllSeats(seats);
 
-        try {
-          const reservedSeatsResponse = await axios.get(`http://localhost:8000/showtimes/${id}/reserved_seats/`, config);
-          setReservedSeatIds(reservedSeatsResponse.data);
-        } catch (err) {
-          console.warn('Could not fetch reserved seats:', err);
-          setReservedSeatIds([]);
-        }
+        const taken = decodeBitset(seatmap.taken);
+        const held = decodeBitset(seatmap.held);
+        const bitOf = seat => (seat.row_number - 1) * seatmap.seats_per_row + (seat.seat_number - 1);
+        setTakenSeatIds(seats.filter(seat => isBitSet(taken, bitOf(seat))).map(seat => seat.id));
+        setHeldSeatIds(seats.filter(seat => isBitSet(held, bitOf(seat))).map(seat => seat.id));
 
         setLoading(false);
       } catch (err) {
@@ -61,6 +70,37 @@ const Reservation = () => {
     };
 
     fetchData();
+  }, [id, reloadCount]);
+
+  useEffect(() => {
+    // Live seat changes from other customers, so the map never goes stale
+    const source = new EventSource(`http://localhost:8000/showtimes/${id}/events/`);
+    const add = seatIds => current => [...new Set([...current, ...seatIds])];
+    const remove = seatIds => current => current.filter(seatId => !seatIds.includes(seatId));
+    source.onmessage = (message) => {
+      const event = JSON.parse(message.data);
+      switch (event.type) {
+        case 'reserved':
+          setTakenSeatIds(add(event.seat_ids));
+          setSelectedSeatIds(remove(event.seat_ids));
+          break;
+        case 'released':
+          setTakenSeatIds(remove(event.seat_ids));
+          break;
+        case 'held':
+          setHeldSeatIds(add(event.seat_ids));
+          break;
+        case 'hold_released':
+          setHeldSeatIds(remove(event.seat_ids));
+          break;
+        case 'resync':
+          setReloadCount(count => count + 1);
+          break;
+        default:
+          break;
+      }
+    };
+    return () => source.close();
   }, [id]);
 
   const handleSeatClick = (seatId) => {
@@ -80,12 +120,35 @@ const Reservation = () => {
     }
   };
 
-  const handleConfirmClick = () => {
+  const handleConfirmClick = async () => {
     if (selectedSeatIds.length === 0) {
       setError('Please select at least one seat.');
       setOpenSnackbar(true);
       return;
     }
+    const token = localStorage.getItem('token');
+    if (!token) {
+      navigate('/login');
+      return;
+    }
+    try {
+      // Hold the seats while the user reviews and pays
+      await axios.post(`http://localhost:8000/showtimes/${id}/holds/`, {
+        seat_ids: selectedSeatIds,
+      }, {
+        headers: {
+          'Authorization': `JWT ${token}`,
+        },
+      });
+    } catch (err) {
+      if (err.response && err.response.data && err.response.data.detail) {
+        setError(err.response.data.detail);
+      } else {
+        setError('Could not hold the selected seats. Please try again.');
+      }
+      setOpenSnackbar(true);
+      return;
+    }
     setError(''); // Clear any previous errors
     setConfirmDialog(true);
     setCurrentStep(1); // Move to review step
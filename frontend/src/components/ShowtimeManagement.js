@@ -25,6 +25,16 @@ const ShowtimeManagement = () => {
     price: '',
   });
   const [error, setError] = useState('');
+  const [openGenerate, setOpenGenerate] = useState(false);
+  const [template, setTemplate] = useState({
+    movies: [],
+    theaters: [],
+    start_date: '',
+    days: 7,
+    slot_times: '10:00,13:30,17:00,20:30',
+    price: '10.00',
+  });
+  const [generateReport, setGenerateReport] = useState(null);
   const navigate = useNavigate();
 
   useEffect(() => {
@@ -160,7 +170,46 @@ const ShowtimeManagement = () => {
       handleCloseDialog();
     } catch (err) {
       console.error('Error saving showtime:', err);
-      setError('Failed to save showtime. Please check your input.');
+      if (err.response && err.response.data && err.response.data.detail) {
+        setError(err.response.data.detail); // e.g. a scheduling conflict
+      } else {
+        setError('Failed to save showtime. Please check your input.');
+      }
+    }
+  };
+
+  const handleTemplateChange = (e) => {
+    const { name, value } = e.target;
+    setTemplate({ ...template, [name]: value });
+  };
+
+  // Plans a whole schedule server-side; dryRun only reports the slots
+  const handleGenerate = async (dryRun) => {
+    setError('');
+    const token = localStorage.getItem('token');
+    if (!token) {
+      navigate('/login');
+      return;
+    }
+    const config = {
+      headers: {
+        'Authorization': `JWT ${token}`,
+      },
+    };
+    try {
+      const payload = {
+        ...template,
+        slot_times: template.slot_times.split(',').map((slot) => slot.trim()).filter(Boolean),
+        dry_run: dryRun,
+      };
+      const response = await axios.post('http://localhost:8000/showtimes/bulk/', payload, config);
+      setGenerateReport(response.data);
+      if (!dryRun) {
+        fetchShowtimes(token);
+      }
+    } catch (err) {
+      console.error('Error generating schedule:', err);
+      setError('Failed to generate schedule. Please check the template.');
     }
   };
 
@@ -196,6 +245,7 @@ const ShowtimeManagement = () => {
           </Typography>
         </Box>
         <Box sx={{ display: 'flex', justifyContent: 'flex-end', mb: 2 }}>
+          <Button variant="outlined" sx={{ mr: 1 }} onClick={() => { setGenerateReport(null); setOpenGenerate(true); }}>Generate Schedule</Button>
           <Button variant="contained" startIcon={<AddIcon />} onClick={() => handleOpenDialog()}>Add New Showtime</Button>
         </Box>
 
@@ -305,6 +355,101 @@ const ShowtimeManagement = () => {
             <Button onClick={handleSubmit}>{currentShowtime ? 'Update' : 'Add'}</Button>
           </DialogActions>
         </Dialog>
+
+        <Dialog open={openGenerate} onClose={() => setOpenGenerate(false)} fullWidth>
+          <DialogTitle>Generate Schedule</DialogTitle>
+          <DialogContent>
+            <FormControl fullWidth margin="dense">
+              <InputLabel id="template-movies-label">Movies</InputLabel>
+              <Select
+                labelId="template-movies-label"
+                name="movies"
+                multiple
+                value={template.movies}
+                label="Movies"
+                onChange={handleTemplateChange}
+              >
+                {movies.map((movie) => (
+                  <MenuItem key={movie.id} value={movie.id}>
+                    {movie.title}
+                  </MenuItem>
+                ))}
+              </Select>
+            </FormControl>
+            <FormControl fullWidth margin="dense">
+              <InputLabel id="template-theaters-label">Theaters</InputLabel>
+              <Select
+                labelId="template-theaters-label"
+                name="theaters"
+                multiple
+                value={template.theaters}
+                label="Theaters"
+                onChange={handleTemplateChange}
+              >
+                {theaters.map((theater) => (
+                  <MenuItem key={theater.id} value={theater.id}>
+                    {theater.name}
+                  </MenuItem>
+                ))}
+              </Select>
+            </FormControl>
+            <TextField
+              margin="dense"
+              name="start_date"
+              label="First Day"
+              type="date"
+              fullWidth
+              variant="standard"
+              value={template.start_date}
+              onChange={handleTemplateChange}
+              InputLabelProps={{
+                shrink: true,
+              }}
+            />
+            <TextField
+              margin="dense"
+              name="days"
+              label="Days"
+              type="number"
+              fullWidth
+              variant="standard"
+              value={template.days}
+              onChange={handleTemplateChange}
+            />
+            <TextField
+              margin="dense"
+              name="slot_times"
+              label="Daily Start Times"
+              fullWidth
+              variant="standard"
+              value={template.slot_times}
+              onChange={handleTemplateChange}
+            />
+            <TextField
+              margin="dense"
+              name="price"
+              label="Price"
+              type="number"
+              fullWidth
+              variant="standard"
+              value={template.price}
+              onChange={handleTemplateChange}
+              inputProps={{
+                step: "0.01",
+              }}
+            />
+            {generateReport && (
+              <Typography sx={{ mt: 2 }}>
+                {generateReport.created ? `Created ${generateReport.created}` : `Would create ${generateReport.planned}`} showtimes; skipped {generateReport.skipped} slots.
+              </Typography>
+            )}
+          </DialogContent>
+          <DialogActions>
+            <Button onClick={() => setOpenGenerate(false)}>Close</Button>
+            <Button onClick={() => handleGenerate(true)}>Preview</Button>
+            <Button onClick={() => handleGenerate(false)}>Generate</Button>
+          </DialogActions>
+        </Dialog>
       </Paper>
     </Container>
   );
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Container, Typography, Paper, Box, Grid, Card, CardContent, CardMedia, Chip, Button, Skeleton, Dialog, DialogTitle, DialogContent, IconButton, Tooltip } from '@mui/material';
-import { AccessTime, LocationOn, EventSeat, ConfirmationNumber, Movie, CalendarToday, QrCode, Close, GetApp } from '@mui/icons-material';
+import { AccessTime, LocationOn, EventSeat, ConfirmationNumber, Movie, CalendarToday, QrCode, Close, GetApp, Cancel } from '@mui/icons-material';
 import { motion } from 'framer-motion';
 import { Link } from 'react-router-dom';
 import axios from 'axios';
@@ -39,6 +39,22 @@ const UserReservations = () => {
     fetchReservations();
   }, []);
 
+  const handleCancel = async (reservation) => {
+    if (!window.confirm(`Cancel your booking for ${reservation.showtime.movie.title}?`)) {
+      return;
+    }
+    try {
+      const token = localStorage.getItem('token');
+      const response = await axios.post(`http://localhost:8000/reservations/${reservation.id}/cancel/`, {}, {
+        headers: { 'Authorization': `JWT ${token}` },
+      });
+      setReservations((current) => current.map((item) => (item.id === reservation.id ? response.data : item)));
+    } catch (err) {
+      console.error('Error cancelling reservation:', err);
+      setError(err.response?.data?.detail || 'Failed to cancel the reservation. Please try again.');
+    }
+  };
+
   if (loading) {
     return (
       <Container maxWidth="lg" sx={{ mt: 4, mb: 4 }}>
@@ -137,9 +153,9 @@ const UserReservations = () => {
                           {reservation.showtime.movie.title}
                         </Typography>
                         <Chip 
-                          label={isPastBooking ? "Past Booking" : "Upcoming"}
+                          label={reservation.is_cancelled ? "Cancelled" : isPastBooking ? "Past Booking" : "Upcoming"}
                           size="small"
-                          color={isPastBooking ? "error" : "success"}
+                          color={reservation.is_cancelled ? "default" : isPastBooking ? "error" : "success"}
                           sx={{ mb: 2 }}
                         />
 
@@ -187,7 +203,19 @@ const UserReservations = () => {
                             Movie Details
                           </Button>
                           
-                          {reservation.qr_code_url && (
+                          {!reservation.is_cancelled && !isPastBooking && (
+                            <Button
+                              variant="outlined"
+                              size="small"
+                              color="error"
+                              startIcon={<Cancel />}
+                              onClick={() => handleCancel(reservation)}
+                            >
+                              Cancel
+                            </Button>
+                          )}
+
+                          {reservation.qr_code_url && !reservation.is_cancelled && (
                             <Button 
                               variant="outlined" 
                               size="small" 
@@ -1,8 +1,10 @@
 from django.contrib import admin
-from .models import Movie, Showtime, Reservation, Theater, Seat
+from .models import Movie, Showtime, Reservation, Theater, Seat, DailySales, Ticket
 
 admin.site.register(Movie)
 admin.site.register(Showtime)
 admin.site.register(Reservation)
 admin.site.register(Theater)
 admin.site.register(Seat)
+admin.site.register(DailySales)
+admin.site.register(Ticket)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ReservationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reservation'
+
+    def ready(self):
+        from . import db, response_cache
+        db.connect_signals()
+        response_cache.connect_signals()
@@ -0,0 +1,658 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, time as datetime_time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.db import OperationalError, connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .booking import BookingError, reserve_seats
+from . import response_cache
+from .catalog_import import CatalogImport
+from .provisioning import provision_seats, provision_theaters, resize_theater
+from .models import Movie, Theater, Seat, Showtime, Reservation, Ticket
+from .occupancy import SeatBitmap
+from .qrcodes import render_qr
+from .seed import seed_database
+from .scheduling import ScheduleConflict, check_showtime, create_schedule, plan_schedule, validate_schedule
+from .tmdb import TMDBClient
+from .tmdb_fake import FakeTMDBServer
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Register a benchmark function under the given name"""
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+@contextmanager
+def benchmark_database():
+    """Run the block against a throwaway, fully migrated database.
+
+    SQLite databases are created as files rather than in memory so that
+    worker threads get their own connections and real file locking. A
+    file-based response cache versions store moves to a temporary
+    directory too.
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    tmpdir = None
+    if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+        tmpdir = tempfile.mkdtemp()
+        test_settings['NAME'] = os.path.join(tmpdir, 'benchmark.sqlite3')
+    old_name = connection.settings_dict['NAME']
+    media_root = tempfile.mkdtemp()
+    caches = dict(settings.CACHES)
+    if caches['response_versions']['BACKEND'].endswith('FileBasedCache'):
+        caches['response_versions'] = {**caches['response_versions'], 'LOCATION': os.path.join(media_root, 'response_versions')}
+    try:
+        with override_settings(MEDIA_ROOT=media_root, CACHES=caches):
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                yield
+            finally:
+                connections.close_all()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+        if tmpdir:
+            test_settings['NAME'] = None
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def create_hall(name, rows, seats_per_row):
+    theater = Theater.objects.create(name=name, address='Benchmark', rows=rows, seats_per_row=seats_per_row)
+    Seat.objects.bulk_create([
+        Seat(theater=theater, row_number=row, seat_number=number)
+        for row in range(1, rows + 1)
+        for number in range(1, seats_per_row + 1)
+    ])
+    return theater
+
+
+def run_concurrently(workers, tasks):
+    """Run callables on a pool of worker threads, each with its own DB connection"""
+    start = threading.Barrier(workers)
+
+    def worker(chunk):
+        start.wait()
+        try:
+            return [task() for task in chunk]
+        finally:
+            connection.close()
+
+    chunks = [tasks[index::workers] for index in range(workers)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        began = time.perf_counter()
+        results = [result for chunk in pool.map(worker, chunks) for result in chunk]
+        elapsed = time.perf_counter() - began
+    return results, elapsed
+
+
+@scenario('booking_contention')
+def booking_contention(stdout, workers=(1, 2, 4, 8), attempts=200, **options):
+    """Fire concurrent bookings at the same seats and check there is exactly one winner per round"""
+    movie = Movie.objects.create(title='Contention', description='', duration=120)
+    theater = create_hall('Contention Hall', 10, 15)
+    seat_ids = list(Seat.objects.filter(theater=theater).values_list('id', flat=True)[:2])
+    users = [User.objects.create_user(username=f'bench{index}') for index in range(max(workers))]
+
+    results = []
+    for worker_count in workers:
+        showtime = Showtime.objects.create(
+            movie=movie, theater=theater, show_time=timezone.now() + timedelta(days=1),
+        )
+
+        def attempt(user):
+            def book():
+                try:
+                    reserve_seats(user, showtime, seat_ids)
+                    return True
+                except BookingError:
+                    return False
+            return book
+
+        tasks = [attempt(users[index % worker_count]) for index in range(attempts)]
+        outcomes, elapsed = run_concurrently(worker_count, tasks)
+        winners = sum(outcomes)
+        stored = Reservation.objects.filter(showtime=showtime).count()
+        results.append({
+            'workers': worker_count,
+            'attempts': attempts,
+            'winners': winners,
+            'reservations': stored,
+            'elapsed_s': round(elapsed, 4),
+            'attempts_per_s': round(attempts / elapsed, 1),
+        })
+        stdout.write(
+            f'workers={worker_count:<3} attempts={attempts} winners={winners} '
+            f'reservations={stored} {attempts / elapsed:.1f} attempts/s'
+        )
+        if winners != 1 or stored != 1:
+            raise AssertionError(f'Expected exactly one winner with {worker_count} workers, got {winners}.')
+    return results
+
+
+
+@scenario('booking_load')
+def booking_load(stdout, workers=(1, 2, 4, 8), attempts=200, showtimes=8, **options):
+    """Concurrent bookings of free seats spread over several showtimes, reporting throughput and lock errors.
+
+    On SQLite every round runs with the rollback journal and with WAL;
+    on PostgreSQL (DB_ENGINE=postgresql) with the configured server.
+    """
+    movie = Movie.objects.create(title='Load', description='', duration=120)
+    theater = create_hall('Load Hall', 20, 25)
+    seat_ids = list(Seat.objects.filter(theater=theater).values_list('id', flat=True))
+    users = [User.objects.create_user(username=f'load{index}') for index in range(max(workers))]
+    modes = ('delete', 'wal') if connection.vendor == 'sqlite' else (connection.vendor,)
+
+    results = []
+    for mode in modes:
+        pragmas = {**getattr(settings, 'SQLITE_PRAGMAS', {}), 'journal_mode': mode}
+        for worker_count in workers:
+            # journal_mode can only change while no other connection is open
+            connections.close_all()
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                shows = [
+                    Showtime.objects.create(movie=movie, theater=theater, show_time=timezone.now() + timedelta(days=1, hours=3 * index))
+                    for index in range(showtimes)
+                ]
+
+                def attempt(index, user):
+                    # Every task gets its own pair of seats, so only lock errors can fail it
+                    showtime = shows[index % showtimes]
+                    first = (index // showtimes) * 2 % len(seat_ids)
+                    pair = seat_ids[first:first + 2]
+
+                    def book():
+                        began = time.perf_counter()
+                        try:
+                            reserve_seats(user, showtime, pair)
+                            error = None
+                        except (BookingError, OperationalError) as e:
+                            error = type(e).__name__
+                        return time.perf_counter() - began, error
+                    return book
+
+                tasks = [attempt(index, users[index % worker_count]) for index in range(attempts)]
+                outcomes, elapsed = run_concurrently(worker_count, tasks)
+            durations = [duration for duration, error in outcomes if error is None]
+            errors = len(outcomes) - len(durations)
+            summary = {
+                'mode': mode, 'workers': worker_count, 'bookings': len(durations), 'errors': errors,
+                'bookings_per_s': round(len(durations) / elapsed, 1), **latency_summary(durations or [0]),
+            }
+            results.append(summary)
+            stdout.write(
+                f"{mode:<10} workers={worker_count:<3} bookings={len(durations)} errors={errors} "
+                f"{summary['bookings_per_s']} bookings/s p95={summary['p95_ms']}ms"
+            )
+    connections.close_all()
+    return results
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(durations):
+    """Mean and percentiles of a list of durations in seconds, reported in milliseconds"""
+    return {
+        'mean_ms': round(sum(durations) / len(durations) * 1000, 3),
+        'p50_ms': round(percentile(durations, 50) * 1000, 3),
+        'p95_ms': round(percentile(durations, 95) * 1000, 3),
+        'p99_ms': round(percentile(durations, 99) * 1000, 3),
+    }
+
+
+@scenario('qr_codes')
+def qr_codes(stdout, attempts=200, **options):
+    """Render ticket QR codes cold and from the LRU cache"""
+    references = [f'BENCH{index:04d}' for index in range(attempts)]
+    render_qr.cache_clear()
+
+    results = []
+    for label in ('cold', 'cached'):
+        durations = []
+        for reference in references:
+            began = time.perf_counter()
+            render_qr(reference)
+            durations.append(time.perf_counter() - began)
+        summary = {'mode': label, 'renders': len(durations), **latency_summary(durations)}
+        results.append(summary)
+        stdout.write(
+            f"{label:<7} renders={len(durations)} mean={summary['mean_ms']}ms "
+            f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms"
+        )
+    return results
+
+
+@scenario('booking_latency')
+def booking_latency(stdout, attempts=200, **options):
+    """Compare booking latency with the QR code rendered inline versus on demand"""
+    seats_per_row = 20
+    movie = Movie.objects.create(title='Latency', description='', duration=120)
+    theater = create_hall('Latency Hall', -(-attempts // seats_per_row), seats_per_row)
+    seat_ids = list(Seat.objects.filter(theater=theater).values_list('id', flat=True)[:attempts])
+    user = User.objects.create_user(username='latency')
+    render_qr.cache_clear()
+
+    def inline(showtime, seat_id):
+        reservation = reserve_seats(user, showtime, [seat_id])
+        render_qr(reservation.booking_reference)
+
+    def on_demand(showtime, seat_id):
+        # The QR endpoint renders the code when the ticket is first shown
+        reserve_seats(user, showtime, [seat_id])
+
+    results = []
+    for label, book in (('inline_qr', inline), ('on_demand_qr', on_demand)):
+        showtime = Showtime.objects.create(movie=movie, theater=theater, show_time=timezone.now() + timedelta(days=1))
+        durations = []
+        for seat_id in seat_ids:
+            began = time.perf_counter()
+            book(showtime, seat_id)
+            durations.append(time.perf_counter() - began)
+        summary = {'mode': label, 'bookings': len(durations), **latency_summary(durations)}
+        results.append(summary)
+        stdout.write(
+            f"{label:<13} bookings={len(durations)} mean={summary['mean_ms']}ms "
+            f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms"
+        )
+    return results
+
+
+@scenario('tmdb_import')
+def tmdb_import(stdout, workers=(1, 2, 4, 8), attempts=200, latency=0.01, **options):
+    """Import `attempts` movies from a local fake TMDB with simulated latency"""
+    caches = {
+        **settings.CACHES,
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'tmdb': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tmdb-benchmark'},
+    }
+    results = []
+    with override_settings(CACHES=caches), FakeTMDBServer(movies=attempts, latency=latency) as server:
+        for worker_count in workers:
+            client = TMDBClient(base_url=server.url, pool_size=worker_count)
+            client.cache.clear()
+            stats = CatalogImport(client, workers=worker_count, rate=0).run(pages=0)
+            results.append({'workers': worker_count, **stats})
+            stdout.write(
+                f"workers={worker_count:<3} created={stats['created']} updated={stats['updated']} "
+                f"elapsed={stats['elapsed_s']}s {stats['rows_per_s']} rows/s"
+            )
+            if stats['created'] + stats['updated'] != attempts:
+                raise AssertionError(f"Imported {stats['created'] + stats['updated']} of {attempts} movies.")
+    if Movie.objects.count() != attempts:
+        raise AssertionError('Re-importing created duplicate movies.')
+    return results
+
+
+@scenario('theater_provisioning')
+def theater_provisioning(stdout, screens=100, rows=20, seats_per_row=20, **options):
+    """Provision a multiplex of `screens` halls, then resize every hall"""
+    results = []
+
+    def measure(label, func):
+        with CaptureQueriesContext(connection) as queries:
+            began = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - began
+        seats = Seat.objects.count()
+        results.append({'step': label, 'elapsed_s': round(elapsed, 4), 'queries': len(queries), 'seats': seats})
+        stdout.write(f'{label:<22} {elapsed * 1000:9.1f}ms queries={len(queries):<6} seats={seats}')
+
+    # The old per-seat get_or_create loop, on a single hall for comparison
+    legacy = Theater.objects.create(name='Legacy', address='Benchmark', rows=rows, seats_per_row=seats_per_row)
+
+    def get_or_create_one_hall():
+        for row in range(1, rows + 1):
+            for number in range(1, seats_per_row + 1):
+                Seat.objects.get_or_create(theater=legacy, row_number=row, seat_number=number)
+
+    measure('get_or_create 1 hall', get_or_create_one_hall)
+    legacy.delete()
+
+    specs = [(f'Screen {index + 1}', rows, seats_per_row) for index in range(screens)]
+    theaters = []
+    measure(f'provision {screens} halls', lambda: theaters.extend(provision_theaters(specs, address='Benchmark')))
+    measure('shrink every hall', lambda: [resize_theater(theater, rows - 2, seats_per_row) for theater in theaters])
+    measure('grow every hall', lambda: [resize_theater(theater, rows, seats_per_row + 2) for theater in theaters])
+    measure('re-provision (no-op)', lambda: [provision_seats(theater) for theater in theaters])
+
+    expected = screens * rows * (seats_per_row + 2)
+    if Seat.objects.count() != expected:
+        raise AssertionError(f'Expected {expected} seats, found {Seat.objects.count()}.')
+    return results
+
+
+@scenario('schedule_validation')
+def schedule_validation(stdout, attempts=500, theaters=10, **options):
+    """Validate `attempts` proposed showtimes one query at a time and with one sort-and-sweep pass"""
+    movie = Movie.objects.create(title='Scheduling', description='', duration=110)
+    halls = [Theater.objects.create(name=f'Schedule {index}', address='Benchmark', rows=1, seats_per_row=1) for index in range(theaters)]
+    day = timezone.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    # A week of existing showtimes every three hours in each hall
+    Showtime.objects.bulk_create([
+        Showtime(movie=movie, theater=hall, show_time=day + timedelta(hours=3 * slot), end_time=day + timedelta(hours=3 * slot, minutes=110))
+        for hall in halls for slot in range(56)
+    ])
+    # Proposals every 100 minutes: some fit between existing showtimes, some clash with them or each other
+    slots = [
+        {'theater_id': halls[index % theaters].pk, 'movie': movie, 'show_time': day + timedelta(minutes=100 * (index // theaters) + 115)}
+        for index in range(attempts)
+    ]
+
+    results = []
+    began = time.perf_counter()
+    clashing = set()
+    for index, slot in enumerate(slots):
+        try:
+            check_showtime(slot['theater_id'], movie, slot['show_time'])
+        except ScheduleConflict:
+            clashing.add(index)
+    per_slot = time.perf_counter() - began
+
+    began = time.perf_counter()
+    swept = validate_schedule(slots)
+    sweep = time.perf_counter() - began
+    flagged = {result['index'] for result in swept if result['conflict']}
+
+    for label, elapsed in (('per-slot queries', per_slot), ('sort-and-sweep', sweep)):
+        results.append({'mode': label, 'slots': attempts, 'elapsed_s': round(elapsed, 4)})
+        stdout.write(f'{label:<17} slots={attempts} {elapsed * 1000:.1f}ms')
+    # The sweep also catches proposals that clash with each other
+    if not clashing <= flagged:
+        raise AssertionError(f'Sweep missed {len(clashing - flagged)} clashes with existing showtimes.')
+    return results
+
+
+@scenario('schedule_generation')
+def schedule_generation(stdout, screens=20, days=7, **options):
+    """Schedule `days` days of four daily slots on `screens` screens, one showtime at a time and in bulk"""
+    movies = [Movie.objects.create(title=f'Feature {index}', description='', duration=95 + 10 * index) for index in range(6)]
+    slot_times = [datetime_time(10), datetime_time(13, 30), datetime_time(17), datetime_time(20, 30)]
+    start_date = timezone.localdate() + timedelta(days=1)
+    tz = timezone.get_current_timezone()
+    results = []
+
+    def measure(label, func):
+        halls = [Theater.objects.create(name=f'{label} {index}', address='Benchmark', rows=1, seats_per_row=1) for index in range(screens)]
+        with CaptureQueriesContext(connection) as queries:
+            began = time.perf_counter()
+            created = func(halls)
+            elapsed = time.perf_counter() - began
+        results.append({'mode': label, 'showtimes': created, 'elapsed_s': round(elapsed, 4), 'queries': len(queries)})
+        stdout.write(f'{label:<10} showtimes={created:<5} {elapsed * 1000:9.1f}ms queries={len(queries)}')
+        return created
+
+    def one_at_a_time(halls):
+        # What the showtime form does: check, then insert, once per slot
+        created = 0
+        for hall_index, hall in enumerate(halls):
+            for day_index in range(days):
+                for slot_index, slot_time in enumerate(slot_times):
+                    movie = movies[(hall_index + day_index + slot_index) % len(movies)]
+                    show_time = timezone.make_aware(datetime.combine(start_date + timedelta(days=day_index), slot_time), tz)
+                    try:
+                        check_showtime(hall.pk, movie, show_time)
+                    except ScheduleConflict:
+                        continue
+                    Showtime.objects.create(movie=movie, theater=hall, show_time=show_time)
+                    created += 1
+        return created
+
+    def bulk(halls):
+        plan = plan_schedule(movies, halls, start_date, days, slot_times, Decimal('10.00'))
+        return len(create_schedule(plan))
+
+    expected = screens * days * len(slot_times)
+    for label, func in (('per-slot', one_at_a_time), ('bulk', bulk)):
+        created = measure(label, func)
+        if created != expected:
+            raise AssertionError(f'{label} created {created} of {expected} showtimes.')
+    return results
+
+
+@scenario('response_cache')
+def response_cache_scenario(stdout, attempts=200, **options):
+    """Request the catalog endpoints `attempts` times in total, uncached and through the response cache"""
+    hall = Theater.objects.create(name='Cache', address='Benchmark', rows=1, seats_per_row=1)
+    movies = Movie.objects.bulk_create([Movie(title=f'Catalog {index}', description='x' * 500, duration=100) for index in range(200)])
+    day = timezone.now() + timedelta(days=1)
+    Showtime.objects.bulk_create([
+        Showtime(movie=movie, theater=hall, show_time=day + timedelta(hours=2 * index), end_time=day + timedelta(hours=2 * index, minutes=100),
+                 seat_occupancy=SeatBitmap(1, 1).to_bytes())
+        for index, movie in enumerate(movies)
+    ])
+    urls = ['/movies/', '/theaters/', '/showtimes/', f'/showtimes/?movie_id={movies[0].pk}']
+    client = Client(SERVER_NAME='localhost')  # passes ALLOWED_HOSTS
+    results = []
+    for label, backend in (('uncached', 'django.core.cache.backends.dummy.DummyCache'), ('cached', 'django.core.cache.backends.locmem.LocMemCache')):
+        caches_setting = {
+            **settings.CACHES,
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'responses': {'BACKEND': backend, 'LOCATION': 'benchmark-responses'},
+        }
+        with override_settings(CACHES=caches_setting):
+            response_cache.stats.reset()
+            began = time.perf_counter()
+            for _ in range(max(1, attempts // len(urls))):
+                for url in urls:
+                    if client.get(url).status_code != 200:
+                        raise AssertionError(f'{url} failed.')
+            elapsed = time.perf_counter() - began
+            hit_rate = response_cache.stats.snapshot()['hit_rate'] or 0
+        requests = max(1, attempts // len(urls)) * len(urls)
+        results.append({'mode': label, 'requests': requests, 'elapsed_s': round(elapsed, 4), 'hit_rate': hit_rate})
+        stdout.write(f'{label:<9} requests={requests} {requests / elapsed:8.0f} req/s hit_rate={hit_rate:.2%}')
+    return results
+
+
+@scenario('api')
+def api(stdout, attempts=200, scale=0.01, **options):
+    """Drive the main endpoints through the full request stack against a seeded database.
+
+    scale=1 seeds 10k movies, 1k theaters and 1M reservations; the default
+    of 0.01 keeps a run under a minute. Each endpoint gets `attempts`
+    sequential requests, timed and with their queries counted.
+    """
+    seeded = seed_database(
+        movies=max(20, int(10000 * scale)), theaters=max(2, int(1000 * scale)),
+        reservations=int(1000000 * scale), users=max(10, int(1000 * scale)), ratings=int(100000 * scale),
+    )
+    stdout.write(' '.join(f'{key}={value}' for key, value in seeded.items()))
+
+    rng = random.Random(0)
+    admin = User.objects.create_user(username='bench-admin', is_staff=True)
+    users = list(User.objects.filter(username__startswith='seed'))
+    movie_ids = list(Movie.objects.values_list('id', flat=True))
+    showtime_ids = list(Showtime.objects.values_list('id', flat=True))
+    # Bookings go to fresh showtimes so every request gets a free seat
+    hall = Theater.objects.order_by('id').first()
+    seat_ids = list(Seat.objects.filter(theater=hall).values_list('id', flat=True))
+    later = timezone.now() + timedelta(days=365)
+    fresh = [
+        Showtime.objects.create(movie_id=movie_ids[0], theater=hall, show_time=later + timedelta(hours=3 * index))
+        for index in range(-(-attempts // len(seat_ids)))
+    ]
+    client = APIClient(SERVER_NAME='localhost')  # passes ALLOWED_HOSTS
+    # Logging out writes a session, so anonymous requests get a client of their own
+    visitor = APIClient(SERVER_NAME='localhost')
+
+    def booking(index):
+        client.force_authenticate(users[index % len(users)])
+        return client.post('/reservations/', {
+            'showtime_pk': fresh[index // len(seat_ids)].pk, 'seat_ids': [seat_ids[index % len(seat_ids)]],
+        }, format='json')
+
+    def rating_upsert(index):
+        user = rng.choice(users)
+        client.force_authenticate(user)
+        return client.post('/ratings/', {'movie': rng.choice(movie_ids), 'user': user.pk, 'rating': rng.randint(1, 5)}, format='json')
+
+    def admin_stats(index):
+        client.force_authenticate(admin)
+        return client.get('/stats/', {'group_by': 'movie'})
+
+    def anonymous(path, params=None):
+        def request(index):
+            return visitor.get(path(index) if callable(path) else path, params)
+        return request
+
+    endpoints = [
+        ('booking', booking),
+        ('seatmap', anonymous(lambda index: f'/showtimes/{rng.choice(showtime_ids)}/seatmap/')),
+        ('catalog', anonymous('/movies/', {'page_size': 50})),
+        ('showtimes_for_movie', anonymous(lambda index: f'/showtimes/?movie_id={rng.choice(movie_ids)}')),
+        ('admin_stats', admin_stats),
+        ('rating_upsert', rating_upsert),
+    ]
+
+    # Resolves no URL and runs no view, so its speed tracks the machine rather than the code
+    began = time.perf_counter()
+    for index in range(attempts):
+        visitor.get('/benchmark-reference/')
+    reference_per_s = attempts / (time.perf_counter() - began)
+
+    results = []
+    for name, send in endpoints:
+        durations, queries = [], 0
+        for index in range(attempts):
+            # The query log is capped, so empty it to keep the counts exact
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as captured:
+                began = time.perf_counter()
+                response = send(index)
+                durations.append(time.perf_counter() - began)
+            queries += len(captured)
+            if response.status_code not in (200, 201):
+                raise AssertionError(f'{name} returned {response.status_code}: {response.content[:200]!r}')
+        summary = {
+            'endpoint': name, 'requests': attempts,
+            'requests_per_s': round(attempts / sum(durations), 1),
+            'relative_speed': round(attempts / sum(durations) / reference_per_s, 4),
+            'queries_per_request': round(queries / attempts, 2),
+            **latency_summary(durations),
+        }
+        results.append(summary)
+        stdout.write(
+            f"{name:<20} {summary['requests_per_s']:>8} req/s relative={summary['relative_speed']:<7} queries/req={summary['queries_per_request']:<6} "
+            f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms"
+        )
+    return results
+
+
+@scenario('tickets')
+def tickets(stdout, attempts=200, scale=0.01, **options):
+    """Time seat availability and conflict checks on the ticket table against the old join through Reservation.
+
+    Seeds like the api scenario; scale=1 gives about 2M tickets and 0.5
+    about 1M. Each query runs for `attempts` random showtimes, and its
+    query plan is printed next to the timings.
+    """
+    seeded = seed_database(
+        movies=max(20, int(10000 * scale)), theaters=max(2, int(1000 * scale)),
+        reservations=int(1000000 * scale), users=max(10, int(1000 * scale)), ratings=0,
+    )
+    stdout.write(' '.join(f'{key}={value}' for key, value in seeded.items()))
+
+    rng = random.Random(0)
+    showtimes = list(Showtime.objects.values_list('id', 'theater_id'))
+    seats_by_hall = {}
+    for theater_id, seat_id in Seat.objects.order_by().values_list('theater_id', 'id'):
+        seats_by_hall.setdefault(theater_id, []).append(seat_id)
+    # Each attempt asks about a random showtime and a party of four of its hall's seats
+    picks = []
+    for _ in range(attempts):
+        showtime_id, theater_id = rng.choice(showtimes)
+        picks.append((showtime_id, rng.sample(seats_by_hall[theater_id], 4)))
+    active = Ticket.Status.ACTIVE
+
+    queries = [
+        ('availability', 'tickets', lambda showtime_id, seat_ids: Ticket.objects.filter(
+            showtime_id=showtime_id, status=active).values_list('seat_id')),
+        ('availability', 'via reservation', lambda showtime_id, seat_ids: Ticket.objects.filter(
+            reservation__showtime_id=showtime_id, reservation__is_cancelled=False).values_list('seat_id').distinct()),
+        ('conflict_check', 'tickets', lambda showtime_id, seat_ids: Ticket.objects.filter(
+            showtime_id=showtime_id, seat_id__in=seat_ids, status=active).values_list('seat_id')),
+        ('conflict_check', 'via reservation', lambda showtime_id, seat_ids: Ticket.objects.filter(
+            reservation__showtime_id=showtime_id, reservation__is_cancelled=False, seat_id__in=seat_ids).values_list('seat_id')),
+    ]
+
+    results = []
+    for check, mode, build in queries:
+        plan = build(*picks[0]).explain().replace('\n', '; ')
+        answers, durations = [], []
+        for showtime_id, seat_ids in picks:
+            queryset = build(showtime_id, seat_ids)
+            began = time.perf_counter()
+            answers.append(sorted(seat_id for seat_id, in queryset))
+            durations.append(time.perf_counter() - began)
+        results.append({'check': check, 'mode': mode, 'lookups': attempts, 'answers': answers, **latency_summary(durations)})
+        summary = results[-1]
+        stdout.write(f"{check:<15} {mode:<16} p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms")
+        stdout.write(f'{"":<15} plan: {plan}')
+
+    # Both paths have to agree before their timings mean anything
+    for current, old in (results[0:2], results[2:4]):
+        if current.pop('answers') != old.pop('answers'):
+            raise AssertionError(f"{current['check']} answers differ between the ticket table and the reservation join.")
+    return results
+
+
+def _metric_direction(key):
+    """+1 if a larger value is better, -1 if smaller is better, None if the key isn't gated.
+
+    Wall times, throughput and latencies depend on the machine and its
+    load, so they are reported but not compared. Query counts and
+    relative_speed (throughput over that of a reference request in the
+    same run) carry over between machines.
+    """
+    if key == 'relative_speed':
+        return 1
+    if key in ('queries', 'queries_per_request'):
+        return -1
+    return None
+
+
+def compare_results(baseline, current, tolerance=0.5):
+    """Regressions of current scenario results against a baseline run, as messages.
+
+    Rows are matched by position within each scenario. Query counts must
+    not grow at all; relative_speed may drop by `tolerance` (a fraction)
+    before it counts as a regression.
+    """
+    regressions = []
+    for name, rows in current.items():
+        for index, (old, new) in enumerate(zip(baseline.get(name, ()), rows)):
+            label = '/'.join(str(value) for key, value in new.items() if isinstance(value, str)) or str(index)
+            for key, value in new.items():
+                direction = _metric_direction(key)
+                if direction is None or key not in old or not old[key]:
+                    continue
+                allowed = 0 if 'queries' in key else tolerance
+                change = (value - old[key]) / old[key] * -direction
+                if change > allowed:
+                    regressions.append(f'{name} {label}: {key} {old[key]} -> {value}')
+    return regressions
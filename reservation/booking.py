@@ -0,0 +1,199 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .events import RELEASED, RESERVED, RESYNC, publish_seat_event
+from .holds import HoldLimitExceeded, SeatsHeld, hold_store
+from .models import Reservation, Seat, Showtime, Ticket
+from .stats import record_sale
+from .trending import record_booking
+
+
+class BookingError(Exception):
+    """Base class for booking failures that should be reported to the client"""
+
+
+class InvalidSeats(BookingError):
+    def __init__(self, message='One or more selected seat IDs are invalid.'):
+        super().__init__(message)
+
+
+class SeatsUnavailable(BookingError):
+    def __init__(self, message='One or more selected seats are already reserved.'):
+        super().__init__(message)
+
+
+class NotCancellable(BookingError):
+    pass
+
+
+def _seat_positions(seats):
+    return [(seat.row_number, seat.seat_number) for seat in seats]
+
+
+def _store_occupancy(showtime, bitmap):
+    # seats_reserved is stored next to the bitmap so listings can filter on it
+    showtime.seat_occupancy = bitmap.to_bytes()
+    showtime.seats_reserved = bitmap.count()
+    Showtime.objects.filter(pk=showtime.pk).update(
+        seat_occupancy=showtime.seat_occupancy, seats_reserved=showtime.seats_reserved,
+    )
+
+
+def lock_showtime(showtime_id):
+    """Lock a showtime's row for the rest of the current transaction and return it fresh.
+
+    The version bump is issued first so that SQLite, which ignores
+    select_for_update, also takes its write lock before any seat state is
+    read. Concurrent bookings for the same showtime therefore queue here
+    instead of both passing the availability check.
+    """
+    Showtime.objects.filter(pk=showtime_id).update(seat_version=F('seat_version') + 1)
+    return Showtime.objects.select_for_update(of=('self',)).select_related('theater').get(pk=showtime_id)
+
+
+def reserve_seats(user, showtime, seat_ids):
+    """Create a reservation for the given seats, checking them against the showtime's bitmap"""
+    seat_ids = set(seat_ids)
+    try:
+        hold_store.check(showtime.pk, user.pk, seat_ids)
+    except SeatsHeld as e:
+        raise SeatsUnavailable(str(e))
+
+    with transaction.atomic():
+        showtime = lock_showtime(showtime.pk)
+        seats = list(Seat.objects.filter(id__in=seat_ids, theater_id=showtime.theater_id))
+        if not seat_ids or len(seats) != len(seat_ids):
+            raise InvalidSeats()
+
+        bitmap = showtime.occupancy()
+        positions = _seat_positions(seats)
+        try:
+            if bitmap.any_taken(positions):
+                raise SeatsUnavailable()
+        except ValueError:
+            # Seat lies outside the theater's current rows/seats_per_row grid
+            raise InvalidSeats()
+
+        reservation = Reservation.objects.create(user=user, showtime=showtime)
+        try:
+            Ticket.objects.bulk_create([
+                Ticket(reservation=reservation, showtime=showtime, seat=seat, price=showtime.price) for seat in seats
+            ])
+        except IntegrityError:
+            # The active-seat constraint caught what a stale bitmap let through
+            raise SeatsUnavailable()
+
+        bitmap.take(positions)
+        _store_occupancy(showtime, bitmap)
+        record_sale(showtime, reservation.created_at, len(seats), showtime.price * len(seats))
+        record_booking(showtime.movie_id, len(seats))
+        publish_seat_event(showtime.pk, RESERVED, seat_ids, showtime.seat_version)
+        # The user's holds on these seats are used up once the booking commits
+        transaction.on_commit(lambda: hold_store.release_seats(showtime.pk, user.pk, seat_ids))
+    return reservation
+
+
+def hold_seats(user, showtime, seat_ids):
+    """Place a temporary hold on free seats without writing to the database"""
+    seat_ids = set(seat_ids)
+    seats = list(Seat.objects.filter(id__in=seat_ids, theater_id=showtime.theater_id))
+    if not seat_ids or len(seats) != len(seat_ids):
+        raise InvalidSeats()
+    try:
+        if showtime.occupancy().any_taken(_seat_positions(seats)):
+            raise SeatsUnavailable()
+    except ValueError:
+        raise InvalidSeats()
+    try:
+        return hold_store.place(showtime.pk, user.pk, seat_ids)
+    except SeatsHeld as e:
+        raise SeatsUnavailable(str(e))
+    except HoldLimitExceeded as e:
+        raise BookingError(str(e))
+
+
+def release_seats(reservation):
+    """Cancel a reservation's tickets and clear their seats from its showtime's bitmap"""
+    with transaction.atomic():
+        showtime = lock_showtime(reservation.showtime_id)
+        bitmap = showtime.occupancy()
+        theater = showtime.theater
+        tickets = Ticket.objects.filter(reservation=reservation, status=Ticket.Status.ACTIVE)
+        seats = Seat.objects.filter(
+            tickets__in=tickets,
+            row_number__gte=1,
+            row_number__lte=theater.rows,
+            seat_number__gte=1,
+            seat_number__lte=theater.seats_per_row,
+        )
+        seats = list(seats)
+        sold = tickets.aggregate(seats=Count('id'), revenue=Sum('price'))
+        tickets.update(status=Ticket.Status.CANCELLED)
+        bitmap.release(_seat_positions(seats))
+        _store_occupancy(showtime, bitmap)
+        publish_seat_event(showtime.pk, RELEASED, [seat.pk for seat in seats], showtime.seat_version)
+        if sold['seats']:
+            record_sale(showtime, reservation.created_at, -sold['seats'], -sold['revenue'])
+            record_booking(showtime.movie_id, -sold['seats'], reservation.created_at)
+
+
+def cancel_reservation(reservation):
+    """Cancel a reservation and free its seats in one transaction.
+
+    The flag is flipped with a conditional UPDATE, so of two concurrent
+    cancellations only one releases the seats and adjusts the sales and
+    trending counters.
+    """
+    if reservation.showtime.show_time <= timezone.now():
+        raise NotCancellable('The showtime has already started.')
+    with transaction.atomic():
+        if not Reservation.objects.filter(pk=reservation.pk, is_cancelled=False).update(is_cancelled=True):
+            raise NotCancellable('The reservation is already cancelled.')
+        release_seats(reservation)
+    reservation.is_cancelled = True
+    return reservation
+
+
+def cancel_showtime_reservations(showtime):
+    """Cancel every active reservation of a showtime at once, e.g. before it is removed.
+
+    Seats are counted per booking hour with one aggregate, so the sales
+    rollup and trending scores are corrected without loading the
+    reservations. Returns the number of reservations cancelled.
+    """
+    with transaction.atomic():
+        showtime = lock_showtime(showtime.pk)
+        tickets = Ticket.objects.filter(showtime=showtime, status=Ticket.Status.ACTIVE)
+        by_hour = (
+            tickets.values(hour=TruncHour('reservation__created_at'))
+            .annotate(seats=Count('id'), revenue=Sum('price'))
+        )
+        for row in by_hour:
+            record_sale(showtime, row['hour'], -row['seats'], -row['revenue'])
+            record_booking(showtime.movie_id, -row['seats'], row['hour'])
+        tickets.update(status=Ticket.Status.CANCELLED)
+        cancelled = Reservation.objects.filter(showtime=showtime, is_cancelled=False).update(is_cancelled=True)
+        _store_occupancy(showtime, showtime.build_occupancy())
+        publish_seat_event(showtime.pk, RESYNC, version=showtime.seat_version)
+    return cancelled
+
+
+def rebuild_occupancy(showtime):
+    """Recompute a showtime's bitmap from the reservation tables under its row lock"""
+    with transaction.atomic():
+        showtime = lock_showtime(showtime.pk)
+        bitmap = showtime.build_occupancy()
+        _store_occupancy(showtime, bitmap)
+        publish_seat_event(showtime.pk, RESYNC, version=showtime.seat_version)
+    return bitmap
+
+
+def reserved_seat_ids(showtime):
+    """Return the ids of taken seats for a showtime without touching the reservation tables"""
+    taken = set(showtime.occupancy().taken_positions())
+    if not taken:
+        return []
+    seats = Seat.objects.filter(theater_id=showtime.theater_id).values_list('id', 'row_number', 'seat_number')
+    return [seat_id for seat_id, row, number in seats if (row, number) in taken]
@@ -0,0 +1,193 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import transaction
+
+from .models import Movie
+from .response_cache import MOVIES, invalidate
+from .tmdb import TMDBError, poster_url
+
+# Fields refreshed on movies that were already imported
+UPSERT_FIELDS = ['title', 'description', 'duration', 'poster_path', 'release_date', 'genres']
+
+# /movie/popular stops serving results after this page
+TMDB_MAX_PAGES = 500
+
+
+class RateLimiter:
+    """Token bucket shared by the worker threads, allowing `rate` requests per second"""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class Checkpoint:
+    """Set of finished /movie/popular pages, persisted as JSON so an import can resume"""
+
+    def __init__(self, path=None, resume=False):
+        self.path = path
+        self.pages = set()
+        if path and resume and os.path.exists(path):
+            with open(path) as f:
+                self.pages = set(json.load(f).get('completed_pages', []))
+
+    def done(self, page):
+        return page in self.pages
+
+    def mark(self, pages):
+        self.pages.update(pages)
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'completed_pages': sorted(self.pages)}, f)
+        os.replace(tmp_path, self.path)
+
+
+def movie_from_details(client, details):
+    return Movie(
+        tmdb_id=details['id'],
+        title=details.get('title') or '',
+        description=details.get('overview') or '',
+        duration=details.get('runtime') or 120,  # Default to 120 mins if not available
+        poster_path=poster_url(details.get('poster_path')) or '',
+        release_date=details.get('release_date') or None,
+        genres=client.genre_names(details),
+    )
+
+
+def link_untracked_movies(movies):
+    """Give movies added without a TMDB id (through the API or older imports) the id of the import matching them.
+
+    A movie matches on title and release date; each untracked row is
+    linked at most once. Returns the TMDB ids that were linked.
+    """
+    wanted = {(movie.title, str(movie.release_date or '')): movie.tmdb_id for movie in movies}
+    if not wanted:
+        return set()
+    links = {}
+    untracked = (
+        Movie.objects.filter(tmdb_id__isnull=True, title__in={title for title, release_date in wanted})
+        .order_by('id').values_list('id', 'title', 'release_date')
+    )
+    for pk, title, release_date in untracked:
+        tmdb_id = wanted.pop((title, str(release_date or '')), None)
+        if tmdb_id is not None:
+            links[pk] = tmdb_id
+    Movie.objects.bulk_update([Movie(pk=pk, tmdb_id=tmdb_id) for pk, tmdb_id in links.items()], ['tmdb_id'])
+    return set(links.values())
+
+
+def upsert_movies(movies):
+    """Insert new movies and refresh existing ones by TMDB id; returns (created, updated)"""
+    by_id = {movie.tmdb_id: movie for movie in movies}
+    existing = set(Movie.objects.filter(tmdb_id__in=by_id).values_list('tmdb_id', flat=True))
+    existing |= link_untracked_movies([movie for tmdb_id, movie in by_id.items() if tmdb_id not in existing])
+    Movie.objects.bulk_create(
+        by_id.values(),
+        update_conflicts=True,
+        unique_fields=['tmdb_id'],
+        update_fields=UPSERT_FIELDS,
+    )
+    invalidate(MOVIES)
+    return len(by_id) - len(existing), len(existing)
+
+
+class CatalogImport:
+    """Import /movie/popular into the Movie table.
+
+    Pages and movie details are fetched on a bounded thread pool behind a
+    shared rate limiter, while all database writes stay on the calling
+    thread: each batch of pages is upserted with a single bulk_create and
+    then recorded in the checkpoint.
+    """
+
+    def __init__(self, client, workers=8, rate=40, checkpoint=None, pages_per_batch=5, progress=None):
+        self.client = client
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.checkpoint = checkpoint or Checkpoint()
+        self.pages_per_batch = pages_per_batch
+        self.progress = progress or (lambda stats: None)
+        self.stats = {'pages': 0, 'skipped_pages': 0, 'failed_pages': 0, 'created': 0, 'updated': 0,
+                      'failed_movies': 0, 'elapsed_s': 0.0, 'rows_per_s': 0.0}
+
+    def _fetch(self, fetch, *args):
+        self.limiter.acquire()
+        try:
+            return fetch(*args)
+        except TMDBError:
+            return None
+
+    def run(self, pages=1):
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            first = self._fetch(self.client.popular, 1)
+            if first is None:
+                raise TMDBError('Could not fetch the first page of popular movies.')
+            last_page = min(first.get('total_pages') or 1, TMDB_MAX_PAGES)
+            if pages:
+                last_page = min(last_page, pages)
+
+            todo = [page for page in range(1, last_page + 1) if not self.checkpoint.done(page)]
+            self.stats['skipped_pages'] = last_page - len(todo)
+            for start in range(0, len(todo), self.pages_per_batch):
+                self._import_batch(pool, todo[start:start + self.pages_per_batch], first)
+                elapsed = time.perf_counter() - began
+                rows = self.stats['created'] + self.stats['updated']
+                self.stats['elapsed_s'] = round(elapsed, 3)
+                self.stats['rows_per_s'] = round(rows / elapsed, 1) if elapsed else 0.0
+                self.progress(self.stats)
+        return self.stats
+
+    def _import_batch(self, pool, batch, first):
+        listings = list(pool.map(
+            lambda page: first if page == 1 else self._fetch(self.client.popular, page), batch,
+        ))
+        fetched_pages = [page for page, listing in zip(batch, listings) if listing is not None]
+        self.stats['failed_pages'] += len(batch) - len(fetched_pages)
+
+        tmdb_ids = list(dict.fromkeys(
+            result['id'] for listing in listings if listing for result in listing.get('results', [])
+        ))
+        movies = []
+        failed = 0
+        for details in pool.map(lambda tmdb_id: self._fetch(self.client.movie_details, tmdb_id), tmdb_ids):
+            if details is None:
+                failed += 1
+            else:
+                movies.append(movie_from_details(self.client, details))
+        self.stats['failed_movies'] += failed
+
+        if movies:
+            with transaction.atomic():
+                created, updated = upsert_movies(movies)
+            self.stats['created'] += created
+            self.stats['updated'] += updated
+        self.stats['pages'] += len(fetched_pages)
+        # A batch with missing details is fetched again on resume
+        if not failed:
+            self.checkpoint.mark(fetched_pages)
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS to each new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def connect_signals():
+    connection_created.connect(configure_sqlite, dispatch_uid='reservation_configure_sqlite')
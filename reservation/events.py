@@ -0,0 +1,128 @@
+import asyncio
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Event types sent to seat map subscribers
+RESERVED = 'reserved'
+RELEASED = 'released'
+HELD = 'held'
+HOLD_RELEASED = 'hold_released'
+# The whole map changed (e.g. the theater was resized) or events were dropped
+RESYNC = 'resync'
+
+
+class Subscription:
+    """One listener's queue of events for a showtime, consumed from an asyncio loop"""
+
+    def __init__(self, broker, showtime_id, loop, max_queue):
+        self.broker = broker
+        self.showtime_id = showtime_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def deliver(self, event):
+        """Queue an event from any thread"""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        if self.queue.full():
+            # A slow client gets a single resync instead of an unbounded backlog
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {'type': RESYNC, 'showtime': self.showtime_id}
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """Next event, or None if nothing arrived within the timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fan seat events out to the subscribers in this process.
+
+    Publishing never blocks: events are handed to each subscriber's event
+    loop with call_soon_threadsafe, so booking code running in worker
+    threads can publish directly. With several server processes, point
+    SEAT_EVENT_BROKER at a broker backed by a shared pub/sub (e.g. Redis)
+    that implements the same subscribe/unsubscribe/publish methods.
+    """
+
+    def __init__(self, max_queue=None):
+        self.max_queue = max_queue or getattr(settings, 'SEAT_EVENTS_QUEUE_SIZE', 256)
+        self._lock = threading.Lock()
+        self._subscribers = {}  # showtime_id -> set of Subscription
+
+    def subscribe(self, showtime_id, loop=None):
+        subscription = Subscription(self, showtime_id, loop or asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(showtime_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.showtime_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.showtime_id]
+
+    def publish(self, showtime_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(showtime_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self, showtime_id=None):
+        with self._lock:
+            if showtime_id is not None:
+                return len(self._subscribers.get(showtime_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker, built from the SEAT_EVENT_BROKER dotted path"""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(getattr(settings, 'SEAT_EVENT_BROKER', 'reservation.events.InProcessBroker'))()
+    return _broker
+
+
+def reset_broker():
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def publish_seat_event(showtime_id, event_type, seat_ids=(), version=None):
+    """Publish a seat change once the surrounding transaction commits"""
+    event = {'type': event_type, 'showtime': showtime_id, 'seat_ids': sorted(seat_ids)}
+    if version is not None:
+        event['version'] = version
+    transaction.on_commit(lambda: get_broker().publish(showtime_id, event))
+
+
+def publish_hold_change(showtime_id, seat_ids, held):
+    """HoldStore listener; holds live in memory, so there is no transaction to wait for"""
+    get_broker().publish(showtime_id, {
+        'type': HELD if held else HOLD_RELEASED,
+        'showtime': showtime_id,
+        'seat_ids': sorted(seat_ids),
+    })
@@ -0,0 +1,187 @@
+import heapq
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from .events import publish_hold_change
+
+
+@dataclass(frozen=True)
+class Hold:
+    token: str
+    showtime_id: int
+    user_id: int
+    seat_ids: frozenset
+    expires_at: float  # time.time() based, for clients
+    deadline: float  # time.monotonic() based, for expiry
+
+
+class SeatsHeld(Exception):
+    def __init__(self, message='One or more selected seats are being held by another customer.'):
+        super().__init__(message)
+
+
+class HoldLimitExceeded(Exception):
+    def __init__(self, limit):
+        super().__init__(f'You can hold at most {limit} seats for a showtime.')
+
+
+class HoldStore:
+    """In-process store of short-lived seat holds.
+
+    Holds are indexed by token and by (showtime, seat) so that placing,
+    checking and listing holds never touch the database. Expired holds are
+    swept lazily from a min-heap of deadlines on every access, so expiry
+    costs O(log n) per hold rather than a scan of the whole store.
+
+    Each process has its own store; holds are advisory and the booking
+    path still enforces seat availability in the database. A user may hold
+    at most max_seats seats per showtime (SEAT_HOLD_MAX_SEATS), so one
+    account can't keep a showtime blocked by renewing holds. The optional
+    listener is called as listener(showtime_id, seat_ids, held) whenever
+    seats become held or stop being held, including on expiry.
+    """
+
+    def __init__(self, ttl=None, clock=time.monotonic, listener=None, max_seats=None):
+        self.ttl = ttl
+        self.max_seats = max_seats
+        self._clock = clock
+        self.listener = listener
+        self._lock = threading.Lock()
+        self._holds = {}
+        self._seats = {}  # showtime_id -> {seat_id: token}
+        self._deadlines = []  # heap of (deadline, token)
+
+    def _ttl(self, ttl):
+        if ttl is not None:
+            return ttl
+        if self.ttl is not None:
+            return self.ttl
+        return getattr(settings, 'SEAT_HOLD_TTL_SECONDS', 300)
+
+    def _max_seats(self):
+        if self.max_seats is not None:
+            return self.max_seats
+        return getattr(settings, 'SEAT_HOLD_MAX_SEATS', 10)
+
+    def _sweep(self):
+        now = self._clock()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, token = heapq.heappop(self._deadlines)
+            hold = self._holds.get(token)
+            if hold is not None and hold.deadline == deadline:
+                self._drop(hold)
+
+    def _drop(self, hold):
+        del self._holds[hold.token]
+        seats = self._seats.get(hold.showtime_id, {})
+        released = [seat_id for seat_id in hold.seat_ids if seats.get(seat_id) == hold.token]
+        for seat_id in released:
+            del seats[seat_id]
+        if not seats:
+            self._seats.pop(hold.showtime_id, None)
+        self._notify(hold.showtime_id, released, False)
+
+    def _notify(self, showtime_id, seat_ids, held):
+        if self.listener is not None and seat_ids:
+            self.listener(showtime_id, seat_ids, held)
+
+    def _conflicts(self, showtime_id, user_id, seat_ids):
+        seats = self._seats.get(showtime_id, {})
+        return [
+            seat_id for seat_id in seat_ids
+            if seat_id in seats and self._holds[seats[seat_id]].user_id != user_id
+        ]
+
+    def _held_by(self, showtime_id, user_id, replaced=()):
+        """Seats the user holds for a showtime, not counting holds about to be replaced"""
+        return sum(
+            1 for token in self._seats.get(showtime_id, {}).values()
+            if token not in replaced and self._holds[token].user_id == user_id
+        )
+
+    def place(self, showtime_id, user_id, seat_ids, ttl=None):
+        """Hold seats for a user, replacing that user's earlier holds on the same seats"""
+        ttl = self._ttl(ttl)
+        limit = self._max_seats()
+        seat_ids = frozenset(seat_ids)
+        with self._lock:
+            self._sweep()
+            if self._conflicts(showtime_id, user_id, seat_ids):
+                raise SeatsHeld()
+            seats = self._seats.get(showtime_id, {})
+            replaced = {seats[seat_id] for seat_id in seat_ids if seat_id in seats}
+            if self._held_by(showtime_id, user_id, replaced) + len(seat_ids) > limit:
+                raise HoldLimitExceeded(limit)
+            self._release_seats(showtime_id, user_id, seat_ids)
+
+            deadline = self._clock() + ttl
+            hold = Hold(
+                token=secrets.token_urlsafe(12),
+                showtime_id=showtime_id,
+                user_id=user_id,
+                seat_ids=seat_ids,
+                expires_at=time.time() + ttl,
+                deadline=deadline,
+            )
+            self._holds[hold.token] = hold
+            seats = self._seats.setdefault(showtime_id, {})
+            for seat_id in seat_ids:
+                seats[seat_id] = hold.token
+            heapq.heappush(self._deadlines, (deadline, hold.token))
+            self._notify(showtime_id, seat_ids, True)
+            return hold
+
+    def sweep(self):
+        """Expire overdue holds now rather than on the next access"""
+        with self._lock:
+            self._sweep()
+
+    def get(self, token):
+        with self._lock:
+            self._sweep()
+            return self._holds.get(token)
+
+    def release(self, token):
+        with self._lock:
+            hold = self._holds.get(token)
+            if hold is not None:
+                self._drop(hold)
+            return hold
+
+    def _release_seats(self, showtime_id, user_id, seat_ids):
+        seats = self._seats.get(showtime_id, {})
+        tokens = {seats[seat_id] for seat_id in seat_ids if seat_id in seats}
+        for token in tokens:
+            hold = self._holds[token]
+            if hold.user_id == user_id:
+                self._drop(hold)
+
+    def release_seats(self, showtime_id, user_id, seat_ids):
+        """Drop a user's holds covering any of the given seats, e.g. once they are booked"""
+        with self._lock:
+            self._release_seats(showtime_id, user_id, set(seat_ids))
+
+    def check(self, showtime_id, user_id, seat_ids):
+        """Raise SeatsHeld if another user holds any of the given seats"""
+        with self._lock:
+            self._sweep()
+            if self._conflicts(showtime_id, user_id, seat_ids):
+                raise SeatsHeld()
+
+    def held_seat_ids(self, showtime_id):
+        with self._lock:
+            self._sweep()
+            return sorted(self._seats.get(showtime_id, {}))
+
+    def clear(self):
+        with self._lock:
+            self._holds.clear()
+            self._seats.clear()
+            self._deadlines.clear()
+
+
+hold_store = HoldStore(listener=publish_hold_change)
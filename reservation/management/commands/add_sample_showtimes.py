@@ -1,5 +1,7 @@
 from django.core.management.base import BaseCommand
-from reservation.models import Movie, Theater, Showtime, Seat
+from reservation.models import Movie, Theater, Showtime
+from reservation.provisioning import provision_seats
+from reservation.scheduling import end_time_for
 from datetime import datetime, timedelta
 
 class Command(BaseCommand):
@@ -20,11 +22,9 @@ class Command(BaseCommand):
         else:
             self.stdout.write(self.style.SUCCESS(f'Using existing theater: {theater1.name}'))
 
-        # Create seats for theater1
-        for row_num in range(1, theater1.rows + 1):
-            for seat_num in range(1, theater1.seats_per_row + 1):
-                Seat.objects.get_or_create(theater=theater1, row_number=row_num, seat_number=seat_num)
-        self.stdout.write(self.style.SUCCESS(f'Created seats for {theater1.name}'))
+        # Create any missing seats for theater1
+        created_seats, _ = provision_seats(theater1)
+        self.stdout.write(self.style.SUCCESS(f'Created {created_seats} seats for {theater1.name}'))
 
         theater2, created2 = Theater.objects.get_or_create(
             name='Grand Cinema Hall 2',
@@ -39,11 +39,9 @@ class Command(BaseCommand):
         else:
             self.stdout.write(self.style.SUCCESS(f'Using existing theater: {theater2.name}'))
 
-        # Create seats for theater2
-        for row_num in range(1, theater2.rows + 1):
-            for seat_num in range(1, theater2.seats_per_row + 1):
-                Seat.objects.get_or_create(theater=theater2, row_number=row_num, seat_number=seat_num)
-        self.stdout.write(self.style.SUCCESS(f'Created seats for {theater2.name}'))
+        # Create any missing seats for theater2
+        created_seats, _ = provision_seats(theater2)
+        self.stdout.write(self.style.SUCCESS(f'Created {created_seats} seats for {theater2.name}'))
 
         # Get all movies
         movies = Movie.objects.all()
@@ -61,18 +59,24 @@ class Command(BaseCommand):
         theaters = [theater1, theater2]
         theater_index = 0
 
+        capacities = Theater.capacities([theater.pk for theater in theaters])
+        showtimes = []
         for movie in movies:
             # Create 1 showtime for each movie, alternating between theaters
             current_theater = theaters[theater_index]
             show_time = now + timedelta(days=1, hours=10 + (movie.id % 5), minutes=30) # Vary time slightly
             
-            Showtime.objects.create(
+            # bulk_create skips save(), so end_time and capacity are set here
+            showtimes.append(Showtime(
                 movie=movie,
                 theater=current_theater,
-                show_time=show_time
-            )
+                show_time=show_time,
+                end_time=end_time_for(movie, show_time),
+                capacity=capacities[current_theater.pk],
+            ))
             self.stdout.write(self.style.SUCCESS(f'Added showtime for {movie.title} at {show_time.strftime("%Y-%m-%d %H:%M")} in {current_theater.name}'))
             
             theater_index = (theater_index + 1) % len(theaters) # Cycle through theaters
 
+        Showtime.objects.bulk_create(showtimes)
         self.stdout.write(self.style.SUCCESS('Sample showtimes added successfully for all movies.'))
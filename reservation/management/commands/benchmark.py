@@ -0,0 +1,64 @@
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from reservation.benchmarks import SCENARIOS, benchmark_database, compare_results
+
+class Command(BaseCommand):
+    help = 'Runs reservation benchmarks in-process against a throwaway database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help=f'Scenarios to run (default: all). Available: {", ".join(SCENARIOS)}')
+        parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4, 8], help='Worker thread counts to try.')
+        parser.add_argument('--attempts', type=int, default=200, help='Booking attempts per round.')
+        parser.add_argument('--scale', type=float, default=0.01, help='Seed data size for the api and tickets scenarios (1 = 10k movies, 1k theaters, 1M reservations).')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--baseline', help='Fail if results regress against this JSON file from an earlier --output.')
+        parser.add_argument('--tolerance', type=float, default=0.5, help='Allowed slowdown against --baseline, as a fraction.')
+
+    def handle(self, *args, **options):
+        names = options['scenarios'] or list(SCENARIOS)
+        unknown = [name for name in names if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f'Unknown scenario(s): {", ".join(unknown)}')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        results = {}
+        with benchmark_database():
+            for name in names:
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                try:
+                    results[name] = SCENARIOS[name](
+                        self.stdout, workers=options['workers'], attempts=options['attempts'], scale=options['scale'],
+                    )
+                except AssertionError as e:
+                    raise CommandError(f'{name} failed: {e}')
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'environment': {
+                        'python': platform.python_version(),
+                        'django': django.get_version(),
+                        'database': connection.vendor,
+                        'workers': options['workers'],
+                        'attempts': options['attempts'],
+                        'scale': options['scale'],
+                    },
+                    'scenarios': results,
+                }, f, indent=2)
+                f.write('\n')
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        if baseline is not None:
+            regressions = compare_results(baseline['scenarios'], results, options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+        self.stdout.write(self.style.SUCCESS('Benchmarks finished.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from reservation.tmdb_fake import FakeTMDBServer
+
+class Command(BaseCommand):
+    help = 'Runs a local stand-in for the TMDB API. Point TMDB_BASE_URL at the printed URL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--movies', type=int, default=1000, help='Number of movies in the fake catalog.')
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds to sleep before each response.')
+
+    def handle(self, *args, **options):
+        server = FakeTMDBServer(movies=options['movies'], port=options['port'], latency=options['latency'])
+        self.stdout.write(self.style.SUCCESS(f'Fake TMDB serving {options["movies"]} movies at {server.url}'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
@@ -1,49 +1,49 @@
-import requests
-from django.core.management.base import BaseCommand
-from reservation.models import Movie
+from django.core.management.base import BaseCommand, CommandError
+from reservation.catalog_import import CatalogImport, Checkpoint
+from reservation.tmdb import TMDBClient, TMDBError
 
 class Command(BaseCommand):
-    help = 'Fetches popular movies and their posters from the TMDb API and populates the database.'
+    help = 'Imports popular movies and their posters from the TMDb API, updating movies that were already imported.'
 
-    def handle(self, *args, **options):
-        api_key = 'c8a254596ddcb52c68b7d5ed82d49efa'  # Replace with your TMDb API key
-        
-        # Clear existing movies from the database
-        self.stdout.write(self.style.WARNING('Clearing all existing movies from the database...'))
-        Movie.objects.all().delete()
-
-        # Fetch a list of popular movies from TMDb
-        popular_movies_url = f'https://api.themoviedb.org/3/movie/popular?api_key={api_key}&language=en-US&page=1'
-        response = requests.get(popular_movies_url)
-        
-        if response.status_code != 200:
-            self.stdout.write(self.style.ERROR(f'Failed to fetch popular movies. API Response: {response.json()}'))
-            return
-
-        popular_movies = response.json().get('results', [])
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=1, help='Pages of /movie/popular to import, 20 movies each (0 for all).')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent TMDB requests.')
+        parser.add_argument('--rate', type=float, default=40, help='Maximum TMDB requests per second (0 for no limit).')
+        parser.add_argument('--batch-pages', type=int, default=5, help='Pages fetched and upserted together.')
+        parser.add_argument('--checkpoint', help='JSON file recording finished pages.')
+        parser.add_argument('--resume', action='store_true', help='Skip pages already recorded in --checkpoint.')
 
-        if not popular_movies:
-            self.stdout.write(self.style.WARNING('No popular movies found.'))
-            return
-
-        for movie_data in popular_movies:
-            # Fetch detailed information for each movie to get the duration
-            movie_id = movie_data['id']
-            details_url = f'https://api.themoviedb.org/3/movie/{movie_id}?api_key={api_key}&language=en-US'
-            details_response = requests.get(details_url)
-            
-            if details_response.status_code != 200:
-                self.stdout.write(self.style.WARNING(f'Could not fetch details for movie ID {movie_id}'))
-                continue
-
-            movie_details = details_response.json()
+    def handle(self, *args, **options):
+        if options['resume'] and not options['checkpoint']:
+            raise CommandError('--resume needs --checkpoint.')
 
-            # Create a new movie entry in the database
-            Movie.objects.create(
-                title=movie_details['title'],
-                description=movie_details.get('overview', ''),
-                duration=movie_details.get('runtime', 120),  # Default to 120 mins if not available
-                poster_path=f"https://image.tmdb.org/t/p/w500{movie_details.get('poster_path', '')}" if movie_details.get('poster_path') else ''
+        def progress(stats):
+            self.stdout.write(
+                f"pages={stats['pages']} created={stats['created']} updated={stats['updated']} "
+                f"failed={stats['failed_movies']} {stats['rows_per_s']} rows/s"
             )
 
-            self.stdout.write(self.style.SUCCESS(f'Successfully created and fetched data for {movie_details['title']}'))
+        importer = CatalogImport(
+            TMDBClient(pool_size=options['workers']),
+            workers=options['workers'],
+            rate=options['rate'],
+            checkpoint=Checkpoint(options['checkpoint'], resume=options['resume']),
+            pages_per_batch=options['batch_pages'],
+            progress=progress,
+        )
+        try:
+            stats = importer.run(pages=options['pages'])
+        except TMDBError as e:
+            raise CommandError(str(e))
+
+        if stats['skipped_pages']:
+            self.stdout.write(f"Skipped {stats['skipped_pages']} page(s) already in the checkpoint.")
+        if stats['failed_pages'] or stats['failed_movies']:
+            self.stdout.write(self.style.WARNING(
+                f"{stats['failed_pages']} page(s) and {stats['failed_movies']} movie(s) could not be fetched; "
+                'run again with --resume to retry them.'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['created']} new and {stats['updated']} updated movies in {stats['elapsed_s']}s "
+            f"({stats['rows_per_s']} rows/s)."
+        ))
@@ -0,0 +1,66 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from reservation.models import Movie, Theater
+from reservation.scheduling import create_schedule, plan_schedule
+from reservation.serializers import ScheduleTemplateSerializer
+
+class Command(BaseCommand):
+    help = 'Generates showtimes for a range of days from a schedule template, skipping slots that clash with the existing schedule.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', help='Comma-separated movie ids to rotate (default: all movies).')
+        parser.add_argument('--theaters', help='Comma-separated theater ids (default: all theaters).')
+        parser.add_argument('--start', help='First day, YYYY-MM-DD (default: tomorrow).')
+        parser.add_argument('--days', type=int, default=7, help='Number of days to schedule.')
+        parser.add_argument('--slots', default='10:00,13:30,17:00,20:30', help='Comma-separated daily start times.')
+        parser.add_argument('--price', default='10.00', help='Base ticket price.')
+        parser.add_argument('--price-rules', default='[]', help='JSON list of price rules, e.g. \'[{"weekdays": [4, 5], "from_time": "17:00", "add": "2.50"}]\'.')
+        parser.add_argument('--dry-run', action='store_true', help='Report the plan without creating showtimes.')
+
+    def _ids(self, value, model):
+        if value:
+            return [int(pk) for pk in value.split(',') if pk.strip()]
+        return list(model.objects.order_by('pk').values_list('pk', flat=True))
+
+    def handle(self, *args, **options):
+        try:
+            price_rules = json.loads(options['price_rules'])
+            movies = self._ids(options['movies'], Movie)
+            theaters = self._ids(options['theaters'], Theater)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        template = ScheduleTemplateSerializer(data={
+            'movies': movies,
+            'theaters': theaters,
+            'start_date': options['start'] or (timezone.localdate() + timedelta(days=1)).isoformat(),
+            'days': options['days'],
+            'slot_times': [slot.strip() for slot in options['slots'].split(',') if slot.strip()],
+            'price': options['price'],
+            'price_rules': price_rules,
+            'dry_run': options['dry_run'],
+        })
+        if not template.is_valid():
+            raise CommandError(json.dumps(template.errors))
+        data = template.validated_data
+
+        plan = plan_schedule(
+            data['movies'], data['theaters'], data['start_date'], data['days'],
+            data['slot_times'], data['price'], data['price_rules'],
+        )
+        if not data['dry_run']:
+            create_schedule(plan)
+
+        for entry in plan:
+            if entry['status'] == 'skipped':
+                self.stdout.write(self.style.WARNING(
+                    f"Skipped {entry['theater'].name} {entry['show_time'].strftime('%Y-%m-%d %H:%M')}: clashes with {entry['conflict']}"
+                ))
+        status_name = 'planned' if data['dry_run'] else 'created'
+        done = sum(1 for entry in plan if entry['status'] == status_name)
+        skipped = sum(1 for entry in plan if entry['status'] == 'skipped')
+        verb = 'Would create' if data['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {done} showtimes; skipped {skipped} slots.'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from reservation.models import DailySales
+from reservation.stats import rebuild_daily_sales
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily sales rollup used by the admin dashboard from the reservation tables.'
+
+    def handle(self, *args, **options):
+        rebuild_daily_sales()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {DailySales.objects.count()} daily sales rows.'))
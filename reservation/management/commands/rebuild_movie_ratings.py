@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from reservation.ratings import rebuild_movie_ratings
+
+class Command(BaseCommand):
+    help = 'Rebuilds the stored rating totals on every movie from the Rating table.'
+
+    def handle(self, *args, **options):
+        count = rebuild_movie_ratings()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating totals for {count} movies.'))
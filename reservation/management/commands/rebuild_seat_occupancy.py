@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from reservation.models import Showtime
+from reservation.booking import rebuild_occupancy
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-showtime seat occupancy bitmaps from the reservation tables.'
+
+    def handle(self, *args, **options):
+        showtimes = Showtime.objects.all()
+        for showtime in showtimes:
+            rebuild_occupancy(showtime)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt seat occupancy for {showtimes.count()} showtimes.'))
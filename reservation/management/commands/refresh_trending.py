@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from reservation.trending import rebuild_trending_scores
+
+class Command(BaseCommand):
+    help = 'Recomputes the time-decayed trending score of every movie. Run it periodically (e.g. hourly from cron).'
+
+    def handle(self, *args, **options):
+        scored = rebuild_trending_scores()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed trending scores; {scored} movies have recent activity.'))
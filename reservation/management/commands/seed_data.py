@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from reservation.models import Movie
+from reservation.seed import seed_database
+
+class Command(BaseCommand):
+    help = 'Fills an empty database with synthetic movies, theaters, showtimes, reservations and ratings for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=10000)
+        parser.add_argument('--theaters', type=int, default=1000)
+        parser.add_argument('--reservations', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--ratings', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for repeatable data sets.')
+
+    def handle(self, *args, **options):
+        # Seed usernames and booking references are fixed, so a second run would collide
+        if Movie.objects.exists():
+            raise CommandError('The database already has movies; seed an empty database.')
+        if min(options['movies'], options['theaters'], options['users']) < 1:
+            raise CommandError('--movies, --theaters and --users must be at least 1.')
+
+        stats = seed_database(
+            movies=options['movies'],
+            theaters=options['theaters'],
+            reservations=options['reservations'],
+            users=options['users'],
+            ratings=options['ratings'],
+            seed=options['seed'],
+            progress=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {stats['movies']} movies, {stats['theaters']} theaters, {stats['showtimes']} showtimes, "
+            f"{stats['reservations']} reservations and {stats['ratings']} ratings in {stats['elapsed_s']}s."
+        ))
@@ -0,0 +1,223 @@
+import logging
+import threading
+import time
+import traceback
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import response_cache
+
+slow_log = logging.getLogger('reservation.slow_requests')
+
+# Upper bounds, in seconds, of the request duration histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Queries kept per request for the slow request log; counts and times cover them all
+MAX_LOGGED_QUERIES = 50
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """What one request spent its time on"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.serializing = False
+        self.sql = []
+
+    def execute(self, execute, sql, params, many, context):
+        """Database execute_wrapper timing every query of the request"""
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - began
+            self.queries += 1
+            self.db_time += elapsed
+            if len(self.sql) < MAX_LOGGED_QUERIES:
+                # Only slow queries pay for a stack trace, taken while the caller is still on the stack
+                stack = None
+                if elapsed * 1000 >= settings.METRICS_SLOW_QUERY_MS:
+                    stack = ''.join(traceback.format_stack()[:-1])
+                self.sql.append((elapsed, sql, stack))
+
+
+class TimedSerializerMixin:
+    """Adds the time spent turning instances into primitives to the request's metrics"""
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None or metrics.serializing:
+            # Nested serializers are already inside the outer serializer's timing
+            return super().to_representation(instance)
+        metrics.serializing = True
+        began = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serialize_time += time.perf_counter() - began
+            metrics.serializing = False
+
+
+class _ViewStats:
+    def __init__(self):
+        self.responses = {}
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    """Per-process request metrics by view, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def observe(self, view, method, status, duration, metrics, size):
+        with self._lock:
+            stats = self._views.get(view)
+            if stats is None:
+                stats = self._views[view] = _ViewStats()
+            stats.responses[method, status] = stats.responses.get((method, status), 0) + 1
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    stats.buckets[index] += 1
+                    break
+            stats.count += 1
+            stats.duration += duration
+            stats.queries += metrics.queries
+            stats.db_time += metrics.db_time
+            stats.serialize_time += metrics.serialize_time
+            stats.response_bytes += size
+
+    def render(self):
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = [
+                '# HELP http_requests_total Responses by view, method and status.',
+                '# TYPE http_requests_total counter',
+            ]
+            for view, stats in views:
+                for (method, status), count in sorted(stats.responses.items()):
+                    lines.append(f'http_requests_total{{view="{view}",method="{method}",status="{status}"}} {count}')
+            lines += [
+                '# HELP http_request_duration_seconds Wall time per request.',
+                '# TYPE http_request_duration_seconds histogram',
+            ]
+            for view, stats in views:
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {stats.count}')
+                lines.append(f'http_request_duration_seconds_sum{{view="{view}"}} {stats.duration:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{view="{view}"}} {stats.count}')
+            for name, kind, attribute, help_text in (
+                ('http_request_db_queries_total', 'counter', 'queries', 'Database queries run by requests.'),
+                ('http_request_db_seconds_total', 'counter', 'db_time', 'Time spent in database queries.'),
+                ('http_request_serialize_seconds_total', 'counter', 'serialize_time', 'Time spent in serializers.'),
+                ('http_response_bytes_total', 'counter', 'response_bytes', 'Response body bytes sent.'),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                for view, stats in views:
+                    value = getattr(stats, attribute)
+                    lines.append(f'{name}{{view="{view}"}} {value:.6f}' if isinstance(value, float) else f'{name}{{view="{view}"}} {value}')
+
+        cache = response_cache.stats.snapshot()
+        lines += ['# HELP response_cache_lookups_total Response cache lookups by outcome.', '# TYPE response_cache_lookups_total counter']
+        for outcome in ('hits', 'misses', 'not_modified'):
+            lines.append(f'response_cache_lookups_total{{outcome="{outcome}"}} {cache[outcome]}')
+        lines += [
+            '# HELP response_cache_invalidations_total Response cache namespace invalidations.',
+            '# TYPE response_cache_invalidations_total counter',
+            f'response_cache_invalidations_total {cache["invalidations"]}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def _view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    # The URL name, not the path, so ids don't explode the number of series
+    label = match.view_name or match.route or 'unmatched'
+    return label.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _response_size(response):
+    if response.streaming:
+        return 0
+    return len(response.content)
+
+
+class MetricsMiddleware:
+    """Time each request and record its queries, serializer time and response size.
+
+    Disabled unless METRICS_ENABLED is set. Adds a Server-Timing header,
+    feeds the /metrics endpoint and logs requests slower than
+    METRICS_SLOW_REQUEST_MS with their SQL, including a stack trace for
+    each query slower than METRICS_SLOW_QUERY_MS.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.execute))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - metrics.started
+
+        view = _view_label(request)
+        registry.observe(view, request.method, response.status_code, duration, metrics, _response_size(response))
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = ', '.join((
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+                f'serialize;dur={metrics.serialize_time * 1000:.1f}',
+                f'total;dur={duration * 1000:.1f}',
+            ))
+        if duration * 1000 >= settings.METRICS_SLOW_REQUEST_MS:
+            log_slow_request(request, view, duration, metrics)
+        return response
+
+
+def log_slow_request(request, view, duration, metrics):
+    lines = [
+        f'Slow request: {request.method} {request.get_full_path()} ({view}) took {duration * 1000:.0f}ms, '
+        f'{metrics.queries} queries in {metrics.db_time * 1000:.0f}ms, serializers {metrics.serialize_time * 1000:.0f}ms'
+    ]
+    for elapsed, sql, stack in metrics.sql:
+        lines.append(f'  {elapsed * 1000:.1f}ms {sql}')
+        if stack:
+            lines.append('    ' + stack.rstrip().replace('\n', '\n    '))
+    if metrics.queries > len(metrics.sql):
+        lines.append(f'  ... {metrics.queries - len(metrics.sql)} more queries')
+    slow_log.warning('\n'.join(lines))
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+from reservation.occupancy import SeatBitmap
+
+
+def build_seat_occupancy(apps, schema_editor):
+    Showtime = apps.get_model('reservation', 'Showtime')
+    Seat = apps.get_model('reservation', 'Seat')
+    for showtime in Showtime.objects.select_related('theater'):
+        theater = showtime.theater
+        bitmap = SeatBitmap(theater.rows, theater.seats_per_row)
+        bitmap.take(Seat.objects.filter(
+            reservation__showtime=showtime,
+            reservation__is_cancelled=False,
+            row_number__gte=1,
+            row_number__lte=theater.rows,
+            seat_number__gte=1,
+            seat_number__lte=theater.seats_per_row,
+        ).values_list('row_number', 'seat_number').distinct())
+        showtime.seat_occupancy = bitmap.to_bytes()
+        showtime.save(update_fields=['seat_occupancy'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0007_auto_20250727_0705'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='showtime',
+            name='seat_occupancy',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.RunPython(build_seat_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0008_showtime_seat_occupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='showtime',
+            name='seat_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def build_daily_sales(apps, schema_editor):
+    Reservation = apps.get_model('reservation', 'Reservation')
+    DailySales = apps.get_model('reservation', 'DailySales')
+    rows = (
+        Reservation.selected_seats.through.objects.filter(reservation__is_cancelled=False)
+        .values(day=TruncDate('reservation__created_at'), showtime_id=F('reservation__showtime'))
+        .annotate(seats=Count('id'), revenue=Sum('reservation__showtime__price'))
+    )
+    rollup = {}
+    for row in rows:
+        key = (row['day'] or timezone.localdate(), row['showtime_id'])
+        sale = rollup.setdefault(key, DailySales(date=key[0], showtime_id=key[1], seats=0, revenue=0))
+        sale.seats += row['seats']
+        sale.revenue += row['revenue']
+    DailySales.objects.bulk_create(rollup.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0009_showtime_seat_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('seats', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('showtime', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='reservation.showtime')),
+            ],
+            options={
+                'unique_together': {('date', 'showtime')},
+            },
+        ),
+        migrations.RunPython(build_daily_sales, migrations.RunPython.noop),
+    ]
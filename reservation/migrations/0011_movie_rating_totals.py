@@ -0,0 +1,32 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:22
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def build_rating_totals(apps, schema_editor):
+    Movie = apps.get_model('reservation', 'Movie')
+    Rating = apps.get_model('reservation', 'Rating')
+    for row in Rating.objects.values('movie').annotate(total=Sum('rating'), count=Count('id')):
+        Movie.objects.filter(pk=row['movie']).update(rating_sum=row['total'], rating_count=row['count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0010_dailysales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='rating_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_sum',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(build_rating_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0011_movie_rating_totals'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movie',
+            name='release_date',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='movie',
+            name='title',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='showtime',
+            name='show_time',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
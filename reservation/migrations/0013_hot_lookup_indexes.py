@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0012_catalog_ordering_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user', 'created_at'], name='reservation_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['showtime', 'is_cancelled'], name='reservation_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='showtime',
+            index=models.Index(fields=['theater', 'show_time'], name='showtime_theater_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='showtime',
+            index=models.Index(fields=['movie', 'show_time'], name='showtime_movie_time_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:29
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0013_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='reservation',
+            name='qr_code',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0014_remove_reservation_qr_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='tmdb_id',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
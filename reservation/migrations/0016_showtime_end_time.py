@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:42
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def fill_end_times(apps, schema_editor):
+    Showtime = apps.get_model('reservation', 'Showtime')
+    showtimes = list(Showtime.objects.select_related('movie').only('show_time', 'movie__duration'))
+    for showtime in showtimes:
+        showtime.end_time = showtime.show_time + timedelta(minutes=showtime.movie.duration)
+    Showtime.objects.bulk_update(showtimes, ['end_time'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0015_movie_tmdb_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='showtime',
+            name='end_time',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_end_times, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0016_showtime_end_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='rating',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-trending_score', 'id'], name='movie_trending_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:16
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+from reservation.occupancy import SeatBitmap
+
+
+def fill_seat_counts(apps, schema_editor):
+    Showtime = apps.get_model('reservation', 'Showtime')
+    Seat = apps.get_model('reservation', 'Seat')
+    capacities = dict(
+        Seat.objects.filter(
+            row_number__gte=1, row_number__lte=models.F('theater__rows'),
+            seat_number__gte=1, seat_number__lte=models.F('theater__seats_per_row'),
+        ).order_by().values('theater_id').annotate(seats=models.Count('id')).values_list('theater_id', 'seats')
+    )
+    showtimes = list(Showtime.objects.select_related('theater').only(
+        'theater_id', 'seat_occupancy', 'theater__rows', 'theater__seats_per_row',
+    ))
+    for showtime in showtimes:
+        theater = showtime.theater
+        showtime.capacity = capacities.get(theater.pk, 0)
+        try:
+            showtime.seats_reserved = SeatBitmap.from_bytes(showtime.seat_occupancy, theater.rows, theater.seats_per_row).count()
+        except ValueError:
+            # Stale bitmap; count the booked seats inside the grid instead
+            showtime.seats_reserved = Seat.objects.filter(
+                reservation__showtime=showtime, reservation__is_cancelled=False,
+                row_number__gte=1, row_number__lte=theater.rows,
+                seat_number__gte=1, seat_number__lte=theater.seats_per_row,
+            ).distinct().count()
+    Showtime.objects.bulk_update(showtimes, ['capacity', 'seats_reserved'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0017_movie_trending_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='showtime',
+            name='capacity',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='showtime',
+            name='seats_reserved',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_seat_counts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='showtime',
+            index=models.Index(django.db.models.expressions.CombinedExpression(models.F('capacity'), '-', models.F('seats_reserved')), models.F('id'), name='showtime_available_idx'),
+        ),
+    ]
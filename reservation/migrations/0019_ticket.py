@@ -0,0 +1,94 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+ACTIVE = 1
+CANCELLED = 2
+
+
+def copy_seats_to_tickets(apps, schema_editor):
+    Reservation = apps.get_model('reservation', 'Reservation')
+    Ticket = apps.get_model('reservation', 'Ticket')
+    rows = (
+        Reservation.selected_seats.through.objects
+        .order_by('reservation__showtime_id', 'reservation_id', 'seat_id')
+        .values_list('reservation_id', 'seat_id', 'reservation__showtime_id', 'reservation__is_cancelled')
+        .iterator(chunk_size=5000)
+    )
+    batch, taken, current = [], set(), None
+    for reservation_id, seat_id, showtime_id, is_cancelled in rows:
+        if showtime_id != current:
+            taken, current = set(), showtime_id
+        # Double bookings from before the seat bitmap keep their first booking active
+        active = not is_cancelled and seat_id not in taken
+        if active:
+            taken.add(seat_id)
+        batch.append(Ticket(
+            reservation_id=reservation_id, seat_id=seat_id, showtime_id=showtime_id,
+            status=ACTIVE if active else CANCELLED,
+        ))
+        if len(batch) >= 5000:
+            Ticket.objects.bulk_create(batch)
+            batch = []
+    Ticket.objects.bulk_create(batch)
+
+
+def drop_seat_table(apps, schema_editor):
+    Reservation = apps.get_model('reservation', 'Reservation')
+    schema_editor.delete_model(Reservation.selected_seats.through)
+
+
+def restore_seat_table(apps, schema_editor):
+    Reservation = apps.get_model('reservation', 'Reservation')
+    Ticket = apps.get_model('reservation', 'Ticket')
+    Through = Reservation.selected_seats.through
+    schema_editor.create_model(Through)
+    Through.objects.bulk_create(
+        (Through(reservation_id=reservation_id, seat_id=seat_id)
+         for reservation_id, seat_id in Ticket.objects.values_list('reservation_id', 'seat_id').iterator(chunk_size=5000)),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0018_showtime_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ticket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'Active'), (2, 'Cancelled')], default=1)),
+                ('reservation', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tickets', to='reservation.reservation')),
+                ('seat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tickets', to='reservation.seat')),
+                ('showtime', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tickets', to='reservation.showtime')),
+            ],
+        ),
+        migrations.RunPython(copy_seats_to_tickets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ticket',
+            constraint=models.UniqueConstraint(fields=('reservation', 'seat'), name='ticket_reservation_seat_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='ticket',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 1)), fields=('showtime', 'seat'), name='ticket_active_seat_uniq'),
+        ),
+        # Django can't turn an auto-created M2M table into a through model, so the
+        # state switches to Ticket while the database drops the old table
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='reservation',
+                    name='selected_seats',
+                    field=models.ManyToManyField(through='reservation.Ticket', to='reservation.seat'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(drop_seat_table, restore_seat_table),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0019_ticket'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['duration'], name='movie_duration_idx'),
+        ),
+    ]
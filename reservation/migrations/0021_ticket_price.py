@@ -0,0 +1,28 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_showtime_prices(apps, schema_editor):
+    # The price paid wasn't recorded before, so existing tickets get their showtime's current price
+    Showtime = apps.get_model('reservation', 'Showtime')
+    Ticket = apps.get_model('reservation', 'Ticket')
+    Ticket.objects.update(price=Subquery(Showtime.objects.filter(pk=OuterRef('showtime_id')).values('price')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0020_movie_duration_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_showtime_prices, migrations.RunPython.noop),
+    ]
@@ -1,30 +1,43 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models import Avg
 from django.utils import timezone
-from django.core.files import File
-from io import BytesIO
 import uuid
-import qrcode
+from datetime import timedelta
 from PIL import Image
 import os
 
+from .occupancy import SeatBitmap
+
 class Movie(models.Model):
-    title = models.CharField(max_length=255)
+    title = models.CharField(max_length=255, db_index=True)
     description = models.TextField()
     duration = models.IntegerField()  # in minutes
     poster_path = models.CharField(max_length=255, blank=True, null=True)
-    release_date = models.DateField(null=True, blank=True)
+    release_date = models.DateField(null=True, blank=True, db_index=True)
     genres = models.CharField(max_length=255, blank=True, null=True)
+    # Set for movies imported by fetch_movie_posters, which upserts on it
+    tmdb_id = models.PositiveIntegerField(unique=True, null=True, blank=True, editable=False)
+    # Running totals of Rating.rating, maintained by reservation.ratings
+    rating_sum = models.IntegerField(default=0, editable=False)
+    rating_count = models.IntegerField(default=0, editable=False)
+    # Time-decayed booking and rating activity, maintained by reservation.trending
+    trending_score = models.FloatField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # /movies/trending/ reads the top of this index
+            models.Index(fields=['-trending_score', 'id'], name='movie_trending_idx'),
+            # Bounds showtime overlap checks (reservation.scheduling.longest_running_time)
+            models.Index(fields=['duration'], name='movie_duration_idx'),
+        ]
     
     def __str__(self):
         return self.title
 
     @property
     def average_rating(self):
-        avg_rating = self.ratings.aggregate(Avg('rating')).get('rating__avg')
-        return avg_rating if avg_rating is not None else 0
+        return self.rating_sum / self.rating_count if self.rating_count else 0
 
 class Theater(models.Model):
     name = models.CharField(max_length=255)
@@ -35,6 +48,25 @@ class Theater(models.Model):
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def capacities(theater_ids):
+        """{theater_id: seats inside its rows x seats_per_row grid} in one query"""
+        rows = (
+            Seat.objects.filter(
+                theater__in=theater_ids,
+                row_number__gte=1, row_number__lte=models.F('theater__rows'),
+                seat_number__gte=1, seat_number__lte=models.F('theater__seats_per_row'),
+            )
+            .order_by()
+            .values('theater_id')
+            .annotate(seats=models.Count('id'))
+        )
+        capacities = {row['theater_id']: row['seats'] for row in rows}
+        return {theater_id: capacities.get(theater_id, 0) for theater_id in theater_ids}
+
+    def capacity(self):
+        return Theater.capacities([self.pk])[self.pk]
+
 class Seat(models.Model):
     theater = models.ForeignKey(Theater, on_delete=models.CASCADE)
     row_number = models.IntegerField()
@@ -48,33 +80,100 @@ class Seat(models.Model):
         return f"{self.theater.name} - Row {self.row_number}, Seat {self.seat_number}"
 
 class Showtime(models.Model):
+    # Written only by reservation.booking, under the showtime's row lock
+    BOOKING_FIELDS = ('seat_occupancy', 'seats_reserved', 'seat_version')
+
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
     theater = models.ForeignKey(Theater, on_delete=models.CASCADE, default=1) # Set default back
-    show_time = models.DateTimeField()
+    show_time = models.DateTimeField(db_index=True)
+    # show_time plus the movie's running time, kept by save() and reservation.scheduling
+    end_time = models.DateTimeField(null=True, blank=True, editable=False)
     price = models.DecimalField(max_digits=5, decimal_places=2, default=10.00)
+    # Packed SeatBitmap of taken seats, maintained by reservation.booking
+    seat_occupancy = models.BinaryField(blank=True, default=b'', editable=False)
+    # Bumped on every booking write; also serves as the showtime's row lock
+    seat_version = models.PositiveIntegerField(default=0, editable=False)
+    # Bookable seats in the theater, and how many of them are taken (the bitmap's
+    # popcount); kept by save(), reservation.provisioning and reservation.booking
+    capacity = models.PositiveIntegerField(default=0, editable=False)
+    seats_reserved = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Overlap checks when scheduling into a theater
+            models.Index(fields=['theater', 'show_time'], name='showtime_theater_time_idx'),
+            # Showtimes for a movie (?movie_id=)
+            models.Index(fields=['movie', 'show_time'], name='showtime_movie_time_idx'),
+            # Filtering and sorting by free seats (?available=, ?min_seats=, ?ordering=-seats_available)
+            models.Index(models.F('capacity') - models.F('seats_reserved'), models.F('id'), name='showtime_available_idx'),
+        ]
 
     def __str__(self):
         return f"{self.movie.title} at {self.show_time} in {self.theater.name}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding:
+            # A full save would write back booking state loaded before a concurrent booking
+            update_fields = kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.BOOKING_FIELDS
+            ]
+        if update_fields is None or {'show_time', 'movie'} & set(update_fields):
+            self.end_time = self.show_time + timedelta(minutes=self.movie.duration)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'end_time'}
+        if update_fields is None or 'theater' in update_fields:
+            self.capacity = self.theater.capacity()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'capacity'}
+        super().save(*args, **kwargs)
+
+    def occupancy(self):
+        """Return the seat bitmap for this showtime, rebuilding it if the stored one is stale"""
+        theater = self.theater
+        try:
+            return SeatBitmap.from_bytes(self.seat_occupancy, theater.rows, theater.seats_per_row)
+        except ValueError:
+            return self.build_occupancy()
+
+    def build_occupancy(self):
+        """Build the seat bitmap from the active tickets"""
+        theater = self.theater
+        bitmap = SeatBitmap(theater.rows, theater.seats_per_row)
+        # Active tickets are unique per seat, so no DISTINCT, and no join through Reservation
+        positions = Seat.objects.filter(
+            tickets__showtime=self,
+            tickets__status=Ticket.Status.ACTIVE,
+            row_number__gte=1,
+            row_number__lte=theater.rows,
+            seat_number__gte=1,
+            seat_number__lte=theater.seats_per_row,
+        ).values_list('row_number', 'seat_number')
+        bitmap.take(positions)
+        return bitmap
+
 class Reservation(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     showtime = models.ForeignKey(Showtime, on_delete=models.CASCADE)
-    selected_seats = models.ManyToManyField(Seat)
-    qr_code = models.ImageField(upload_to='qr_codes/', blank=True, null=True)
+    # One Ticket row per seat; reservation.booking writes them with the showtime filled in
+    selected_seats = models.ManyToManyField(Seat, through='Ticket')
     booking_reference = models.CharField(max_length=12, unique=True, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True)
     is_cancelled = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # A user's bookings, newest first
+            models.Index(fields=['user', 'created_at'], name='reservation_user_time_idx'),
+            # Active reservations for a showtime
+            models.Index(fields=['showtime', 'is_cancelled'], name='reservation_active_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.booking_reference:
             self.booking_reference = self.generate_booking_reference()
         super().save(*args, **kwargs)
-        # Generate QR code after the reservation is fully saved with seats
-        if not self.qr_code and self.pk:
-            try:
-                self.generate_qr_code()
-            except Exception as e:
-                print(f"Error generating QR code: {e}")
     
     def generate_booking_reference(self):
         """Generate a unique booking reference"""
@@ -82,39 +181,6 @@ class Reservation(models.Model):
         import string
         return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
     
-    def generate_qr_code(self):
-        """Generate QR code for the reservation"""
-        qr_data = {
-            'booking_ref': self.booking_reference,
-            'movie': self.showtime.movie.title,
-            'theater': self.showtime.theater.name,
-            'showtime': self.showtime.show_time.isoformat(),
-            'user': self.user.username
-        }
-        
-        qr_text = f"Booking: {self.booking_reference}\nMovie: {self.showtime.movie.title}\nTheater: {self.showtime.theater.name}\nShow: {self.showtime.show_time.strftime('%Y-%m-%d %H:%M')}\nUser: {self.user.username}"
-        
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_text)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Save to BytesIO
-        blob = BytesIO()
-        img.save(blob, 'PNG')
-        blob.seek(0)
-        
-        # Save to model
-        filename = f'qr_{self.booking_reference}.png'
-        self.qr_code.save(filename, File(blob), save=False)
-        super().save(update_fields=['qr_code'])
-    
     @property
     def total_seats(self):
         return self.selected_seats.count()
@@ -125,16 +191,59 @@ class Reservation(models.Model):
     
     @property
     def seat_numbers(self):
-        seats = self.selected_seats.all().order_by('row_number', 'seat_number')
+        # Sorted in Python so a prefetched selected_seats is reused
+        seats = sorted(self.selected_seats.all(), key=lambda seat: (seat.row_number, seat.seat_number))
         return [f"{chr(64 + seat.row_number)}{seat.seat_number}" for seat in seats]
 
     def __str__(self):
         return f"{self.booking_reference} - {self.user.username}'s reservation for {self.showtime}"
 
+class Ticket(models.Model):
+    """A seat of a reservation, carrying its showtime so seat lookups skip the reservation table"""
+
+    class Status(models.IntegerChoices):
+        ACTIVE = 1
+        CANCELLED = 2
+
+    # Covered by the (reservation, seat) constraint
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, related_name='tickets', db_index=False)
+    showtime = models.ForeignKey(Showtime, on_delete=models.CASCADE, related_name='tickets')
+    seat = models.ForeignKey(Seat, on_delete=models.CASCADE, related_name='tickets')
+    status = models.PositiveSmallIntegerField(choices=Status.choices, default=Status.ACTIVE)
+    # What the seat was sold for; the showtime's price may change afterwards
+    price = models.DecimalField(max_digits=5, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reservation', 'seat'], name='ticket_reservation_seat_uniq'),
+            # A seat can be sold once per showtime (status 1 is ACTIVE); the partial
+            # index also answers "which seats are taken" from the index alone
+            models.UniqueConstraint(
+                fields=['showtime', 'seat'], condition=models.Q(status=1), name='ticket_active_seat_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.seat} for {self.showtime_id} ({self.get_status_display()})"
+
 class Rating(models.Model):
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='ratings')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    created_at = models.DateTimeField(auto_now_add=True, null=True)
 
     class Meta:
         unique_together = ('movie', 'user')
+
+class DailySales(models.Model):
+    """Seats sold and revenue per showtime per booking day, maintained by reservation.booking"""
+    date = models.DateField()
+    showtime = models.ForeignKey(Showtime, on_delete=models.CASCADE, related_name='daily_sales')
+    seats = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'showtime')
+
+    def __str__(self):
+        return f"{self.date} - {self.showtime}: {self.seats} seats"
@@ -0,0 +1,79 @@
+import struct
+
+# Number of set bits for every possible byte value
+_POPCOUNT = bytes(bin(value).count('1') for value in range(256))
+
+# Stored bitmaps start with the grid dimensions so a resized theater is detected
+_HEADER = struct.Struct('>HH')
+
+
+class SeatBitmap:
+    """Bit-per-seat occupancy grid for a single showtime.
+
+    Seat (row_number, seat_number) maps to bit
+    (row_number - 1) * seats_per_row + (seat_number - 1), using the
+    theater's rows/seats_per_row grid.
+    """
+
+    def __init__(self, rows, seats_per_row, bits=None):
+        self.rows = rows
+        self.seats_per_row = seats_per_row
+        size = (rows * seats_per_row + 7) // 8
+        if bits is None:
+            bits = bytearray(size)
+        elif len(bits) != size:
+            raise ValueError('Bitmap size does not match the theater grid.')
+        self._bits = bytearray(bits)
+
+    @classmethod
+    def from_bytes(cls, data, rows, seats_per_row):
+        """Load a stored bitmap, raising ValueError if it was built for another grid"""
+        data = bytes(data or b'')
+        if len(data) < _HEADER.size:
+            raise ValueError('Bitmap is empty.')
+        stored_rows, stored_seats_per_row = _HEADER.unpack_from(data)
+        if (stored_rows, stored_seats_per_row) != (rows, seats_per_row):
+            raise ValueError('Bitmap was built for a different theater grid.')
+        return cls(rows, seats_per_row, data[_HEADER.size:])
+
+    def to_bytes(self):
+        return _HEADER.pack(self.rows, self.seats_per_row) + bytes(self._bits)
+
+    def bits(self):
+        """The packed bits without the grid header"""
+        return bytes(self._bits)
+
+    def index(self, row_number, seat_number):
+        if not (1 <= row_number <= self.rows and 1 <= seat_number <= self.seats_per_row):
+            raise ValueError(f'Seat ({row_number}, {seat_number}) is outside the theater grid.')
+        return (row_number - 1) * self.seats_per_row + (seat_number - 1)
+
+    def is_taken(self, row_number, seat_number):
+        bit = self.index(row_number, seat_number)
+        return bool(self._bits[bit >> 3] & (1 << (bit & 7)))
+
+    def any_taken(self, positions):
+        return any(self.is_taken(row, seat) for row, seat in positions)
+
+    def take(self, positions):
+        for row, seat in positions:
+            bit = self.index(row, seat)
+            self._bits[bit >> 3] |= 1 << (bit & 7)
+
+    def release(self, positions):
+        for row, seat in positions:
+            bit = self.index(row, seat)
+            self._bits[bit >> 3] &= ~(1 << (bit & 7)) & 0xFF
+
+    def taken_positions(self):
+        """Yield (row_number, seat_number) for every taken seat, in grid order"""
+        for byte_index, byte in enumerate(self._bits):
+            if not byte:
+                continue
+            for offset in range(8):
+                if byte & (1 << offset):
+                    bit = (byte_index << 3) + offset
+                    yield bit // self.seats_per_row + 1, bit % self.seats_per_row + 1
+
+    def count(self):
+        return sum(_POPCOUNT[byte] for byte in self._bits)
@@ -0,0 +1,146 @@
+import json
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination
+
+
+def requested_ordering(request, view):
+    """Resolve ?ordering= against the view's ordering_options, which only list indexed orderings"""
+    options = view.ordering_options
+    name = request.query_params.get('ordering') or view.default_ordering
+    if name not in options:
+        raise ValidationError({'ordering': f"Must be one of: {', '.join(options)}."})
+    return options[name]
+
+
+def parse_bound(request, param, end=False):
+    """Parse a date or datetime query parameter into an aware datetime.
+
+    A bare date used as an end bound covers the whole day, so the returned
+    value is the start of the following day and should be compared with lt.
+    """
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+        if day is not None:
+            if end:
+                day += timedelta(days=1)
+            moment = datetime.combine(day, time.min)
+        else:
+            moment = parse_datetime(value)
+            if moment is None:
+                raise ValueError
+    except ValueError:
+        raise ValidationError({param: 'Must be a date (YYYY-MM-DD) or an ISO 8601 datetime.'})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_date_param(request, param):
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValidationError({param: 'Must be a date (YYYY-MM-DD).'})
+    return day
+
+
+class OptionalCursorPagination(CursorPagination):
+    """Cursor pagination that is only applied when the client asks for it.
+
+    Clients that expect a plain list (the current frontend) keep getting
+    one. Passing ?page_size= or ?cursor= returns {next, previous, results}
+    pages whose cost depends on the page size, not on the table size.
+
+    DRF's cursor only stores the first ordering field and falls back to an
+    OFFSET past rows that tie on it. Here the cursor stores the whole
+    ordering, which always ends in a unique column, so every page starts
+    with an index seek.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    @classmethod
+    def wants_page(cls, request):
+        params = request.query_params
+        return cls.cursor_query_param in params or cls.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.wants_page(request):
+            return None
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        queryset = queryset.order_by(*(reversed_ordering(self.ordering) if reverse else self.ordering))
+        if current_position is not None:
+            queryset = queryset.filter(self._after(current_position, reverse))
+
+        # One extra row tells whether there is a following page
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = self._get_position_from_instance(results[-1], self.ordering) if has_following_position else None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _after(self, position, reverse):
+        """Rows past the cursor: (a, b) > (pa, pb) spelled as a >= pa AND (a > pa OR (a = pa AND b > pb))"""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            values = None
+        if not isinstance(values, list) or len(values) != len(self.ordering) or None in values:
+            raise NotFound(self.invalid_cursor_message)
+
+        fields = [(field.lstrip('-'), 'lt' if reverse != field.startswith('-') else 'gt') for field in self.ordering]
+        condition = None
+        for (name, lookup), value in reversed(list(zip(fields, values))):
+            past = Q(**{f'{name}__{lookup}': value})
+            condition = past if condition is None else past | (Q(**{name: value}) & condition)
+        # The leading bound lets the database seek the index instead of testing every row
+        name, lookup = fields[0]
+        return Q(**{f'{name}__{lookup}e': values[0]}) & condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(None if value is None else str(value))
+        return json.dumps(values)
+
+    def get_ordering(self, request, queryset, view):
+        return requested_ordering(request, view)
+
+
+def reversed_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
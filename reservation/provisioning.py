@@ -0,0 +1,116 @@
+from django.db import transaction
+from django.db.models import F, Q
+
+from .booking import rebuild_occupancy
+from .models import Seat, Showtime, Theater, Ticket
+from .response_cache import SHOWTIMES, THEATERS, invalidate
+
+
+# Largest grid accepted from the API; every seat is a row, created in one bulk insert
+MAX_ROWS = 100
+MAX_SEATS_PER_ROW = 200
+
+
+class ProvisioningError(Exception):
+    """Raised when a theater's seat grid can't be changed as requested"""
+
+
+def grid_positions(rows, seats_per_row):
+    return [(row, number) for row in range(1, rows + 1) for number in range(1, seats_per_row + 1)]
+
+
+def _outside_grid(theater):
+    return Seat.objects.filter(theater=theater).filter(
+        Q(row_number__lt=1) | Q(row_number__gt=theater.rows) |
+        Q(seat_number__lt=1) | Q(seat_number__gt=theater.seats_per_row)
+    )
+
+
+def provision_seats(theater):
+    """Make the theater's Seat rows match its rows x seats_per_row grid.
+
+    Missing seats are added with one bulk insert and seats outside the grid
+    are removed with one bulk delete, so a theater of any size takes a
+    handful of queries. Seats that are part of an active reservation are
+    never removed. Returns (created, deleted).
+    """
+    with transaction.atomic():
+        outside = _outside_grid(theater)
+        booked = outside.filter(tickets__status=Ticket.Status.ACTIVE).distinct().count()
+        if booked:
+            raise ProvisioningError(
+                f'{booked} seat(s) outside the new {theater.rows}x{theater.seats_per_row} grid are booked; '
+                'cancel those reservations first.'
+            )
+        deleted = outside.delete()[1].get(Seat._meta.label, 0)
+
+        existing = set(Seat.objects.filter(theater=theater).order_by().values_list('row_number', 'seat_number'))
+        missing = [
+            Seat(theater_id=theater.pk, row_number=row, seat_number=number)
+            for row, number in grid_positions(theater.rows, theater.seats_per_row)
+            if (row, number) not in existing
+        ]
+        # ignore_conflicts keeps concurrent provisioning of the same theater from failing
+        Seat.objects.bulk_create(missing, ignore_conflicts=True)
+        refresh_capacity(theater)
+    return len(missing), deleted
+
+
+def remove_seat(seat):
+    """Delete one seat unless it is part of an active reservation, then update the showtime capacities"""
+    with transaction.atomic():
+        if Ticket.objects.filter(seat=seat, status=Ticket.Status.ACTIVE).exists():
+            raise ProvisioningError('This seat is booked; cancel those reservations first.')
+        theater = seat.theater
+        seat.delete()
+        refresh_capacity(theater)
+
+
+def refresh_capacity(theater):
+    """Store the theater's current seat count on all of its showtimes after its seats changed.
+
+    seat_version is bumped too, since it is what tells seat map clients
+    that their copy of the grid is stale.
+    """
+    capacity = theater.capacity()
+    if Showtime.objects.filter(theater=theater).update(capacity=capacity, seat_version=F('seat_version') + 1):
+        invalidate(SHOWTIMES)
+
+
+def resize_theater(theater, rows, seats_per_row):
+    """Change a theater's grid, then its seats and the occupancy bitmaps of its showtimes"""
+    with transaction.atomic():
+        theater.rows = rows
+        theater.seats_per_row = seats_per_row
+        theater.save(update_fields=['rows', 'seats_per_row'])
+        result = provision_seats(theater)
+        rebuild_theater_occupancy(theater)
+    return result
+
+
+def rebuild_theater_occupancy(theater):
+    """Re-pack every showtime bitmap of a theater after its grid changed"""
+    for showtime in Showtime.objects.filter(theater=theater).only('pk'):
+        rebuild_occupancy(showtime)
+
+
+def provision_theaters(specs, address=''):
+    """Create theaters and all of their seats in bulk.
+
+    specs is an iterable of (name, rows, seats_per_row). Theaters go in
+    with one bulk insert and their seats with another, however many
+    screens there are. Needs a backend that returns ids from bulk inserts
+    (SQLite 3.35+, PostgreSQL).
+    """
+    with transaction.atomic():
+        theaters = Theater.objects.bulk_create([
+            Theater(name=name, address=address, rows=rows, seats_per_row=seats_per_row)
+            for name, rows, seats_per_row in specs
+        ])
+        Seat.objects.bulk_create([
+            Seat(theater_id=theater.pk, row_number=row, seat_number=number)
+            for theater in theaters
+            for row, number in grid_positions(theater.rows, theater.seats_per_row)
+        ], batch_size=5000, ignore_conflicts=True)
+        invalidate(THEATERS)
+    return theaters
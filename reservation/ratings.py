@@ -0,0 +1,57 @@
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import Movie, Rating
+from .response_cache import MOVIES, TRENDING, invalidate
+from .trending import decay, rating_points
+
+
+def adjust_movie_rating(movie_id, rating_delta, count_delta, rated_at=None):
+    """Apply a change to a movie's stored rating totals and trending score in a single UPDATE.
+
+    rated_at is when the rating was first made; its trending points have
+    decayed since, as they have in rebuild_trending_scores.
+    """
+    weight = decay(rated_at) if rated_at else 1
+    Movie.objects.filter(pk=movie_id).update(
+        rating_sum=F('rating_sum') + rating_delta,
+        rating_count=F('rating_count') + count_delta,
+        trending_score=F('trending_score') + rating_points(rating_delta) * weight,
+    )
+    invalidate(MOVIES, TRENDING)
+
+
+def save_rating(serializer):
+    """Save a RatingSerializer and keep the rated movies' totals in step"""
+    with transaction.atomic():
+        previous = None
+        if serializer.instance is not None:
+            previous = Rating.objects.select_for_update().get(pk=serializer.instance.pk)
+        rating = serializer.save()
+        if previous is not None:
+            adjust_movie_rating(previous.movie_id, -previous.rating, -1, previous.created_at)
+        adjust_movie_rating(rating.movie_id, rating.rating, 1, rating.created_at)
+    return rating
+
+
+def delete_rating(rating):
+    with transaction.atomic():
+        adjust_movie_rating(rating.movie_id, -rating.rating, -1, rating.created_at)
+        rating.delete()
+
+
+def rebuild_movie_ratings():
+    """Recompute every movie's rating totals from the Rating table"""
+    totals = {
+        row['movie']: row
+        for row in Rating.objects.values('movie').annotate(total=Sum('rating'), count=Count('id'))
+    }
+    movies = list(Movie.objects.only('id', 'rating_sum', 'rating_count'))
+    for movie in movies:
+        row = totals.get(movie.pk)
+        movie.rating_sum = row['total'] if row else 0
+        movie.rating_count = row['count'] if row else 0
+    with transaction.atomic():
+        Movie.objects.bulk_update(movies, ['rating_sum', 'rating_count'], batch_size=1000)
+        invalidate(MOVIES)
+    return len(movies)
@@ -0,0 +1,216 @@
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework.renderers import JSONRenderer
+
+# Groups of cached responses, each invalidated as a whole when its data changes
+MOVIES = 'movies'
+THEATERS = 'theaters'
+SHOWTIMES = 'showtimes'
+TRENDING = 'trending'
+
+# Bump when the cached entry layout changes
+CACHE_FORMAT = 1
+
+
+class ResponseCacheStats:
+    """Per-process hit and miss counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.not_modified = 0
+            self.invalidations = 0
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+stats = ResponseCacheStats()
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def get_version_cache():
+    """Where namespace versions live; must be shared by every process serving requests"""
+    return caches[getattr(settings, 'RESPONSE_CACHE_VERSIONS_ALIAS', None) or getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _version_key(namespace):
+    return f'response-version:{namespace}'
+
+
+def _bump(namespaces):
+    cache = get_version_cache()
+    keys = [_version_key(namespace) for namespace in namespaces]
+    current = cache.get_many(keys)
+    now = time.time_ns()
+    # Versions double as Last-Modified times, and must move forward even within one clock tick
+    cache.set_many({key: max(now, current.get(key, 0) + 1) for key in keys}, timeout=None)
+    stats.count('invalidations')
+
+
+def invalidate(*namespaces):
+    """Drop every cached response that depends on the given namespaces.
+
+    Entries are keyed by namespace version, so bumping the shared version
+    is enough and works on any cache backend, even one that is per
+    process. Inside a transaction the versions are only bumped on commit,
+    since no other connection can read the new rows before then.
+    """
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        _bump_on_commit(connection, namespaces)
+    else:
+        _bump(namespaces)
+
+
+def _bump_on_commit(connection, namespaces):
+    """Bump the namespaces once the current transaction commits.
+
+    Namespaces wait in a set on the connection that the first callback to
+    run empties, so the shared version cache is written once per commit.
+    Each call registers its own callback because a savepoint rollback drops
+    the ones registered inside it; callbacks that find the set empty do
+    nothing.
+    """
+    pending = getattr(connection, 'response_cache_pending', None)
+    if pending is None:
+        pending = connection.response_cache_pending = set()
+    pending.update(namespaces)
+
+    def bump():
+        pending = connection.response_cache_pending
+        connection.response_cache_pending = None
+        if pending:
+            _bump(pending)
+
+    transaction.on_commit(bump)
+
+
+def _versions(cache, namespaces):
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            now = time.time_ns()
+            cache.add(key, now, timeout=None)
+            # Another process may have added it first; the dummy backend stores nothing
+            versions[key] = cache.get(key, now)
+    return [versions[key] for key in keys]
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return etag in parse_etags(if_none_match) or if_none_match.strip() == '*'
+    if last_modified is None:
+        return False
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+def serve(request, namespaces, build, follows_bookings=False):
+    """Return the JSON response for request from the cache, building it with build() on a miss.
+
+    Bookings don't invalidate anything, so responses that show seat counts
+    or booking activity (follows_bookings) are only kept for
+    RESPONSE_CACHE_BOOKING_TTL seconds and carry no Last-Modified.
+    """
+    if request.method != 'GET' or request.accepted_renderer.format != 'json':
+        return build()
+
+    cache = get_cache()
+    versions = _versions(get_version_cache(), namespaces)
+    key_source = repr((CACHE_FORMAT, namespaces, versions, request.build_absolute_uri()))
+    key = 'response:' + hashlib.sha256(key_source.encode()).hexdigest()
+
+    response = None
+    entry = cache.get(key)
+    if entry is not None:
+        stats.count('hits')
+        content, etag = entry
+    else:
+        stats.count('misses')
+        response = build()
+        if response.status_code != 200:
+            return response
+        content = JSONRenderer().render(response.data)
+        etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+        if follows_bookings:
+            cache.set(key, (content, etag), timeout=getattr(settings, 'RESPONSE_CACHE_BOOKING_TTL', 10))
+        else:
+            cache.set(key, (content, etag))
+
+    last_modified = None if follows_bookings else max(versions) // 1_000_000_000
+    if _not_modified(request, etag, last_modified):
+        stats.count('not_modified')
+        response = HttpResponseNotModified()
+    elif response is None:
+        # Hits skip serialization and rendering altogether
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Cheap to revalidate, and admins expect edits to show up straight away
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def cached_response(*namespaces, follows_bookings=False):
+    """Cache a viewset method's JSON responses until one of the namespaces is invalidated"""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            return serve(request, namespaces, lambda: method(self, request, *args, **kwargs), follows_bookings)
+        return wrapper
+    return decorator
+
+
+# Namespace each model's rows are cached under; views that nest related
+# objects (showtimes nest movies and theaters) list several namespaces
+NAMESPACES = {
+    'Movie': MOVIES,
+    'Rating': MOVIES,  # average_rating
+    'Theater': THEATERS,
+    'Showtime': SHOWTIMES,
+}
+
+
+def _model_changed(sender, **kwargs):
+    invalidate(NAMESPACES[sender.__name__])
+
+
+def connect_signals():
+    """Invalidate on model saves and deletes; bulk writes call invalidate() themselves"""
+    from .models import Movie, Rating, Showtime, Theater
+    for model in (Movie, Rating, Showtime, Theater):
+        post_save.connect(_model_changed, sender=model, dispatch_uid=f'response_cache_{model.__name__}_save')
+        post_delete.connect(_model_changed, sender=model, dispatch_uid=f'response_cache_{model.__name__}_delete')
@@ -0,0 +1,230 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import Movie, Showtime, Theater
+from .occupancy import SeatBitmap
+from .response_cache import SHOWTIMES, invalidate
+
+
+class ScheduleConflict(Exception):
+    def __init__(self, message='Showtime conflicts with an existing showtime in this theater.'):
+        super().__init__(message)
+
+
+def cleaning_buffer():
+    """Time a theater stays blocked after each showing ends"""
+    return timedelta(minutes=getattr(settings, 'SHOWTIME_CLEANING_BUFFER_MINUTES', 0))
+
+
+def end_time_for(movie, show_time):
+    return show_time + timedelta(minutes=movie.duration)
+
+
+def longest_running_time():
+    """Duration of the longest movie, read from the top of movie_duration_idx"""
+    longest = Movie.objects.aggregate(longest=Max('duration'))['longest'] or 0
+    return timedelta(minutes=longest)
+
+
+def conflicting_showtimes(theater_id, show_time, end_time, exclude_pk=None, longest=None):
+    """Showtimes in a theater whose blocked interval overlaps [show_time, end_time) plus the buffer.
+
+    No showtime runs longer than the longest movie, so anything still
+    running at show_time started at most that long before it. The query
+    reads that range of the (theater, show_time) index. Showtimes that
+    already overlap each other, e.g. after a movie's running time grew,
+    are still found.
+    """
+    buffer = cleaning_buffer()
+    if longest is None:
+        longest = longest_running_time()
+    showtimes = Showtime.objects.filter(theater_id=theater_id)
+    if exclude_pk is not None:
+        showtimes = showtimes.exclude(pk=exclude_pk)
+    return showtimes.filter(
+        show_time__gte=show_time - longest - buffer,
+        show_time__lt=end_time + buffer,
+        end_time__gt=show_time - buffer,
+    )
+
+
+def check_showtime(theater_id, movie, show_time, exclude_pk=None):
+    """Raise ScheduleConflict if the movie can't be shown in the theater at show_time"""
+    end_time = end_time_for(movie, show_time)
+    if conflicting_showtimes(theater_id, show_time, end_time, exclude_pk).exists():
+        raise ScheduleConflict()
+    return end_time
+
+
+def validate_schedule(slots):
+    """Check a batch of proposed showtimes against each other and the existing schedule.
+
+    slots is a list of dicts with theater_id, movie (a Movie or its id) and
+    show_time. Each theater's proposed and existing intervals are sorted by
+    start and swept once while tracking the interval that ends last, so a
+    schedule of hundreds of showtimes costs one query per theater plus a
+    sort. Returns one result per slot, in order, with a conflict entry of
+    None, {'showtime': pk} or {'slot': index}.
+    """
+    buffer = cleaning_buffer()
+    movie_ids = {slot['movie'] for slot in slots if not isinstance(slot['movie'], Movie)}
+    durations = dict(Movie.objects.filter(pk__in=movie_ids).values_list('pk', 'duration'))
+
+    results = []
+    by_theater = defaultdict(list)
+    for index, slot in enumerate(slots):
+        movie = slot['movie']
+        duration = movie.duration if isinstance(movie, Movie) else durations.get(movie)
+        result = {'index': index, 'theater_id': slot['theater_id'], 'show_time': slot['show_time'], 'end_time': None, 'conflict': None}
+        if duration is None:
+            result['conflict'] = {'detail': 'Unknown movie.'}
+        else:
+            result['end_time'] = slot['show_time'] + timedelta(minutes=duration)
+            by_theater[slot['theater_id']].append((slot['show_time'], result['end_time'], 'slot', index))
+        results.append(result)
+
+    longest = longest_running_time() if by_theater else None
+    for theater_id, intervals in by_theater.items():
+        first_start = min(start for start, end, kind, key in intervals)
+        last_end = max(end for start, end, kind, key in intervals)
+        existing = conflicting_showtimes(theater_id, first_start, last_end, longest=longest).values_list('show_time', 'end_time', 'pk')
+        intervals += [(start, end, 'showtime', pk) for start, end, pk in existing]
+        # Existing showtimes sort before proposed ones starting at the same time
+        intervals.sort(key=lambda interval: (interval[0], interval[2] == 'slot'))
+
+        latest = None
+        for interval in intervals:
+            start, end, kind, key = interval
+            if latest is not None and start < latest[1] + buffer:
+                for this, other in ((interval, latest), (latest, interval)):
+                    if this[2] == 'slot' and results[this[3]]['conflict'] is None:
+                        results[this[3]]['conflict'] = {other[2]: other[3]}
+            if latest is None or end > latest[1]:
+                latest = interval
+    return results
+
+
+def refresh_end_times(movie):
+    """Recompute end_time for a movie's showtimes after its running time changed"""
+    updated = Showtime.objects.filter(movie=movie).update(end_time=F('show_time') + timedelta(minutes=movie.duration))
+    invalidate(SHOWTIMES)
+    return updated
+
+
+def slot_price(base_price, price_rules, day, slot_time):
+    """Apply price rules in order; each may match on weekdays (0 = Monday) and a slot time range"""
+    price = base_price
+    for rule in price_rules:
+        if rule.get('weekdays') and day.weekday() not in rule['weekdays']:
+            continue
+        if rule.get('from_time') and slot_time < rule['from_time']:
+            continue
+        if rule.get('to_time') and slot_time >= rule['to_time']:
+            continue
+        if rule.get('price') is not None:
+            price = rule['price']
+        if rule.get('add') is not None:
+            price += rule['add']
+    return price
+
+
+def _first_clash(intervals, start, end, buffer):
+    for other_start, other_end, kind, key in intervals:
+        if other_start < end + buffer and start < other_end + buffer:
+            return {kind: key}
+    return None
+
+
+def plan_schedule(movies, theaters, start_date, days, slot_times, price, price_rules=()):
+    """Pack movies into every theater's daily slot times without overlaps.
+
+    Movies rotate per theater and per day so screens show different films.
+    A slot gets the next movie in the rotation that fits around the
+    existing schedule and the slots already planned; a slot no movie fits
+    is reported as skipped with the clash that blocked the preferred movie.
+    Existing showtimes are read with one indexed query per theater.
+    """
+    buffer = cleaning_buffer()
+    slot_times = sorted(slot_times)
+    tz = timezone.get_current_timezone()
+    window_start = timezone.make_aware(datetime.combine(start_date, slot_times[0]), tz)
+    last_day = start_date + timedelta(days=days - 1)
+    longest = timedelta(minutes=max(movie.duration for movie in movies))
+    window_end = timezone.make_aware(datetime.combine(last_day, slot_times[-1]), tz) + longest
+
+    running = longest_running_time()
+    plan = []
+    for theater_index, theater in enumerate(theaters):
+        intervals = [
+            (start, end, 'showtime', pk)
+            for start, end, pk in conflicting_showtimes(theater.pk, window_start, window_end, longest=running).values_list('show_time', 'end_time', 'pk')
+        ]
+        for day_index in range(days):
+            day = start_date + timedelta(days=day_index)
+            rotation = theater_index + day_index * len(theaters)
+            for slot_time in slot_times:
+                show_time = timezone.make_aware(datetime.combine(day, slot_time), tz)
+                entry = {
+                    'theater': theater, 'date': day, 'slot': slot_time, 'show_time': show_time,
+                    'movie': None, 'end_time': None, 'price': None, 'status': 'skipped', 'conflict': None, 'showtime': None,
+                }
+                for offset in range(len(movies)):
+                    movie = movies[(rotation + offset) % len(movies)]
+                    end_time = end_time_for(movie, show_time)
+                    clash = _first_clash(intervals, show_time, end_time, buffer)
+                    if clash is None:
+                        entry.update(movie=movie, end_time=end_time, status='planned', conflict=None,
+                                     price=slot_price(price, price_rules, day, slot_time))
+                        intervals.append((show_time, end_time, 'slot', len(plan)))
+                        rotation += offset + 1
+                        break
+                    if entry['conflict'] is None:
+                        entry['conflict'] = clash
+                plan.append(entry)
+    return plan
+
+
+def create_schedule(plan):
+    """Insert every planned slot with one bulk_create in one transaction.
+
+    The theaters are locked and the plan re-checked first, so slots that
+    clash with showtimes added since planning are skipped, not inserted.
+    """
+    planned = [entry for entry in plan if entry['status'] == 'planned']
+    if not planned:
+        return []
+    with transaction.atomic():
+        theater_ids = sorted({entry['theater'].pk for entry in planned})
+        list(Theater.objects.select_for_update().filter(pk__in=theater_ids).values_list('pk', flat=True))
+        capacities = Theater.capacities(theater_ids)
+        results = validate_schedule([
+            {'theater_id': entry['theater'].pk, 'movie': entry['movie'], 'show_time': entry['show_time']}
+            for entry in planned
+        ])
+        showtimes = []
+        for entry, result in zip(planned, results):
+            if result['conflict'] is not None:
+                entry.update(status='skipped', conflict=result['conflict'])
+                continue
+            theater = entry['theater']
+            showtimes.append(Showtime(
+                movie=entry['movie'],
+                theater=theater,
+                show_time=entry['show_time'],
+                end_time=entry['end_time'],
+                price=entry['price'],
+                seat_occupancy=SeatBitmap(theater.rows, theater.seats_per_row).to_bytes(),
+                capacity=capacities[theater.pk],
+            ))
+        Showtime.objects.bulk_create(showtimes)
+        invalidate(SHOWTIMES)
+    created = iter(showtimes)
+    for entry in planned:
+        if entry['status'] == 'planned':
+            entry.update(status='created', showtime=next(created).pk)
+    return showtimes
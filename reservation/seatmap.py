@@ -0,0 +1,89 @@
+import base64
+import hashlib
+
+from .holds import hold_store
+from .models import Seat
+from .occupancy import SeatBitmap
+
+# Bump when the payload layout below changes so cached copies are revalidated
+SEATMAP_FORMAT = 1
+
+
+def seat_runs(seats):
+    """Compress (id, row_number, seat_number) rows in grid order into runs.
+
+    Each run is [row_number, first_seat_number, first_seat_id, length]:
+    `length` seats side by side in one row whose ids count up from
+    first_seat_id. Seat grids are created in bulk, so a hall usually
+    needs one run per row.
+    """
+    runs = []
+    for seat_id, row, number in seats:
+        if runs:
+            last = runs[-1]
+            if last[0] == row and last[1] + last[3] == number and last[2] + last[3] == seat_id:
+                last[3] += 1
+                continue
+        runs.append([row, number, seat_id, 1])
+    return runs
+
+
+def encode_bits(bitmap):
+    return base64.b64encode(bitmap.bits()).decode('ascii')
+
+
+def seatmap_etag(showtime, held_ids):
+    """ETag for a showtime's seat map, computed without touching the seat tables.
+
+    seat_version is bumped by every booking write, grid rebuild and seat
+    added or removed;
+    holds live in memory, so their seat ids go into the tag directly.
+    """
+    theater = showtime.theater
+    parts = [
+        SEATMAP_FORMAT, showtime.pk, showtime.seat_version, theater.rows, theater.seats_per_row,
+        theater.name, showtime.show_time.isoformat(), showtime.price, showtime.movie_id, showtime.movie.title,
+        sorted(held_ids),
+    ]
+    return '"%s"' % hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+
+def build_seatmap(showtime, held_ids=None):
+    """Everything the booking page needs for one showtime in a single compact payload.
+
+    taken and held are base64 bitsets over the theater grid: seat
+    (row, number) is bit (row - 1) * seats_per_row + (number - 1), least
+    significant bit first within each byte.
+    """
+    theater = showtime.theater
+    if held_ids is None:
+        held_ids = hold_store.held_seat_ids(showtime.pk)
+    held_ids = set(held_ids)
+
+    seats = list(
+        Seat.objects.filter(
+            theater_id=theater.pk,
+            row_number__gte=1,
+            row_number__lte=theater.rows,
+            seat_number__gte=1,
+            seat_number__lte=theater.seats_per_row,
+        ).order_by('row_number', 'seat_number').values_list('id', 'row_number', 'seat_number')
+    )
+    held = SeatBitmap(theater.rows, theater.seats_per_row)
+    held.take((row, number) for seat_id, row, number in seats if seat_id in held_ids)
+
+    return {
+        'showtime': {
+            'id': showtime.pk,
+            'show_time': showtime.show_time,
+            'price': str(showtime.price),
+            'movie': {'id': showtime.movie_id, 'title': showtime.movie.title},
+            'theater': {'id': theater.pk, 'name': theater.name},
+        },
+        'version': showtime.seat_version,
+        'rows': theater.rows,
+        'seats_per_row': theater.seats_per_row,
+        'seats': seat_runs(seats),
+        'taken': encode_bits(showtime.occupancy()),
+        'held': encode_bits(held),
+    }
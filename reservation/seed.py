@@ -0,0 +1,136 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Movie, Rating, Reservation, Seat, Showtime, Ticket
+from .occupancy import SeatBitmap
+from .provisioning import provision_theaters
+from .ratings import rebuild_movie_ratings
+from .response_cache import MOVIES, SHOWTIMES, THEATERS, invalidate
+from .stats import rebuild_daily_sales
+from .trending import rebuild_trending_scores
+
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Drama', 'Family', 'Fantasy', 'Horror', 'Romance', 'Science Fiction', 'Thriller']
+
+# Seat counts per reservation, weighted towards singles and pairs
+PARTY_SIZES = [1, 1, 1, 2, 2, 3, 4]
+
+
+def seed_database(movies=10000, theaters=1000, reservations=1000000, users=1000, ratings=100000,
+                  rows=10, seats_per_row=20, seed=0, batch_size=5000, progress=None):
+    """Fill an empty database with a synthetic catalog and booking history.
+
+    Everything is written with bulk inserts, and the derived data (seat
+    bitmaps, rating totals, the daily sales rollup and trending scores) is
+    rebuilt at the end, so the result looks like what the API would have
+    produced. Enough showtimes are created to fit every reservation at
+    about two-thirds occupancy. Returns the row counts and elapsed time.
+    """
+    rng = random.Random(seed)
+    began = time.perf_counter()
+    report = progress or (lambda message: None)
+    now = timezone.now()
+
+    catalog = Movie.objects.bulk_create([
+        Movie(
+            title=f'Seed Movie {index}',
+            description=f'Synthetic movie {index} for load testing.',
+            duration=rng.randint(80, 180),
+            release_date=(now + timedelta(days=rng.randint(-365, 60))).date(),
+            genres=', '.join(rng.sample(GENRES, 2)),
+        )
+        for index in range(movies)
+    ], batch_size=batch_size)
+    report(f'movies={len(catalog)}')
+
+    halls = provision_theaters([(f'Seed Hall {index}', rows, seats_per_row) for index in range(theaters)], address='Seed Street')
+    seats_by_hall = {}
+    for theater_id, seat_id, row, number in Seat.objects.filter(theater__in=halls).order_by().values_list('theater_id', 'id', 'row_number', 'seat_number'):
+        seats_by_hall.setdefault(theater_id, []).append((seat_id, row, number))
+    report(f'theaters={len(halls)} seats={sum(map(len, seats_by_hall.values()))}')
+
+    people = User.objects.bulk_create([
+        User(username=f'seed{index}', password='!') for index in range(users)
+    ], batch_size=batch_size)
+
+    # Showtimes three hours apart per hall never overlap, whatever the movie
+    capacity = rows * seats_per_row
+    needed = -(-reservations * 3 // capacity) if reservations else 0
+    count = max(theaters * 2, needed)
+    first = now.replace(minute=0, second=0, microsecond=0) - timedelta(days=3)
+    shows = []
+    for index in range(count):
+        movie = catalog[rng.randrange(len(catalog))]
+        show_time = first + timedelta(hours=3 * (index // len(halls)))
+        shows.append(Showtime(
+            movie=movie, theater=halls[index % len(halls)], show_time=show_time,
+            end_time=show_time + timedelta(minutes=movie.duration), price=rng.choice([8, 10, 12, 15]),
+            capacity=capacity,
+        ))
+    shows = Showtime.objects.bulk_create(shows, batch_size=batch_size)
+    report(f'showtimes={len(shows)}')
+
+    created = tickets = 0
+    for start in range(0, len(shows), max(1, batch_size // 100)):
+        batch = shows[start:start + max(1, batch_size // 100)]
+        bookings, parties = [], []
+        for offset, showtime in enumerate(batch):
+            index = start + offset
+            # Spread the reservations evenly over the showtimes
+            quota = reservations * (index + 1) // len(shows) - reservations * index // len(shows)
+            free = list(seats_by_hall[showtime.theater_id])
+            rng.shuffle(free)
+            bitmap = SeatBitmap(rows, seats_per_row)
+            for booked in range(quota):
+                # Leave at least one seat for each reservation still to place
+                size = max(1, min(rng.choice(PARTY_SIZES), len(free) - (quota - booked - 1)))
+                party = [free.pop() for _ in range(size)]
+                bitmap.take((row, number) for seat_id, row, number in party)
+                bookings.append(Reservation(
+                    user=people[rng.randrange(len(people))], showtime=showtime,
+                    booking_reference=f'SEED{created + len(bookings):08d}',
+                ))
+                parties.append(party)
+            showtime.seat_occupancy = bitmap.to_bytes()
+            showtime.seats_reserved = bitmap.count()
+            showtime.seat_version = quota
+        with transaction.atomic():
+            bookings = Reservation.objects.bulk_create(bookings, batch_size=batch_size)
+            sold = Ticket.objects.bulk_create([
+                Ticket(reservation_id=booking.pk, showtime_id=booking.showtime_id, seat_id=seat_id, price=booking.showtime.price)
+                for booking, party in zip(bookings, parties)
+                for seat_id, row, number in party
+            ], batch_size=batch_size)
+            Showtime.objects.bulk_update(batch, ['seat_occupancy', 'seats_reserved', 'seat_version'], batch_size=batch_size)
+        created += len(bookings)
+        tickets += len(sold)
+        report(f'reservations={created}')
+
+    pairs = set()
+    ratings = min(ratings, users * movies)
+    while len(pairs) < ratings:
+        pairs.add((rng.randrange(users), rng.randrange(movies)))
+    Rating.objects.bulk_create([
+        Rating(user=people[user], movie=catalog[movie], rating=rng.randint(1, 5))
+        for user, movie in pairs
+    ], batch_size=batch_size)
+    report(f'ratings={len(pairs)}')
+
+    rebuild_movie_ratings()
+    rebuild_daily_sales()
+    rebuild_trending_scores()
+    invalidate(MOVIES, THEATERS, SHOWTIMES)
+    return {
+        'movies': len(catalog),
+        'theaters': len(halls),
+        'users': len(people),
+        'showtimes': len(shows),
+        'reservations': created,
+        'tickets': tickets,
+        'ratings': len(pairs),
+        'elapsed_s': round(time.perf_counter() - began, 2),
+    }
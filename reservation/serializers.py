@@ -1,15 +1,23 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Movie, Showtime, Reservation, Theater, Seat, Rating
 from django.contrib.auth.models import User
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer
 from django.db.models import Sum, Count, Avg
+from django.urls import reverse
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from .booking import reserve_seats
+from .metrics import TimedSerializerMixin
+from .provisioning import MAX_ROWS, MAX_SEATS_PER_ROW
+from .qrcodes import qr_signature
 
-class RatingSerializer(serializers.ModelSerializer):
+class RatingSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Rating
         fields = '__all__'
 
-class MovieSerializer(serializers.ModelSerializer):
+class MovieSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     average_rating = serializers.SerializerMethodField()
 
     class Meta:
@@ -19,35 +27,121 @@ class MovieSerializer(serializers.ModelSerializer):
     def get_average_rating(self, obj):
         return obj.average_rating
 
-class TheaterSerializer(serializers.ModelSerializer):
+class TheaterSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Theater
         fields = '__all__'
+        extra_kwargs = {
+            'rows': {'min_value': 1, 'max_value': MAX_ROWS},
+            'seats_per_row': {'min_value': 1, 'max_value': MAX_SEATS_PER_ROW},
+        }
 
-class SeatSerializer(serializers.ModelSerializer):
+class SeatSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Seat
         fields = '__all__'
 
-class ShowtimeSerializer(serializers.ModelSerializer):
-    movie = MovieSerializer(read_only=True)
-    theater = TheaterSerializer(read_only=True)
+class ShowtimeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     total_theater_seats = serializers.SerializerMethodField()
     reserved_seat_count = serializers.SerializerMethodField()
+    seats_available = serializers.SerializerMethodField()
+    availability = serializers.SerializerMethodField()
 
     class Meta:
         model = Showtime
-        fields = '__all__'
-        read_only_fields = ('total_theater_seats', 'reserved_seat_count')
+        # The seat bitmap and its version are booking internals; the seat map serves them
+        exclude = ('seat_occupancy', 'seat_version')
+        read_only_fields = ('total_theater_seats', 'reserved_seat_count', 'seats_available', 'availability')
+        # The model defaults theater to 1, but scheduling needs both to be given
+        extra_kwargs = {'movie': {'required': True}, 'theater': {'required': True}}
+
+    def to_representation(self, instance):
+        # movie and theater are written as ids but read back nested
+        data = super().to_representation(instance)
+        data['movie'] = MovieSerializer(instance.movie, context=self.context).data
+        data['theater'] = TheaterSerializer(instance.theater, context=self.context).data
+        return data
 
+    # The counts are stored on the showtime, so none of these touch other tables
     def get_total_theater_seats(self, obj):
-        return obj.theater.rows * obj.theater.seats_per_row
+        return obj.capacity
 
     def get_reserved_seat_count(self, obj):
-        # Count distinct seats reserved for this showtime across all reservations
-        return Seat.objects.filter(reservation__showtime=obj).distinct().count()
+        return obj.seats_reserved
+
+    def get_seats_available(self, obj):
+        return max(obj.capacity - obj.seats_reserved, 0)
+
+    def get_availability(self, obj):
+        """sold_out, almost_full (at most SHOWTIME_ALMOST_FULL_RATIO of the seats left) or available"""
+        available = self.get_seats_available(obj)
+        if available == 0:
+            return 'sold_out'
+        if available <= obj.capacity * settings.SHOWTIME_ALMOST_FULL_RATIO:
+            return 'almost_full'
+        return 'available'
+
+class SeatHoldSerializer(serializers.Serializer):
+    seat_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, write_only=True)
+    token = serializers.CharField(read_only=True)
+    held_seat_ids = serializers.SerializerMethodField()
+    expires_at = serializers.SerializerMethodField()
+
+    def get_held_seat_ids(self, obj):
+        return sorted(obj.seat_ids)
+
+    def get_expires_at(self, obj):
+        return datetime.fromtimestamp(obj.expires_at, tz=dt_timezone.utc).isoformat()
+
+class PriceRuleSerializer(serializers.Serializer):
+    weekdays = serializers.ListField(child=serializers.IntegerField(min_value=0, max_value=6), required=False)  # 0 = Monday
+    from_time = serializers.TimeField(required=False)
+    to_time = serializers.TimeField(required=False)
+    price = serializers.DecimalField(max_digits=5, decimal_places=2, required=False)
+    add = serializers.DecimalField(max_digits=5, decimal_places=2, required=False)
 
-class ReservationSerializer(serializers.ModelSerializer):
+    def validate(self, data):
+        if ('price' in data) == ('add' in data):
+            raise serializers.ValidationError('A price rule needs exactly one of price or add.')
+        return data
+
+class ScheduleTemplateSerializer(serializers.Serializer):
+    """Input for POST /showtimes/bulk/ and the generate_schedule command"""
+    movies = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    theaters = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    start_date = serializers.DateField()
+    days = serializers.IntegerField(min_value=1, max_value=31, default=7)
+    slot_times = serializers.ListField(child=serializers.TimeField(), allow_empty=False)
+    price = serializers.DecimalField(max_digits=5, decimal_places=2, default=Decimal('10.00'))
+    price_rules = PriceRuleSerializer(many=True, required=False, default=list)
+    dry_run = serializers.BooleanField(default=False)
+
+    def _in_bulk(self, model, ids):
+        # One query for the whole list, keeping the requested order
+        objects = model.objects.in_bulk(ids)
+        missing = [pk for pk in ids if pk not in objects]
+        if missing:
+            raise serializers.ValidationError(f"Unknown id(s): {', '.join(map(str, missing))}.")
+        return [objects[pk] for pk in dict.fromkeys(ids)]
+
+    def validate_movies(self, value):
+        return self._in_bulk(Movie, value)
+
+    def validate_theaters(self, value):
+        return self._in_bulk(Theater, value)
+
+class ScheduleSlotSerializer(TimedSerializerMixin, serializers.Serializer):
+    theater = serializers.IntegerField(source='theater.pk')
+    date = serializers.DateField()
+    slot = serializers.TimeField(format='%H:%M')
+    show_time = serializers.DateTimeField()
+    movie = serializers.IntegerField(source='movie.pk', allow_null=True)
+    price = serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True)
+    status = serializers.CharField()
+    showtime = serializers.IntegerField(allow_null=True)
+    conflict = serializers.DictField(allow_null=True)
+
+class ReservationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     # For reading, we want the full Showtime object
     showtime = ShowtimeSerializer(read_only=True)
     # For writing, we need to accept the showtime ID directly
@@ -66,29 +160,22 @@ class ReservationSerializer(serializers.ModelSerializer):
         fields = ('id', 'user', 'showtime', 'selected_seats', 'showtime_pk', 'seat_ids', 
                  'booking_reference', 'created_at', 'is_cancelled', 'qr_code_url',
                  'seat_numbers', 'total_price', 'total_seats')
+        # Cancelling goes through POST /reservations/{id}/cancel/ so the seats are released
+        read_only_fields = ('is_cancelled',)
     
     def get_qr_code_url(self, obj):
-        if obj.qr_code:
+        if obj.booking_reference:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.qr_code.url)
+                path = reverse('reservation-qr', args=[obj.pk])
+                return request.build_absolute_uri(f'{path}?sig={qr_signature(obj.booking_reference)}')
         return None
 
     def create(self, validated_data):
         showtime_obj = validated_data.pop('showtime_pk') # Get the Showtime object from the writable field
         seat_ids = validated_data.pop('seat_ids')
         
-        reservation = Reservation.objects.create(showtime=showtime_obj, **validated_data)
-        seats = Seat.objects.filter(id__in=seat_ids)
-        reservation.selected_seats.set(seats)
-        
-        # Generate QR code after seats are set
-        try:
-            reservation.generate_qr_code()
-        except Exception as e:
-            print(f"Error generating QR code: {e}")
-        
-        return reservation
+        return reserve_seats(validated_data['user'], showtime_obj, seat_ids)
 
 class UserSerializer(BaseUserCreateSerializer):
     class Meta(BaseUserCreateSerializer.Meta):
@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailySales, Ticket
+
+# group_by value -> (rollup lookups, live lookups over the ticket table), keyed by output name
+GROUPINGS = {
+    'showtime': {
+        'showtime_id': ('showtime', 'showtime'),
+        'show_time': ('showtime__show_time', 'showtime__show_time'),
+        'movie': ('showtime__movie__title', 'showtime__movie__title'),
+        'theater': ('showtime__theater__name', 'showtime__theater__name'),
+    },
+    'movie': {
+        'movie_id': ('showtime__movie', 'showtime__movie'),
+        'movie': ('showtime__movie__title', 'showtime__movie__title'),
+    },
+    'theater': {
+        'theater_id': ('showtime__theater', 'showtime__theater'),
+        'theater': ('showtime__theater__name', 'showtime__theater__name'),
+    },
+    'day': {
+        'day': ('date', TruncDate('reservation__created_at')),
+    },
+}
+
+
+def booked_seats():
+    """Active tickets; one row per sold seat"""
+    return Ticket.objects.filter(status=Ticket.Status.ACTIVE)
+
+
+def sales_by(group_by, live=False, date_from=None, date_to=None):
+    """Seats sold and revenue grouped by showtime, movie, theater or day.
+
+    Reads the DailySales rollup by default; live=True aggregates the
+    reservation tables directly instead.
+    """
+    fields = GROUPINGS[group_by]
+    column = 1 if live else 0
+    lookups = {name: paths[column] for name, paths in fields.items()}
+
+    if live:
+        queryset = booked_seats()
+        if date_from:
+            queryset = queryset.filter(reservation__created_at__date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(reservation__created_at__date__lte=date_to)
+        totals = {'total_seats': Count('id'), 'total_revenue': Sum('price')}
+    else:
+        queryset = DailySales.objects.all()
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        totals = {'total_seats': Sum('seats'), 'total_revenue': Sum('revenue')}
+
+    # Aliased so output names can't clash with model fields such as showtime_id or seats
+    values = {f'group_{name}': F(path) if isinstance(path, str) else path for name, path in lookups.items()}
+    rows = queryset.values(**values).annotate(**totals).order_by(*values)
+    return [
+        {
+            **{name: row[f'group_{name}'] for name in lookups},
+            'seats': row['total_seats'],
+            'revenue': row['total_revenue'],
+        }
+        for row in rows
+    ]
+
+
+def sales_totals():
+    """Overall seats sold and revenue from the DailySales rollup"""
+    totals = DailySales.objects.aggregate(seats=Sum('seats'), revenue=Sum('revenue'))
+    return totals['seats'] or 0, totals['revenue'] or 0
+
+
+def record_sale(showtime, created_at, seats, revenue):
+    """Add (or with negative seats and revenue, remove) a sale in the rollup.
+
+    revenue is what the tickets were sold for, not the showtime's current
+    price. Callers hold the showtime's row lock, so the update-then-create
+    below can't race for the same (date, showtime) row.
+    """
+    day = timezone.localdate(created_at) if created_at else timezone.localdate()
+    updated = DailySales.objects.filter(date=day, showtime=showtime).update(
+        seats=F('seats') + seats, revenue=F('revenue') + revenue,
+    )
+    if not updated:
+        DailySales.objects.create(date=day, showtime=showtime, seats=seats, revenue=revenue)
+
+
+def rebuild_daily_sales():
+    """Recompute the DailySales rollup from the ticket table"""
+    rows = (
+        booked_seats()
+        .values('showtime_id', day=TruncDate('reservation__created_at'))
+        .annotate(seats=Count('id'), revenue=Sum('price'))
+    )
+    today = timezone.localdate()
+    rollup = {}
+    for row in rows:
+        # Reservations from before created_at existed are counted as sold today
+        key = (row['day'] or today, row['showtime_id'])
+        sale = rollup.setdefault(key, DailySales(date=key[0], showtime_id=key[1]))
+        sale.seats += row['seats']
+        sale.revenue += row['revenue']
+    with transaction.atomic():
+        DailySales.objects.all().delete()
+        DailySales.objects.bulk_create(rollup.values(), batch_size=1000)
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Keep the response cache versions of a test run in memory, and don't cache responses.
+
+    The configured versions cache is a directory in the checkout, so test
+    runs would otherwise share versions with each other and with the
+    development server. Versions are only bumped when a transaction
+    commits, which TestCase never does, so cached responses would leak
+    from one test into the next; tests of the cache turn it on with
+    override_settings.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._caches = override_settings(CACHES={
+            **settings.CACHES,
+            'responses': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+            'response_versions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'response-versions-test-run'},
+        })
+        self._caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.disable()
+        super().teardown_test_environment(**kwargs)
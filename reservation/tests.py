@@ -1,3 +1,1483 @@
-from django.test import TestCase
+import asyncio
+import base64
+import json
+import threading
+import os
+import re
+import tempfile
+from datetime import datetime, time as datetime_time, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .benchmarks import compare_results
+from .booking import cancel_reservation, cancel_showtime_reservations, release_seats, reserve_seats
+from .events import InProcessBroker, get_broker, reset_broker
+from .catalog_import import CatalogImport, Checkpoint, RateLimiter
+from .models import Movie, Theater, Seat, Showtime, Reservation, Rating, Ticket
+from .holds import HoldLimitExceeded, HoldStore, SeatsHeld, hold_store
+from . import metrics
+from .occupancy import SeatBitmap
+from .provisioning import provision_theaters, resize_theater
+from . import response_cache
+from .ratings import adjust_movie_rating, rebuild_movie_ratings
+from .seed import seed_database
+from .scheduling import conflicting_showtimes, create_schedule, plan_schedule, validate_schedule
+from .stats import rebuild_daily_sales, sales_totals
+from .trending import rebuild_trending_scores
+from .tmdb import TMDBClient, TMDBError, reset_client
+from .tmdb_fake import FakeTMDBServer
+from .utils import fetch_movie_details_from_tmdb
+
+
+def create_theater(rows=3, seats_per_row=4, name='Hall 1'):
+    theater = Theater.objects.create(name=name, address='1 Test Street', rows=rows, seats_per_row=seats_per_row)
+    Seat.objects.bulk_create([
+        Seat(theater=theater, row_number=row, seat_number=number)
+        for row in range(1, rows + 1)
+        for number in range(1, seats_per_row + 1)
+    ])
+    return theater
+
+
+def create_showtime(theater, movie=None, show_time=None):
+    if movie is None:
+        movie = Movie.objects.create(title='Test Movie', description='A test movie.', duration=120)
+    return Showtime.objects.create(
+        movie=movie,
+        theater=theater,
+        show_time=show_time or timezone.now() + timedelta(days=1),
+    )
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite connection tuning')
+class SQLiteSettingsTests(TestCase):
+    def test_pragmas_applied_to_new_connections(self):
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+
+class SeatBitmapTests(TestCase):
+    def test_take_and_release(self):
+        bitmap = SeatBitmap(3, 4)
+        bitmap.take([(1, 1), (3, 4)])
+        self.assertTrue(bitmap.is_taken(1, 1))
+        self.assertTrue(bitmap.is_taken(3, 4))
+        self.assertFalse(bitmap.is_taken(2, 2))
+        self.assertEqual(bitmap.count(), 2)
+
+        bitmap.release([(1, 1)])
+        self.assertEqual(list(bitmap.taken_positions()), [(3, 4)])
+
+    def test_round_trip(self):
+        bitmap = SeatBitmap(10, 15)
+        bitmap.take([(5, 7), (10, 15)])
+        loaded = SeatBitmap.from_bytes(bitmap.to_bytes(), 10, 15)
+        self.assertEqual(list(loaded.taken_positions()), [(5, 7), (10, 15)])
+
+    def test_rejects_other_grid(self):
+        data = SeatBitmap(10, 15).to_bytes()
+        with self.assertRaises(ValueError):
+            SeatBitmap.from_bytes(data, 15, 10)
+        with self.assertRaises(ValueError):
+            SeatBitmap(3, 4).index(4, 1)
+
+
+class BookingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.theater = create_theater()
+        self.showtime = create_showtime(self.theater)
+        self.seats = list(Seat.objects.filter(theater=self.theater))
+
+    def book(self, seats):
+        return self.client.post('/reservations/', {
+            'showtime_pk': self.showtime.pk,
+            'seat_ids': [seat.pk for seat in seats],
+        }, format='json')
+
+    def test_booking_updates_occupancy(self):
+        response = self.book(self.seats[:2])
+        self.assertEqual(response.status_code, 201)
+
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.occupancy().count(), 2)
+        response = self.client.get(f'/showtimes/{self.showtime.pk}/reserved_seats/')
+        self.assertEqual(sorted(response.data), sorted(seat.pk for seat in self.seats[:2]))
+
+    def test_conflicting_booking_is_rejected(self):
+        self.assertEqual(self.book(self.seats[:2]).status_code, 201)
+        response = self.book(self.seats[1:3])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_active_ticket_constraint_backs_up_the_bitmap(self):
+        self.assertEqual(self.book(self.seats[:2]).status_code, 201)
+        # A bitmap that lost the booking would let the same seats through
+        Showtime.objects.filter(pk=self.showtime.pk).update(seat_occupancy=SeatBitmap(3, 4).to_bytes())
+        self.assertEqual(self.book(self.seats[1:3]).status_code, 400)
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertEqual(Ticket.objects.filter(showtime=self.showtime, status=Ticket.Status.ACTIVE).count(), 2)
+
+    def test_seat_from_other_theater_is_invalid(self):
+        other_seat = Seat.objects.filter(theater=create_theater(name='Hall 2')).first()
+        response = self.book([other_seat])
+        self.assertEqual(response.status_code, 400)
+
+    def test_deleting_reservation_frees_seats(self):
+        reservation_id = self.book(self.seats[:2]).data['id']
+        self.client.delete(f'/reservations/{reservation_id}/')
+
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.occupancy().count(), 0)
+        self.assertEqual(self.book(self.seats[:2]).status_code, 201)
+
+    def test_cancel_frees_seats_and_counters(self):
+        reservation_id = self.book(self.seats[:2]).data['id']
+        response = self.client.post(f'/reservations/{reservation_id}/cancel/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_cancelled'])
+
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.occupancy().count(), 0)
+        self.assertEqual(sales_totals()[0], 0)
+        self.assertAlmostEqual(Movie.objects.get(pk=self.showtime.movie_id).trending_score, 0)
+        self.assertEqual(self.client.post(f'/reservations/{reservation_id}/cancel/').status_code, 400)
+        self.assertEqual(self.book(self.seats[:2]).status_code, 201)
+        # The cancelled reservation is kept, but can't be re-activated by an update
+        self.client.patch(f'/reservations/{reservation_id}/', {'is_cancelled': False}, format='json')
+        self.assertTrue(Reservation.objects.get(pk=reservation_id).is_cancelled)
+
+    def test_past_reservation_cannot_be_deleted(self):
+        reservation_id = self.book(self.seats[:2]).data['id']
+        Showtime.objects.filter(pk=self.showtime.pk).update(show_time=timezone.now() - timedelta(hours=1))
+        response = self.client.delete(f'/reservations/{reservation_id}/')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Reservation.objects.filter(pk=reservation_id, is_cancelled=False).exists())
+        self.assertEqual(sales_totals()[0], 2)
+
+    def test_cancel_is_owner_only(self):
+        reservation_id = self.book(self.seats[:1]).data['id']
+        self.client.force_authenticate(User.objects.create_user(username='mallory'))
+        self.assertEqual(self.client.post(f'/reservations/{reservation_id}/cancel/').status_code, 404)
+
+    def test_deleting_showtime_cancels_reservations(self):
+        self.book(self.seats[:2])
+        self.book(self.seats[2:3])
+        self.assertEqual(cancel_showtime_reservations(self.showtime), 2)
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.occupancy().count(), 0)
+        self.assertEqual(sales_totals()[0], 0)
+        self.assertFalse(Reservation.objects.filter(showtime=self.showtime, is_cancelled=False).exists())
+
+        self.book(self.seats[:1])
+        self.assertEqual(self.client.delete(f'/showtimes/{self.showtime.pk}/').status_code, 403)
+        self.assertEqual(APIClient().delete(f'/showtimes/{self.showtime.pk}/').status_code, 401)
+        self.client.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+        self.client.delete(f'/showtimes/{self.showtime.pk}/')
+        self.assertFalse(Showtime.objects.filter(pk=self.showtime.pk).exists())
+        self.assertAlmostEqual(Movie.objects.get(pk=self.showtime.movie_id).trending_score, 0)
+
+    def test_qr_code_endpoint(self):
+        response = self.book(self.seats[:1])
+        url = response.data['qr_code_url']
+        self.assertIn('?sig=', url)
+
+        # The signed link works without credentials, e.g. from an <img> tag
+        anonymous = APIClient()
+        image = anonymous.get(url)
+        self.assertEqual(image.status_code, 200)
+        self.assertEqual(image['Content-Type'], 'image/png')
+        self.assertEqual(image['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(anonymous.get(url, HTTP_IF_NONE_MATCH=image['ETag']).status_code, 304)
+        self.assertEqual(anonymous.get(url.split('?')[0]).status_code, 404)
+
+        svg = self.client.get(f"/reservations/{response.data['id']}/qr/", {'type': 'svg'})
+        self.assertEqual(svg['Content-Type'], 'image/svg+xml')
+        self.assertTrue(svg['Cache-Control'].startswith('private'))
+        self.assertNotEqual(svg['ETag'], image['ETag'])
+
+    def test_occupancy_matches_rebuild(self):
+        self.book(self.seats[:3])
+        self.showtime.refresh_from_db()
+        self.assertEqual(bytes(self.showtime.seat_occupancy), self.showtime.build_occupancy().to_bytes())
+
+
+class ShowtimeCapacityTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice')
+        self.theater = create_theater(rows=2, seats_per_row=5)
+        self.seats = list(Seat.objects.filter(theater=self.theater))
+        self.showtime = create_showtime(self.theater)
+
+    def test_counts_follow_bookings_and_cancellations(self):
+        self.assertEqual((self.showtime.capacity, self.showtime.seats_reserved), (10, 0))
+        reservation = reserve_seats(self.user, self.showtime, [seat.pk for seat in self.seats[:9]])
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.seats_reserved, 9)
+        self.assertEqual(APIClient().get(f'/showtimes/{self.showtime.pk}/').data['availability'], 'almost_full')
+
+        reserve_seats(self.user, self.showtime, [self.seats[9].pk])
+        data = APIClient().get(f'/showtimes/{self.showtime.pk}/').data
+        self.assertEqual((data['seats_available'], data['availability']), (0, 'sold_out'))
+
+        cancel_reservation(reservation)
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.seats_reserved, 1)
+
+    def test_saving_a_stale_showtime_keeps_booking_state(self):
+        stale = Showtime.objects.get(pk=self.showtime.pk)
+        reserve_seats(self.user, self.showtime, [self.seats[0].pk])
+        stale.price = 12
+        stale.save()
+        self.showtime.refresh_from_db()
+        self.assertEqual((self.showtime.price, self.showtime.seats_reserved), (12, 1))
+        self.assertEqual(self.showtime.occupancy().count(), 1)
+
+        data = APIClient().get(f'/showtimes/{self.showtime.pk}/').data
+        self.assertNotIn('seat_occupancy', data)
+        self.assertNotIn('seat_version', data)
+
+    def test_capacity_follows_seat_changes(self):
+        api = APIClient()
+        api.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+        api.delete(f'/seats/{self.seats[0].pk}/')
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.capacity, 9)
+        resize_theater(self.theater, 3, 5)
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.capacity, 15)
+
+    def test_seat_writes_are_admin_only_and_keep_booked_seats(self):
+        api = APIClient()
+        self.assertEqual(api.delete(f'/seats/{self.seats[0].pk}/').status_code, 401)
+        self.assertEqual(api.post('/seats/', {'theater': self.theater.pk, 'row_number': 3, 'seat_number': 1}, format='json').status_code, 401)
+        self.assertEqual(api.get('/seats/', {'theater': self.theater.pk}).status_code, 200)
+
+        reserve_seats(self.user, self.showtime, [self.seats[0].pk])
+        api.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+        self.assertEqual(api.delete(f'/seats/{self.seats[0].pk}/').status_code, 400)
+        self.assertTrue(Ticket.objects.filter(seat=self.seats[0], status=Ticket.Status.ACTIVE).exists())
+        self.showtime.refresh_from_db()
+        self.assertEqual((self.showtime.capacity, self.showtime.seats_reserved), (10, 1))
+
+    def test_filter_and_sort_by_availability(self):
+        other = create_showtime(self.theater, show_time=timezone.now() + timedelta(days=2))
+        reserve_seats(self.user, self.showtime, [seat.pk for seat in self.seats])
+        reserve_seats(self.user, other, [seat.pk for seat in self.seats[:3]])
+        client = APIClient()
+        self.assertEqual([row['id'] for row in client.get('/showtimes/', {'available': 1}).data], [other.pk])
+        self.assertEqual(client.get('/showtimes/', {'min_seats': 8}).data, [])
+        ordered = client.get('/showtimes/', {'ordering': '-seats_available', 'page_size': 1})
+        self.assertEqual(ordered.data['results'][0]['id'], other.pk)
+        following = client.get(ordered.data['next'])
+        self.assertEqual(following.data['results'][0]['id'], self.showtime.pk)
+        self.assertEqual(client.get('/showtimes/', {'min_seats': 'many'}).status_code, 400)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class HoldStoreTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = HoldStore(ttl=60, clock=self.clock)
+
+    def test_other_user_cannot_hold_held_seats(self):
+        self.store.place(1, user_id=1, seat_ids=[10, 11])
+        with self.assertRaises(SeatsHeld):
+            self.store.place(1, user_id=2, seat_ids=[11, 12])
+        self.store.place(2, user_id=2, seat_ids=[11])
+        self.assertEqual(self.store.held_seat_ids(1), [10, 11])
+
+    def test_holds_expire(self):
+        hold = self.store.place(1, user_id=1, seat_ids=[10])
+        self.clock.now = 61
+        self.assertIsNone(self.store.get(hold.token))
+        self.assertEqual(self.store.held_seat_ids(1), [])
+        self.store.place(1, user_id=2, seat_ids=[10])
+
+    def test_replacing_own_hold(self):
+        first = self.store.place(1, user_id=1, seat_ids=[10, 11])
+        self.store.place(1, user_id=1, seat_ids=[11])
+        self.assertIsNone(self.store.get(first.token))
+        self.assertEqual(self.store.held_seat_ids(1), [11])
+
+    def test_seats_per_user_are_capped(self):
+        store = HoldStore(ttl=60, clock=self.clock, max_seats=3)
+        store.place(1, user_id=1, seat_ids=[10, 11])
+        with self.assertRaises(HoldLimitExceeded):
+            store.place(1, user_id=1, seat_ids=[12, 13])
+        # A replaced hold doesn't count, nor do other users and showtimes
+        store.place(1, user_id=1, seat_ids=[11, 12, 13])
+        store.place(1, user_id=2, seat_ids=[14, 15, 16])
+        store.place(2, user_id=1, seat_ids=[10, 11, 12])
+        self.assertEqual(store.held_seat_ids(1), [11, 12, 13, 14, 15, 16])
+
+
+class SeatHoldApiTests(TestCase):
+    def setUp(self):
+        hold_store.clear()
+        self.addCleanup(hold_store.clear)
+        self.alice = User.objects.create_user(username='alice', password='secret')
+        self.bob = User.objects.create_user(username='bob', password='secret')
+        self.client = APIClient()
+        self.showtime = create_showtime(create_theater())
+        self.seat_ids = list(Seat.objects.values_list('id', flat=True)[:2])
+
+    def test_hold_blocks_other_users_checkout(self):
+        self.client.force_authenticate(self.bob)
+        response = self.client.post(f'/showtimes/{self.showtime.pk}/holds/', {'seat_ids': self.seat_ids}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get(f'/showtimes/{self.showtime.pk}/holds/').data, sorted(self.seat_ids))
+
+        self.client.force_authenticate(self.alice)
+        response = self.client.post('/reservations/', {'showtime_pk': self.showtime.pk, 'seat_ids': self.seat_ids}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_authenticate(self.bob)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/reservations/', {'showtime_pk': self.showtime.pk, 'seat_ids': self.seat_ids}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(hold_store.held_seat_ids(self.showtime.pk), [])
+
+    @override_settings(SEAT_HOLD_MAX_SEATS=2)
+    def test_hold_over_the_limit_is_rejected(self):
+        self.client.force_authenticate(self.bob)
+        seat_ids = list(Seat.objects.values_list('id', flat=True)[:3])
+        response = self.client.post(f'/showtimes/{self.showtime.pk}/holds/', {'seat_ids': seat_ids}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most 2 seats', response.data['detail'])
+        self.assertEqual(hold_store.held_seat_ids(self.showtime.pk), [])
+
+    def test_release_hold(self):
+        self.client.force_authenticate(self.bob)
+        token = self.client.post(f'/showtimes/{self.showtime.pk}/holds/', {'seat_ids': self.seat_ids}, format='json').data['token']
+
+        self.client.force_authenticate(self.alice)
+        self.assertEqual(self.client.delete(f'/showtimes/{self.showtime.pk}/holds/{token}/').status_code, 404)
+
+        self.client.force_authenticate(self.bob)
+        self.assertEqual(self.client.delete(f'/showtimes/{self.showtime.pk}/holds/{token}/').status_code, 204)
+        self.assertEqual(hold_store.held_seat_ids(self.showtime.pk), [])
+
+    def test_anonymous_users_cannot_hold(self):
+        response = self.client.post(f'/showtimes/{self.showtime.pk}/holds/', {'seat_ids': self.seat_ids}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class QueryCountTests(TestCase):
+    """Pin the number of queries per endpoint so list responses don't grow with row count"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.theater = create_theater()
+
+    def add_rows(self, count):
+        for index in range(count):
+            movie = Movie.objects.create(
+                title=f'Movie {index}', description='', duration=90,
+                release_date=timezone.now().date() + timedelta(days=1),
+            )
+            Rating.objects.create(movie=movie, user=self.user, rating=4)
+            adjust_movie_rating(movie.pk, 4, 1)
+            showtime = create_showtime(self.theater, movie=movie, show_time=timezone.now() + timedelta(days=1, hours=3 * index))
+            seat = Seat.objects.filter(theater=self.theater)[index]
+            reserve_seats(self.user, showtime, [seat.pk])
+
+    def assertQueriesConstant(self, url, expected):
+        for count in (1, 4):
+            self.add_rows(count)
+            with self.assertNumQueries(expected):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_movie_list(self):
+        self.assertQueriesConstant('/movies/', 1)
+
+    def test_coming_soon(self):
+        self.assertQueriesConstant('/movies/coming_soon/', 1)
+
+    def test_showtime_list(self):
+        self.assertQueriesConstant('/showtimes/', 1)
+
+    def test_showtimes_for_movie(self):
+        self.add_rows(3)
+        movie = Movie.objects.first()
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/showtimes/?movie_id={movie.pk}')
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['movie']['average_rating'], 4)
+        self.assertEqual(response.data[0]['reserved_seat_count'], 1)
+
+    def test_showtime_detail(self):
+        self.add_rows(1)
+        showtime = Showtime.objects.first()
+        with self.assertNumQueries(1):
+            self.client.get(f'/showtimes/{showtime.pk}/')
+
+    def test_user_reservations(self):
+        # reservations joined to showtimes, movies and theaters, then seats
+        self.assertQueriesConstant('/reservations/', 2)
+
+    def test_booking(self):
+        showtime = create_showtime(self.theater)
+        seats = list(Seat.objects.filter(theater=self.theater).values_list('id', flat=True)[:4])
+        # The first booking of the day also creates its sales row
+        self.client.post('/reservations/', {'showtime_pk': showtime.pk, 'seat_ids': seats[:1]}, format='json')
+        # Booking writes, then the reservation read back with its showtime, movie and theater, then its seats
+        with self.assertNumQueries(13):
+            response = self.client.post('/reservations/', {'showtime_pk': showtime.pk, 'seat_ids': seats[1:]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['selected_seats']), 3)
+        self.assertEqual(response.data['showtime']['theater']['id'], self.theater.pk)
+
+
+class SalesStatsTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='secret', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        theater = create_theater()
+        self.first = create_showtime(theater)
+        self.second = create_showtime(theater, movie=Movie.objects.create(title='Other', description='', duration=90))
+        seats = list(Seat.objects.all())
+        reserve_seats(self.admin, self.first, [seat.pk for seat in seats[:3]])
+        reserve_seats(self.admin, self.second, [seats[0].pk])
+        # Cancelled bookings don't count towards the totals
+        cancelled = Reservation.objects.create(user=self.admin, showtime=self.second, is_cancelled=True)
+        cancelled.selected_seats.add(seats[5], through_defaults={'showtime': self.second, 'status': Ticket.Status.CANCELLED, 'price': self.second.price})
+
+    def test_totals(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/total_seats_booked/')
+        self.assertEqual(response.data['total_seats_booked'], 4)
+        response = self.client.get('/total_revenue/')
+        self.assertEqual(float(response.data['total_revenue']), 40.0)
+
+    def test_rollup_matches_live(self):
+        for group_by in ('showtime', 'movie', 'theater', 'day'):
+            rollup = self.client.get('/stats/', {'group_by': group_by}).data['results']
+            live = self.client.get('/stats/', {'group_by': group_by, 'live': 'true'}).data['results']
+            self.assertEqual(rollup, live)
+        movies = self.client.get('/stats/', {'group_by': 'movie'}).data['results']
+        self.assertEqual([row['seats'] for row in movies], [3, 1])
+
+    def test_rebuild_matches_incremental(self):
+        before = self.client.get('/stats/', {'group_by': 'showtime'}).data['results']
+        rebuild_daily_sales()
+        self.assertEqual(self.client.get('/stats/', {'group_by': 'showtime'}).data['results'], before)
+
+    def test_release_updates_rollup(self):
+        release_seats(Reservation.objects.get(showtime=self.second, is_cancelled=False))
+        self.assertEqual(self.client.get('/total_seats_booked/').data['total_seats_booked'], 3)
+
+    def test_revenue_uses_the_price_paid(self):
+        self.first.price = Decimal('25.00')
+        self.first.save()
+        cancel_reservation(Reservation.objects.get(showtime=self.first))
+        self.assertEqual(sales_totals(), (1, Decimal('10.00')))
+        rebuild_daily_sales()
+        self.assertEqual(sales_totals(), (1, Decimal('10.00')))
+        live = self.client.get('/stats/', {'group_by': 'movie', 'live': 'true'}).data['results']
+        self.assertEqual([row['revenue'] for row in live], [Decimal('10.00')])
+
+    def test_stats_are_admin_only(self):
+        self.client.force_authenticate(User.objects.create_user(username='bob'))
+        self.assertEqual(self.client.get('/stats/').status_code, 403)
+
+
+class RatingTotalsTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='secret')
+        self.bob = User.objects.create_user(username='bob', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+        self.movie = Movie.objects.create(title='Rated', description='', duration=100)
+
+    def rate(self, user, value):
+        return self.client.post('/ratings/', {'movie': self.movie.pk, 'user': user.pk, 'rating': value}, format='json')
+
+    def test_totals_follow_create_update_and_delete(self):
+        self.assertEqual(self.rate(self.alice, 5).status_code, 201)
+        self.assertEqual(self.rate(self.bob, 2).status_code, 201)
+        self.assertEqual(self.rate(self.alice, 3).status_code, 200)
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.rating_sum, self.movie.rating_count), (5, 2))
+        self.assertEqual(self.movie.average_rating, 2.5)
+
+        rating = Rating.objects.get(user=self.bob)
+        self.client.delete(f'/ratings/{rating.pk}/')
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.average_rating, 3)
+
+    def test_invalid_update_is_rejected(self):
+        self.rate(self.alice, 4)
+        self.assertEqual(self.rate(self.alice, 9).status_code, 400)
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.average_rating, 4)
+
+    def test_rebuild(self):
+        Rating.objects.create(movie=self.movie, user=self.alice, rating=4)
+        Rating.objects.create(movie=self.movie, user=self.bob, rating=1)
+        rebuild_movie_ratings()
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.average_rating, 2.5)
+
+
+class CatalogPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.theater = create_theater()
+        other = create_theater(name='Hall 2')
+        today = timezone.now().date()
+        for index in range(5):
+            movie = Movie.objects.create(
+                title=f'Movie {index}', description='', duration=90,
+                genres='Action' if index % 2 else 'Drama',
+                release_date=today + timedelta(days=index),
+            )
+            create_showtime(self.theater if index < 3 else other, movie=movie,
+                            show_time=timezone.now() + timedelta(days=index, hours=1))
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get('/movies/')
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 5)
+
+    def test_cursor_pages(self):
+        response = self.client.get('/showtimes/', {'page_size': 2, 'ordering': 'show_time'})
+        seen = [row['id'] for row in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += [row['id'] for row in response.data['results']]
+        expected = list(Showtime.objects.order_by('show_time').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_cursor_pages_seek_past_ties(self):
+        # Every showtime has the same number of free seats, so only the id tells them apart
+        expected = list(Showtime.objects.order_by('-id').values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/showtimes/', {'page_size': 2, 'ordering': '-seats_available'})
+            seen = [row['id'] for row in response.data['results']]
+            while response.data['next']:
+                response = self.client.get(response.data['next'])
+                seen += [row['id'] for row in response.data['results']]
+        self.assertEqual(seen, expected)
+        self.assertFalse([query['sql'] for query in queries.captured_queries if 'OFFSET' in query['sql']])
+
+        back = [row['id'] for row in response.data['results']]
+        while response.data['previous']:
+            response = self.client.get(response.data['previous'])
+            back = [row['id'] for row in response.data['results']] + back
+        self.assertEqual(back, expected)
+        self.assertEqual(self.client.get('/showtimes/', {'cursor': 'cD1ub3Bl'}).status_code, 404)
+
+    def test_showtime_filters(self):
+        tomorrow = (timezone.now() + timedelta(days=1)).date()
+        response = self.client.get('/showtimes/', {'date_from': tomorrow.isoformat(), 'date_to': (tomorrow + timedelta(days=1)).isoformat()})
+        self.assertEqual(len(response.data), 2)
+        response = self.client.get('/showtimes/', {'theater': self.theater.pk})
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(self.client.get('/showtimes/', {'date_from': 'soon'}).status_code, 400)
+
+    def test_movie_filters(self):
+        today = timezone.now().date()
+        response = self.client.get('/movies/', {'genre': 'action', 'ordering': '-release_date'})
+        self.assertEqual([row['title'] for row in response.data], ['Movie 3', 'Movie 1'])
+        response = self.client.get('/movies/', {'released_after': (today + timedelta(days=3)).isoformat()})
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(self.client.get('/movies/', {'ordering': 'duration'}).status_code, 400)
+
+    def test_undated_movies_only_skipped_by_cursor_pages(self):
+        Movie.objects.create(title='Undated', description='', duration=90)
+        response = self.client.get('/movies/', {'ordering': 'release_date'})
+        self.assertEqual(len(response.data), 6)
+        response = self.client.get('/movies/', {'ordering': 'release_date', 'page_size': 10})
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_seat_pages_follow_grid(self):
+        response = self.client.get('/seats/', {'theater': self.theater.pk, 'page_size': 5})
+        first = response.data['results']
+        self.assertEqual([(seat['row_number'], seat['seat_number']) for seat in first],
+                         [(1, 1), (1, 2), (1, 3), (1, 4), (2, 1)])
+        second = self.client.get(response.data['next']).data['results']
+        self.assertEqual((second[0]['row_number'], second[0]['seat_number']), (2, 2))
+
+
+class SeatMapTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create_user(username='alice')
+        self.theater = create_theater(rows=3, seats_per_row=4)
+        self.showtime = create_showtime(self.theater)
+        self.seat = {(seat.row_number, seat.seat_number): seat for seat in Seat.objects.filter(theater=self.theater)}
+        self.addCleanup(hold_store.clear)
+
+    def url(self):
+        return f'/showtimes/{self.showtime.pk}/seatmap/'
+
+    def positions(self, encoded):
+        bitmap = SeatBitmap(3, 4, base64.b64decode(encoded))
+        return list(bitmap.taken_positions())
+
+    def test_seatmap_payload(self):
+        reserve_seats(self.alice, self.showtime, [self.seat[(1, 2)].pk])
+        hold_store.place(self.showtime.pk, self.alice.pk, {self.seat[(3, 4)].pk})
+        response = self.client.get(self.url())
+        data = response.data
+        self.assertEqual((data['rows'], data['seats_per_row']), (3, 4))
+        self.assertEqual(data['showtime']['movie']['title'], 'Test Movie')
+        seat_ids = {
+            (row, first_seat + offset): first_id + offset
+            for row, first_seat, first_id, length in data['seats']
+            for offset in range(length)
+        }
+        self.assertEqual(seat_ids, {position: seat.pk for position, seat in self.seat.items()})
+        self.assertEqual(self.positions(data['taken']), [(1, 2)])
+        self.assertEqual(self.positions(data['held']), [(3, 4)])
+
+    def test_unchanged_seatmap_is_not_modified(self):
+        self.client.get(self.url())  # builds the stored bitmap
+        response = self.client.get(self.url())
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.url(), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        reserve_seats(self.alice, self.showtime, [self.seat[(2, 2)].pk])
+        changed = self.client.get(self.url(), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+
+        hold_store.place(self.showtime.pk, self.alice.pk, {self.seat[(1, 1)].pk})
+        held = self.client.get(self.url(), HTTP_IF_NONE_MATCH=changed['ETag'])
+        self.assertEqual(held.status_code, 200)
+
+    def test_seat_changes_change_the_etag(self):
+        self.client.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+        etag = self.client.get(self.url())['ETag']
+        self.client.delete(f'/seats/{self.seat[(3, 4)].pk}/')
+        response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(run[3] for run in response.data['seats']), 11)
+
+        self.client.post('/seats/', {'theater': self.showtime.theater_id, 'row_number': 3, 'seat_number': 4}, format='json')
+        self.assertEqual(self.client.get(self.url(), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+
+class SeatEventTests(TestCase):
+    def setUp(self):
+        reset_broker()
+        self.addCleanup(reset_broker)
+        self.addCleanup(hold_store.clear)
+        self.alice = User.objects.create_user(username='alice')
+        self.theater = create_theater()
+        self.showtime = create_showtime(self.theater)
+        self.seats = list(Seat.objects.filter(theater=self.theater))
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def next_event(self, subscription):
+        return self.loop.run_until_complete(subscription.get(timeout=1))
+
+    def test_booking_and_cancellation_are_published_on_commit(self):
+        subscription = get_broker().subscribe(self.showtime.pk, loop=self.loop)
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation = reserve_seats(self.alice, self.showtime, [self.seats[0].pk, self.seats[1].pk])
+        event = self.next_event(subscription)
+        self.assertEqual(event['type'], 'reserved')
+        self.assertEqual(event['seat_ids'], sorted([self.seats[0].pk, self.seats[1].pk]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            release_seats(reservation)
+        self.assertEqual(self.next_event(subscription)['type'], 'released')
+
+    def test_holds_are_published(self):
+        subscription = get_broker().subscribe(self.showtime.pk, loop=self.loop)
+        other = get_broker().subscribe(self.showtime.pk + 1, loop=self.loop)
+        hold = hold_store.place(self.showtime.pk, self.alice.pk, {self.seats[2].pk})
+        self.assertEqual(self.next_event(subscription), {
+            'type': 'held', 'showtime': self.showtime.pk, 'seat_ids': [self.seats[2].pk],
+        })
+        hold_store.release(hold.token)
+        self.assertEqual(self.next_event(subscription)['type'], 'hold_released')
+        self.assertIsNone(self.loop.run_until_complete(other.get(timeout=0.01)))
+
+    def test_slow_subscriber_gets_resync(self):
+        broker = InProcessBroker(max_queue=2)
+        subscription = broker.subscribe(1, loop=self.loop)
+        publisher = threading.Thread(target=lambda: [broker.publish(1, {'type': 'held'}) for _ in range(5)])
+        publisher.start()
+        publisher.join()
+        self.assertEqual(self.next_event(subscription), {'type': 'resync', 'showtime': 1})
+        subscription.close()
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def test_event_stream_needs_asgi(self):
+        self.assertEqual(self.client.get(f'/showtimes/{self.showtime.pk}/events/').status_code, 501)
+
+    async def test_event_stream(self):
+        client = AsyncClient()
+        response = await client.get(f'/showtimes/{self.showtime.pk}/events/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        get_broker().publish(self.showtime.pk, {'type': 'reserved', 'seat_ids': [1]})
+        chunk = await asyncio.wait_for(anext(stream), 1)
+        self.assertEqual(json.loads(chunk.decode().removeprefix('data: ')), {'type': 'reserved', 'seat_ids': [1]})
+        # A client disconnect cancels the pending read, which unsubscribes
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.01)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(get_broker().subscriber_count(), 0)
+
+        missing = await client.get('/showtimes/999999/events/')
+        self.assertEqual(missing.status_code, 404)
+
+
+class SchedulingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.theater = create_theater()
+        self.epic = Movie.objects.create(title='Epic', description='', duration=180)
+        self.short = Movie.objects.create(title='Short', description='', duration=90)
+        self.start = (timezone.now() + timedelta(days=2)).replace(hour=10, minute=0, second=0, microsecond=0)
+        self.existing = Showtime.objects.create(movie=self.epic, theater=self.theater, show_time=self.start)
+        self.client.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+
+    def schedule(self, movie, show_time, **extra):
+        return self.client.post('/showtimes/', {
+            'movie': movie.pk, 'theater': self.theater.pk, 'show_time': show_time.isoformat(), **extra,
+        }, format='json')
+
+    def test_end_time_is_stored(self):
+        self.assertEqual(self.existing.end_time, self.start + timedelta(minutes=180))
+        self.epic.duration = 200
+        response = self.client.patch(f'/movies/{self.epic.pk}/', {'duration': 200}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.end_time, self.start + timedelta(minutes=200))
+
+    def test_long_running_showtime_blocks_later_start(self):
+        # Starts two hours into the three-hour film already showing
+        response = self.schedule(self.short, self.start + timedelta(hours=2))
+        self.assertEqual(response.status_code, 400)
+        response = self.schedule(self.short, self.start + timedelta(hours=3))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['movie']['title'], 'Short')
+        self.assertEqual(Showtime.objects.get(pk=response.data['id']).end_time, self.start + timedelta(hours=4, minutes=30))
+
+    def test_overlapping_showtimes_are_all_checked(self):
+        trailer = Movie.objects.create(title='Trailer', description='', duration=30)
+        Showtime.objects.create(movie=trailer, theater=self.theater, show_time=self.start + timedelta(hours=3))
+        # Lengthening the epic makes it overlap the trailer showing after it, and it now runs until 15:00
+        self.assertEqual(self.client.patch(f'/movies/{self.epic.pk}/', {'duration': 300}, format='json').status_code, 200)
+        self.assertEqual(self.schedule(trailer, self.start + timedelta(hours=4)).status_code, 400)
+        self.assertEqual(self.schedule(trailer, self.start + timedelta(hours=5)).status_code, 201)
+
+    def test_scheduling_is_admin_only(self):
+        anonymous = APIClient()
+        response = anonymous.post('/showtimes/', {
+            'movie': self.short.pk, 'theater': self.theater.pk, 'show_time': (self.start + timedelta(hours=4)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(anonymous.patch(f'/showtimes/{self.existing.pk}/', {'price': '1.00'}, format='json').status_code, 401)
+        self.assertEqual(anonymous.get('/showtimes/').status_code, 200)
+
+    def test_theater_and_movie_are_required(self):
+        response = self.client.post('/showtimes/', {'movie': self.short.pk, 'show_time': self.start.isoformat()}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('theater', response.data)
+        response = self.client.post('/showtimes/', {'theater': self.theater.pk, 'show_time': self.start.isoformat()}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('movie', response.data)
+
+    def test_update_is_checked_against_other_showtimes(self):
+        later = Showtime.objects.create(movie=self.short, theater=self.theater, show_time=self.start + timedelta(hours=4))
+        response = self.client.patch(f'/showtimes/{later.pk}/', {'show_time': (self.start + timedelta(hours=1)).isoformat()}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(f'/showtimes/{later.pk}/', {'price': '12.50'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(SHOWTIME_CLEANING_BUFFER_MINUTES=20)
+    def test_cleaning_buffer(self):
+        self.assertEqual(self.schedule(self.short, self.start + timedelta(hours=3, minutes=10)).status_code, 400)
+        self.assertEqual(self.schedule(self.short, self.start - timedelta(minutes=100)).status_code, 400)
+        self.assertEqual(self.schedule(self.short, self.start + timedelta(hours=3, minutes=20)).status_code, 201)
+
+    def test_validate_schedule_sweep(self):
+        slot = lambda movie, hours: {'theater_id': self.theater.pk, 'movie': movie.pk, 'show_time': self.start + timedelta(hours=hours)}
+        with self.assertNumQueries(3):
+            results = validate_schedule([
+                slot(self.short, 1),    # overlaps the existing epic
+                slot(self.short, 3),    # free
+                slot(self.short, 4),    # overlaps the slot above
+                slot(self.short, 6),    # free
+                slot(self.epic, -2.5),  # ends 30 minutes into the existing epic
+            ])
+        conflicts = [result['conflict'] for result in results]
+        self.assertEqual(conflicts, [
+            {'showtime': self.existing.pk}, {'slot': 2}, {'slot': 1}, None, {'showtime': self.existing.pk},
+        ])
+
+
+class ScheduleGenerationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', password='secret', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        self.halls = [create_theater(name='Hall A'), create_theater(name='Hall B')]
+        self.short = Movie.objects.create(title='Short', description='', duration=90)
+        self.long = Movie.objects.create(title='Long', description='', duration=170)
+        self.day = timezone.localdate() + timedelta(days=3)
+
+    def generate(self, **extra):
+        return self.client.post('/showtimes/bulk/', {
+            'movies': [self.short.pk, self.long.pk],
+            'theaters': [hall.pk for hall in self.halls],
+            'start_date': self.day.isoformat(),
+            'days': 2,
+            'slot_times': ['10:00', '12:30', '16:00'],
+            **extra,
+        }, format='json')
+
+    def test_packs_slots_without_overlaps(self):
+        response = self.generate()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], Showtime.objects.count())
+        self.assertEqual(response.data['created'] + response.data['skipped'], 12)
+        # The long film overruns 12:30, so that slot falls back to the short one or is skipped
+        for hall in self.halls:
+            showtimes = list(Showtime.objects.filter(theater=hall).order_by('show_time'))
+            for earlier, later in zip(showtimes, showtimes[1:]):
+                self.assertLessEqual(earlier.end_time, later.show_time)
+        self.assertTrue(all(showtime.end_time for showtime in Showtime.objects.all()))
+        # Screens open with different films
+        self.assertEqual(len({slot['movie'] for slot in response.data['slots'] if slot['slot'] == '10:00'}), 2)
+
+    def test_existing_showtime_is_worked_around(self):
+        show_time = timezone.make_aware(datetime.combine(self.day, datetime_time(11, 0)))
+        existing = Showtime.objects.create(movie=self.long, theater=self.halls[0], show_time=show_time)
+        response = self.generate(days=1, theaters=[self.halls[0].pk])
+        slots = {slot['slot']: slot for slot in response.data['slots']}
+        # Both films would run into the 11:00 showing from 10:00, and it runs past 12:30
+        self.assertEqual(slots['10:00']['status'], 'skipped')
+        self.assertEqual(slots['10:00']['conflict'], {'showtime': existing.pk})
+        self.assertIsNone(slots['10:00']['movie'])
+        self.assertEqual(slots['12:30']['status'], 'skipped')
+        self.assertEqual(slots['16:00']['status'], 'created')
+        self.assertEqual(Showtime.objects.filter(theater=self.halls[0]).count(), 2)
+
+    def test_price_rules(self):
+        rules = [
+            {'from_time': '16:00', 'add': '2.50'},
+            {'weekdays': [self.day.weekday()], 'price': '6.00'},
+        ]
+        response = self.generate(days=2, price='9.00', price_rules=rules, theaters=[self.halls[0].pk], movies=[self.short.pk])
+        prices = {(slot['date'], slot['slot']): slot['price'] for slot in response.data['slots']}
+        tomorrow = (self.day + timedelta(days=1)).isoformat()
+        self.assertEqual(prices[(self.day.isoformat(), '16:00')], '6.00')
+        self.assertEqual(prices[(tomorrow, '10:00')], '9.00')
+        self.assertEqual(prices[(tomorrow, '16:00')], '11.50')
+        bad = self.generate(price_rules=[{'price': '5.00', 'add': '1.00'}])
+        self.assertEqual(bad.status_code, 400)
+
+    def test_dry_run_creates_nothing(self):
+        response = self.generate(dry_run=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.data['planned'], 0)
+        self.assertEqual(response.data['created'], 0)
+        self.assertFalse(Showtime.objects.exists())
+
+    def test_admin_only(self):
+        self.client.force_authenticate(User.objects.create_user(username='guest', password='secret'))
+        self.assertEqual(self.generate().status_code, 403)
+        self.assertFalse(Showtime.objects.exists())
+
+    def test_create_rechecks_against_new_showtimes(self):
+        plan = plan_schedule([self.short], self.halls[:1], self.day, 1, [datetime_time(10)], Decimal('10.00'))
+        Showtime.objects.create(movie=self.short, theater=self.halls[0], show_time=plan[0]['show_time'])
+        self.assertEqual(create_schedule(plan), [])
+        self.assertEqual(plan[0]['status'], 'skipped')
+        self.assertEqual(Showtime.objects.count(), 1)
+
+
+class TheaterProvisioningTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+
+    def grid(self, theater):
+        return set(Seat.objects.filter(theater=theater).values_list('row_number', 'seat_number'))
+
+    def test_create_generates_seats(self):
+        response = self.client.post('/theaters/', {'name': 'Hall 9', 'address': 'x', 'rows': 3, 'seats_per_row': 5}, format='json')
+        self.assertEqual(response.status_code, 201)
+        theater = Theater.objects.get(pk=response.data['id'])
+        self.assertEqual(self.grid(theater), {(row, seat) for row in range(1, 4) for seat in range(1, 6)})
+        response = self.client.post('/theaters/', {'name': 'Empty', 'address': 'x', 'rows': 0, 'seats_per_row': 5}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_grid_is_capped_and_writes_are_admin_only(self):
+        response = self.client.post('/theaters/', {'name': 'Huge', 'address': 'x', 'rows': 101, 'seats_per_row': 5}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/theaters/', {'name': 'Huge', 'address': 'x', 'rows': 5, 'seats_per_row': 65535}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Theater.objects.exists())
+
+        self.client.force_authenticate(User.objects.create_user(username='alice'))
+        response = self.client.post('/theaters/', {'name': 'Hall', 'address': 'x', 'rows': 3, 'seats_per_row': 5}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/theaters/').status_code, 200)
+
+    def test_resize_updates_seats_and_occupancy(self):
+        theater = create_theater(rows=3, seats_per_row=4)
+        showtime = create_showtime(theater)
+        user = User.objects.create_user(username='alice')
+        reserve_seats(user, showtime, [Seat.objects.get(theater=theater, row_number=1, seat_number=1).pk])
+
+        with self.assertNumQueries(21):
+            response = self.client.patch(f'/theaters/{theater.pk}/', {'rows': 2, 'seats_per_row': 6}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.grid(theater), {(row, seat) for row in range(1, 3) for seat in range(1, 7)})
+        showtime.refresh_from_db()
+        bitmap = SeatBitmap.from_bytes(showtime.seat_occupancy, 2, 6)
+        self.assertEqual(list(bitmap.taken_positions()), [(1, 1)])
+
+    def test_booked_seats_are_not_removed(self):
+        theater = create_theater(rows=3, seats_per_row=4)
+        showtime = create_showtime(theater)
+        user = User.objects.create_user(username='alice')
+        reserve_seats(user, showtime, [Seat.objects.get(theater=theater, row_number=3, seat_number=4).pk])
+        response = self.client.patch(f'/theaters/{theater.pk}/', {'rows': 2}, format='json')
+        self.assertEqual(response.status_code, 400)
+        theater.refresh_from_db()
+        self.assertEqual(theater.rows, 3)
+        self.assertEqual(len(self.grid(theater)), 12)
+
+    def test_provision_multiplex_in_bulk(self):
+        with self.assertNumQueries(4):
+            theaters = provision_theaters([(f'Screen {index}', 10, 10) for index in range(3)])
+        self.assertEqual(Seat.objects.filter(theater__in=theaters).count(), 300)
+
+
+TMDB_TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'tmdb': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tmdb-tests'},
+    'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'responses-tests'},
+    'response_versions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'response-versions-tests'},
+}
+
+
+@override_settings(CACHES=TMDB_TEST_CACHES)
+class TMDBClientTests(TestCase):
+    def setUp(self):
+        self.server = FakeTMDBServer(movies=30).start()
+        self.addCleanup(self.server.stop)
+        self.client_ = TMDBClient(base_url=self.server.url, backoff=0)
+        self.client_.cache.clear()
+
+    def test_responses_are_cached(self):
+        first = self.client_.search_movie('Fake Movie 7')
+        second = self.client_.search_movie('Fake Movie 7')
+        self.assertEqual(first['id'], 1007)
+        self.assertEqual(first, second)
+        self.assertEqual(self.server.request_count, 1)
+
+    def test_genre_names_use_cached_genre_list(self):
+        for index in (1, 2, 3):
+            self.client_.genre_names(self.client_.search_movie(f'Fake Movie {index}'))
+        self.assertEqual(self.server.requests.count('/3/genre/movie/list'), 1)
+        details = self.server.by_id[1001]
+        expected = ', '.join(genre['name'] for genre in details['genres'])
+        self.assertEqual(self.client_.genre_names(self.client_.search_movie('Fake Movie 1')), expected)
+
+    def test_retries_transient_errors(self):
+        self.server.fail_remaining = 2
+        self.assertEqual(self.client_.movie_details(1003)['title'], 'Fake Movie 3')
+        self.assertEqual(self.server.request_count, 3)
+
+    def test_gives_up_after_retries(self):
+        self.server.fail_remaining = 10
+        with self.assertRaises(TMDBError):
+            self.client_.popular()
+
+    def test_failed_lookup_is_logged(self):
+        self.server.fail_remaining = 10
+        with mock.patch('reservation.utils.get_client', return_value=self.client_), self.assertLogs('reservation.utils', 'WARNING') as logs:
+            self.assertIsNone(fetch_movie_details_from_tmdb('Fake Movie 2'))
+        self.assertIn("TMDB lookup for 'Fake Movie 2' failed", logs.output[0])
+
+    def test_movie_update_only_refetches_on_title_change(self):
+        with self.settings(TMDB_BASE_URL=self.server.url):
+            reset_client()
+            self.addCleanup(reset_client)
+            details = fetch_movie_details_from_tmdb('Fake Movie 5')
+            self.assertTrue(details['genres'])
+            movie = Movie.objects.create(title='Fake Movie 5', description='', duration=100)
+            requests_before = self.server.request_count
+            api = APIClient()
+            response = api.patch(f'/movies/{movie.pk}/', {'duration': 110}, format='json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.server.request_count, requests_before)
+            api.patch(f'/movies/{movie.pk}/', {'title': 'Fake Movie 6'}, format='json')
+            self.assertEqual(self.server.request_count, requests_before + 1)
+            movie.refresh_from_db()
+            self.assertEqual(movie.poster_path, 'https://image.tmdb.org/t/p/w500/fake-6.jpg')
+            self.assertEqual(movie.tmdb_id, 1006)
+
+            # Movies added through the API are linked to TMDB, once per TMDB id
+            created = api.post('/movies/', {'title': 'Fake Movie 7', 'description': 'A sequel.', 'duration': 90}, format='json')
+            self.assertEqual(Movie.objects.get(pk=created.data['id']).tmdb_id, 1007)
+            again = api.post('/movies/', {'title': 'Fake Movie 7', 'description': 'A sequel.', 'duration': 90}, format='json')
+            self.assertEqual(again.status_code, 201)
+            self.assertIsNone(Movie.objects.get(pk=again.data['id']).tmdb_id)
+
+
+@override_settings(CACHES=TMDB_TEST_CACHES)
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        self.server = FakeTMDBServer(movies=50).start()
+        self.addCleanup(self.server.stop)
+        self.tmdb = TMDBClient(base_url=self.server.url, backoff=0)
+        self.tmdb.cache.clear()
+
+    def test_upserts_by_tmdb_id(self):
+        stats = CatalogImport(self.tmdb, workers=4, rate=0, pages_per_batch=2).run(pages=0)
+        self.assertEqual((stats['pages'], stats['created'], stats['updated']), (3, 50, 0))
+        movie = Movie.objects.get(tmdb_id=1004)
+        self.assertEqual(movie.title, 'Fake Movie 4')
+        self.assertEqual(movie.duration, self.server.by_id[1004]['runtime'])
+        showtime = create_showtime(create_theater(), movie=movie)
+
+        self.server.by_id[1004]['title'] = 'Fake Movie 4 (Remastered)'
+        self.tmdb.cache.clear()
+        stats = CatalogImport(self.tmdb, workers=4, rate=0).run(pages=0)
+        self.assertEqual((stats['created'], stats['updated']), (0, 50))
+        self.assertEqual(Movie.objects.count(), 50)
+        showtime.refresh_from_db()
+        self.assertEqual(showtime.movie.title, 'Fake Movie 4 (Remastered)')
+
+    def test_links_movies_added_without_tmdb_id(self):
+        details = self.server.by_id[1004]
+        legacy = Movie.objects.create(title=details['title'], description='', duration=100, release_date=details['release_date'])
+        # Same title, different film: stays separate
+        Movie.objects.create(title='Fake Movie 5', description='', duration=100, release_date='1999-01-01')
+        stats = CatalogImport(self.tmdb, workers=4, rate=0).run(pages=0)
+        self.assertEqual((stats['created'], stats['updated']), (49, 1))
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.tmdb_id, 1004)
+        self.assertEqual(Movie.objects.filter(title='Fake Movie 5').count(), 2)
+
+    def test_resumes_from_checkpoint(self):
+        path = os.path.join(tempfile.mkdtemp(), 'import.json')
+        self.addCleanup(os.remove, path)
+        CatalogImport(self.tmdb, rate=0, checkpoint=Checkpoint(path)).run(pages=2)
+        self.assertEqual(Movie.objects.count(), 40)
+
+        requests_before = self.server.request_count
+        stats = CatalogImport(self.tmdb, rate=0, checkpoint=Checkpoint(path, resume=True)).run(pages=0)
+        self.assertEqual((stats['skipped_pages'], stats['created']), (2, 10))
+        # Only page 3 and its ten movies; page 1 is answered from the cache
+        self.assertEqual(self.server.request_count - requests_before, 11)
+
+    def test_rate_limiter_spaces_requests(self):
+        clock = FakeClock()
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock.now += seconds
+
+        limiter = RateLimiter(10, burst=2, clock=clock, sleep=sleep)
+        for _ in range(4):
+            limiter.acquire()
+        self.assertEqual(len(sleeps), 2)
+        self.assertAlmostEqual(clock.now, 0.2)
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        response_cache.get_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.theater = create_theater(rows=3, seats_per_row=4)
+        self.seats = list(Seat.objects.filter(theater=self.theater))
+        self.hit = create_showtime(self.theater, movie=Movie.objects.create(title='Hit', description='', duration=100))
+        self.flop = create_showtime(
+            self.theater, movie=Movie.objects.create(title='Flop', description='', duration=100),
+            show_time=timezone.now() + timedelta(days=2),
+        )
+
+    def book(self, showtime, count, offset=0, age=None):
+        reservation = reserve_seats(self.user, showtime, [seat.pk for seat in self.seats[offset:offset + count]])
+        if age is not None:
+            Reservation.objects.filter(pk=reservation.pk).update(created_at=timezone.now() - age)
+        return reservation
+
+    def trending_titles(self):
+        return [movie['title'] for movie in self.client.get('/movies/trending/').data]
+
+    def test_bookings_update_the_score_incrementally(self):
+        self.assertEqual(self.trending_titles(), [])
+        self.book(self.flop, 1)
+        reservation = self.book(self.hit, 3)
+        self.assertEqual(self.trending_titles(), ['Hit', 'Flop'])
+        release_seats(reservation)
+        self.book(self.flop, 1, offset=1)
+        self.assertEqual(self.trending_titles(), ['Flop'])
+
+    def test_refresh_decays_old_activity(self):
+        self.book(self.hit, 4, age=timedelta(days=6))   # two half-lives old: worth 1 seat
+        self.book(self.hit, 4, offset=4, age=timedelta(days=30))  # outside the window
+        self.book(self.flop, 2, offset=8)
+        self.assertEqual(rebuild_trending_scores(), 2)
+        scores = dict(Movie.objects.values_list('title', 'trending_score'))
+        self.assertAlmostEqual(scores['Hit'], 1, places=1)
+        self.assertAlmostEqual(scores['Flop'], 2, places=1)
+        self.assertEqual(self.trending_titles(), ['Flop', 'Hit'])
+
+    def test_ratings_count_towards_the_score(self):
+        Rating.objects.create(movie=self.flop.movie, user=self.user, rating=5)
+        rebuild_trending_scores()
+        self.flop.movie.refresh_from_db()
+        self.assertAlmostEqual(self.flop.movie.trending_score, 2)
+        self.client.force_authenticate(self.user)
+        self.client.post('/ratings/', {'movie': self.hit.movie_id, 'user': self.user.pk, 'rating': 5}, format='json')
+        self.book(self.hit, 1)
+        self.assertEqual(self.trending_titles(), ['Hit', 'Flop'])
+
+    def test_changing_an_old_rating_uses_its_decayed_points(self):
+        rating = Rating.objects.create(movie=self.hit.movie, user=self.user, rating=5)
+        # Two half-lives old: 5 stars are now worth 0.5 seats
+        Rating.objects.filter(pk=rating.pk).update(created_at=timezone.now() - timedelta(days=6))
+        rebuild_trending_scores()
+        self.client.force_authenticate(self.user)
+        self.client.post('/ratings/', {'movie': self.hit.movie_id, 'user': self.user.pk, 'rating': 1}, format='json')
+        live = Movie.objects.get(pk=self.hit.movie_id).trending_score
+        rebuild_trending_scores()
+        self.assertAlmostEqual(live, Movie.objects.get(pk=self.hit.movie_id).trending_score)
+        self.assertAlmostEqual(live, 0.1)
+
+        self.client.delete(f'/ratings/{rating.pk}/')
+        self.assertAlmostEqual(Movie.objects.get(pk=self.hit.movie_id).trending_score, 0)
+
+    def test_single_indexed_read(self):
+        self.book(self.hit, 2)
+        with self.assertNumQueries(1):
+            response = self.client.get('/movies/trending/', {'limit': 1})
+        self.assertEqual([movie['title'] for movie in response.data], ['Hit'])
+        self.assertEqual(self.client.get('/movies/trending/', {'limit': 'ten'}).status_code, 400)
+
+
+RESPONSE_TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'response-cache-tests'},
+    # A second worker's entries, next to the versions they share with the first
+    'worker_responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker-cache-tests'},
+    'response_versions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'response-versions-tests'},
+}
+
+
+@override_settings(CACHES=RESPONSE_TEST_CACHES)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        response_cache.get_cache().clear()
+        response_cache.get_version_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='alice', password='secret')
+        # Versions are bumped on commit, which TestCase only simulates
+        with self.captureOnCommitCallbacks(execute=True):
+            self.theater = create_theater()
+            self.movie = Movie.objects.create(title='Cached', description='', duration=100)
+            self.showtime = create_showtime(self.theater, movie=self.movie)
+        response_cache.stats.reset()
+
+    def test_repeat_requests_skip_the_database(self):
+        first = self.client.get('/showtimes/', {'movie_id': self.movie.pk})
+        with self.assertNumQueries(0):
+            second = self.client.get('/showtimes/', {'movie_id': self.movie.pk})
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(response_cache.stats.snapshot()['hit_rate'], 0.5)
+
+    def test_model_changes_invalidate(self):
+        self.client.get('/movies/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.movie.title = 'Renamed'
+            self.movie.save()
+            # Other connections can't see the change before the commit, so nothing is bumped yet
+            self.assertEqual(self.client.get('/movies/').json()[0]['title'], 'Cached')
+        self.assertEqual(self.client.get('/movies/').json()[0]['title'], 'Renamed')
+        # Showtimes nest the movie, so they're invalidated too
+        self.assertEqual(self.client.get('/showtimes/').json()[0]['movie']['title'], 'Renamed')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.theater.delete()
+        self.assertEqual(self.client.get('/showtimes/').json(), [])
+        self.assertEqual(self.client.get('/theaters/').json(), [])
+
+    def test_invalidation_reaches_other_workers(self):
+        self.client.get('/movies/')
+        with override_settings(RESPONSE_CACHE_ALIAS='worker_responses'), self.captureOnCommitCallbacks(execute=True):
+            Movie.objects.filter(pk=self.movie.pk).update(title='Renamed')
+            response_cache.invalidate(response_cache.MOVIES)
+        self.assertEqual(self.client.get('/movies/').json()[0]['title'], 'Renamed')
+
+    def test_one_version_bump_per_commit(self):
+        versions = response_cache.get_version_cache()
+        before = versions.get('response-version:trending', 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            response_cache.invalidate(response_cache.MOVIES)
+            response_cache.invalidate(response_cache.MOVIES, response_cache.TRENDING)
+            self.assertEqual(versions.get('response-version:trending', 0), before)
+        self.assertGreater(versions.get('response-version:trending'), before)
+        self.assertEqual(response_cache.stats.snapshot()['invalidations'], 1)
+
+    def test_savepoint_rollback_keeps_the_commit_bump(self):
+        versions = response_cache.get_version_cache()
+        before = versions.get('response-version:theaters', 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                response_cache.invalidate(response_cache.MOVIES)
+                raise IntegrityError
+            response_cache.invalidate(response_cache.THEATERS)
+        self.assertGreater(versions.get('response-version:theaters'), before)
+
+    def test_bookings_expire_instead_of_invalidating(self):
+        seats = list(Seat.objects.filter(theater=self.theater)[:2])
+        first = self.client.get('/showtimes/')
+        self.assertNotIn('Last-Modified', first)
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_seats(self.user, self.showtime, [seats[0].pk])
+        self.assertEqual(response_cache.stats.snapshot()['invalidations'], 0)
+        # Served until RESPONSE_CACHE_BOOKING_TTL runs out
+        self.assertEqual(self.client.get('/showtimes/')['ETag'], first['ETag'])
+
+        with override_settings(RESPONSE_CACHE_BOOKING_TTL=0):
+            self.client.get('/showtimes/', {'theater': self.theater.pk})
+            reserve_seats(self.user, self.showtime, [seats[1].pk])
+            self.assertEqual(self.client.get('/showtimes/', {'theater': self.theater.pk}).json()[0]['reserved_seat_count'], 2)
+
+    def test_ratings_invalidate(self):
+        self.client.get('/movies/')
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/ratings/', {'movie': self.movie.pk, 'user': self.user.pk, 'rating': 4}, format='json')
+        self.assertEqual(self.client.get('/movies/').json()[0]['average_rating'], 4)
+
+    def test_bulk_schedule_invalidates(self):
+        self.client.get('/showtimes/')
+        plan = plan_schedule([self.movie], [self.theater], timezone.localdate() + timedelta(days=5), 1, [datetime_time(10)], Decimal('10.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            create_schedule(plan)
+        self.assertEqual(len(self.client.get('/showtimes/').json()), 2)
+
+    def test_conditional_get(self):
+        first = self.client.get('/theaters/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/theaters/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/theaters/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Theater.objects.create(name='Hall 2', address='', rows=1, seats_per_row=1)
+        response = self.client.get('/theaters/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_stats_are_admin_only(self):
+        self.assertEqual(self.client.get('/cache_stats/').status_code, 401)
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='secret', is_staff=True))
+        self.client.get('/movies/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.movie.save()
+        response = self.client.get('/cache_stats/')
+        self.assertEqual(response.data['misses'], 1)
+        self.assertEqual(response.data['invalidations'], 1)
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN='')
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.client = APIClient()
+        movie = Movie.objects.create(title='Metrics', description='', duration=100)
+        create_showtime(create_theater(), movie=movie)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/showtimes/')
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(timing, r'serialize;dur=[\d.]+')
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+
+    def test_prometheus_endpoint(self):
+        self.client.get('/movies/')
+        self.client.get('/movies/')
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('http_requests_total{view="movie-list",method="GET",status="200"} 2', body)
+        self.assertIn('http_request_duration_seconds_count{view="movie-list"} 2', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="movie-list",le="+Inf"} 2', body)
+        self.assertIn('response_cache_lookups_total{outcome="hits"}', body)
+        self.assertRegex(body, r'http_response_bytes_total\{view="movie-list"\} [1-9]')
+
+    @override_settings(METRICS_TOKEN='scrape')
+    def test_prometheus_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape').status_code, 200)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0, METRICS_SLOW_QUERY_MS=0)
+    def test_slow_request_log(self):
+        with self.assertLogs('reservation.slow_requests', 'WARNING') as logs:
+            self.client.get('/showtimes/')
+        self.assertIn('Slow request: GET /showtimes/ (showtime-list)', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+        self.assertIn('File "', logs.output[0])
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled_by_default(self):
+        response = self.client.get('/movies/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+class SeedDataTests(TestCase):
+    def test_seeded_occupancy_matches_reservations(self):
+        counts = seed_database(movies=5, theaters=2, reservations=60, users=4, ratings=8, rows=3, seats_per_row=4)
+        self.assertEqual(counts['reservations'], 60)
+        self.assertEqual(Rating.objects.count(), 8)
+        for showtime in Showtime.objects.all():
+            taken = list(SeatBitmap.from_bytes(showtime.seat_occupancy, 3, 4).taken_positions())
+            booked = Seat.objects.filter(tickets__showtime=showtime).values_list('row_number', 'seat_number')
+            self.assertEqual(sorted(taken), sorted(booked))
+            self.assertEqual((showtime.capacity, showtime.seats_reserved), (12, len(taken)))
+
+    def test_compare_results(self):
+        baseline = {'api': [{'endpoint': 'catalog', 'requests_per_s': 100, 'relative_speed': 0.5, 'p50_ms': 5, 'p99_ms': 10, 'queries_per_request': 1}]}
+        # Absolute times depend on the machine, so only counts and relative speed are gated
+        self.assertEqual(compare_results(baseline, {'api': [
+            {'endpoint': 'catalog', 'requests_per_s': 40, 'relative_speed': 0.3, 'p50_ms': 9, 'p99_ms': 40, 'queries_per_request': 1},
+        ]}), [])
+        self.assertEqual(compare_results(baseline, {'api': [
+            {'endpoint': 'catalog', 'requests_per_s': 100, 'relative_speed': 0.2, 'p50_ms': 5, 'p99_ms': 10, 'queries_per_request': 2},
+        ]}), ['api catalog: relative_speed 0.5 -> 0.2', 'api catalog: queries_per_request 1 -> 2'])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked against SQLite')
+class QueryPlanTests(TestCase):
+    """EXPLAIN the hot lookups against a seeded database and fail on any full table scan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='alice')
+        cls.theater = create_theater(rows=5, seats_per_row=10)
+        seats = list(Seat.objects.filter(theater=cls.theater))
+        start = timezone.now() + timedelta(days=1)
+        for index in range(20):
+            movie = Movie.objects.create(
+                title=f'Movie {index}', description='', duration=100,
+                release_date=start.date() + timedelta(days=index),
+            )
+            showtime = Showtime.objects.create(movie=movie, theater=cls.theater, show_time=start + timedelta(hours=3 * index))
+            reservation = Reservation.objects.create(user=cls.user, showtime=showtime)
+            reservation.selected_seats.add(*seats[index:index + 2], through_defaults={'showtime': showtime, 'price': showtime.price})
+        cls.showtime = showtime
+        cls.movie = movie
+
+    def assertNoFullScan(self, queryset, ordered_index=None):
+        """Fail on any SCAN in the plan; tables are only to be SEARCHed.
+
+        An ordered LIMIT read walks an index from one end, which SQLite also
+        reports as SCAN, so ordered_index names the one index such a query
+        may walk.
+        """
+        plan = queryset.explain()
+        full_scans = [
+            line.strip() for line in plan.splitlines()
+            if re.search(r'\bSCAN\b', line)
+            and not (ordered_index and re.search(rf'\bUSING (COVERING )?INDEX {ordered_index}\b', line))
+        ]
+        self.assertEqual(full_scans, [], f'Full scan in plan:\n{plan}')
+
+    def test_theater_overlap_check(self):
+        self.assertNoFullScan(Showtime.objects.filter(
+            theater=self.theater,
+            show_time__lt=self.showtime.show_time + timedelta(hours=2),
+            show_time__gte=self.showtime.show_time - timedelta(hours=2),
+        ))
+
+    def test_available_showtimes(self):
+        self.assertNoFullScan(
+            Showtime.objects.annotate(seats_available=F('capacity') - F('seats_reserved'))
+            .filter(seats_available__gte=1).order_by('-seats_available', '-id')[:10]
+        )
+
+    def test_emptiest_showtimes_first(self):
+        # ?ordering=-seats_available without a filter reads the top of the index
+        self.assertNoFullScan(
+            Showtime.objects.annotate(seats_available=F('capacity') - F('seats_reserved'))
+            .order_by('-seats_available', '-id')[:10],
+            ordered_index='showtime_available_idx',
+        )
+        with self.assertRaises(AssertionError):
+            self.assertNoFullScan(Showtime.objects.order_by('-seats_reserved')[:10], ordered_index='showtime_available_idx')
+
+    def test_trending(self):
+        self.assertNoFullScan(Movie.objects.filter(trending_score__gt=0).order_by('-trending_score', 'id')[:10])
+
+    def test_schedule_conflict_check(self):
+        self.assertNoFullScan(conflicting_showtimes(
+            self.theater.pk, self.showtime.show_time, self.showtime.show_time + timedelta(hours=2),
+        ))
+
+    def test_showtimes_for_movie(self):
+        self.assertNoFullScan(Showtime.objects.select_related('movie', 'theater').filter(movie=self.movie).order_by('show_time'))
+
+    def test_coming_soon(self):
+        today = timezone.now().date()
+        self.assertNoFullScan(Movie.objects.filter(
+            release_date__gte=today, release_date__lte=today + timedelta(days=30),
+        ).order_by('release_date'))
+
+    def test_user_bookings(self):
+        self.assertNoFullScan(Reservation.objects.filter(user=self.user).order_by('-created_at', '-id'))
+
+    def test_active_reservations_for_showtime(self):
+        self.assertNoFullScan(Reservation.objects.filter(showtime=self.showtime, is_cancelled=False))
+
+    def test_occupancy_rebuild(self):
+        self.assertNoFullScan(Seat.objects.filter(
+            tickets__showtime=self.showtime, tickets__status=Ticket.Status.ACTIVE,
+        ).values_list('row_number', 'seat_number'))
+
+    def test_seat_conflict_check(self):
+        queryset = Ticket.objects.filter(showtime=self.showtime, seat__in=[1, 2], status=Ticket.Status.ACTIVE).values_list('seat_id')
+        self.assertNoFullScan(queryset)
+        self.assertIn('ticket_active_seat_uniq', queryset.explain())
+
+    def test_theater_seat_grid(self):
+        self.assertNoFullScan(Seat.objects.filter(theater=self.theater).order_by('row_number', 'seat_number'))
@@ -0,0 +1,118 @@
+import hashlib
+import threading
+from urllib.parse import urlencode
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+TMDB_IMAGE_BASE_URL = 'https://image.tmdb.org/t/p/w500'
+
+
+class TMDBError(Exception):
+    pass
+
+
+class TMDBClient:
+    """Small TMDB API client with a pooled session, retries and a persistent response cache.
+
+    Responses are cached in the 'tmdb' cache alias (file-based by default,
+    see CACHES in settings) keyed by path and query, so repeated lookups for
+    the same title never leave the process. The genre id -> name map is
+    fetched once and cached for much longer.
+    """
+
+    def __init__(self, api_key=None, base_url=None, timeout=None, cache_ttl=None, cache_alias='tmdb',
+                 retries=3, backoff=0.5, pool_size=10):
+        self.api_key = api_key or settings.TMDB_API_KEY
+        self.base_url = (base_url or settings.TMDB_BASE_URL).rstrip('/')
+        self.timeout = timeout or settings.TMDB_TIMEOUT
+        self.cache_ttl = cache_ttl if cache_ttl is not None else settings.TMDB_CACHE_TTL
+        self.cache = caches[cache_alias]
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _cache_key(self, path, params):
+        query = urlencode(sorted(params.items()))
+        return 'tmdb:' + hashlib.sha256(f'{self.base_url}{path}?{query}'.encode()).hexdigest()
+
+    def get(self, path, params=None, ttl=None):
+        """GET a TMDB path, serving it from the cache when possible"""
+        params = dict(params or {})
+        key = self._cache_key(path, params)
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+
+        try:
+            response = self.session.get(
+                f'{self.base_url}{path}',
+                params={**params, 'api_key': self.api_key},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise TMDBError(f'TMDB request to {path} failed: {e}') from e
+
+        self.cache.set(key, data, self.cache_ttl if ttl is None else ttl)
+        return data
+
+    def search_movie(self, title):
+        results = self.get('/search/movie', {'query': title}).get('results') or []
+        return results[0] if results else None
+
+    def movie_details(self, tmdb_id):
+        return self.get(f'/movie/{tmdb_id}', {'language': 'en-US'})
+
+    def popular(self, page=1):
+        return self.get('/movie/popular', {'language': 'en-US', 'page': page})
+
+    def genre_map(self):
+        data = self.get('/genre/movie/list', {'language': 'en-US'}, ttl=settings.TMDB_GENRE_CACHE_TTL)
+        return {genre['id']: genre['name'] for genre in data.get('genres', [])}
+
+    def genre_names(self, movie_data):
+        """Comma-separated genre names for a search result (genre_ids) or a details payload (genres)"""
+        if movie_data.get('genres'):
+            return ', '.join(genre['name'] for genre in movie_data['genres'])
+        genre_ids = movie_data.get('genre_ids') or []
+        if not genre_ids:
+            return ''
+        genres = self.genre_map()
+        return ', '.join(genres.get(genre_id, str(genre_id)) for genre_id in genre_ids)
+
+
+def poster_url(poster_path):
+    return f"{TMDB_IMAGE_BASE_URL}{poster_path}" if poster_path else None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Shared client, so every caller reuses the same connection pool"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TMDBClient()
+    return _client
+
+
+def reset_client():
+    global _client
+    with _client_lock:
+        _client = None
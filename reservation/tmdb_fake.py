@@ -0,0 +1,154 @@
+import json
+import random
+import re
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+GENRES = [
+    {'id': 28, 'name': 'Action'},
+    {'id': 12, 'name': 'Adventure'},
+    {'id': 16, 'name': 'Animation'},
+    {'id': 35, 'name': 'Comedy'},
+    {'id': 80, 'name': 'Crime'},
+    {'id': 18, 'name': 'Drama'},
+    {'id': 14, 'name': 'Fantasy'},
+    {'id': 27, 'name': 'Horror'},
+    {'id': 878, 'name': 'Science Fiction'},
+    {'id': 53, 'name': 'Thriller'},
+]
+
+PAGE_SIZE = 20
+
+
+def fake_catalog(size, seed=0):
+    """Deterministic list of TMDB-shaped movie detail payloads"""
+    rng = random.Random(seed)
+    first_release = date(2020, 1, 1)
+    movies = []
+    for index in range(size):
+        genres = rng.sample(GENRES, rng.randint(1, 3))
+        movies.append({
+            'id': 1000 + index,
+            'title': f'Fake Movie {index}',
+            'overview': f'Overview of fake movie {index}.',
+            'runtime': rng.randint(80, 180),
+            'release_date': (first_release + timedelta(days=rng.randint(0, 2500))).isoformat(),
+            'poster_path': f'/fake-{index}.jpg',
+            'vote_average': round(rng.uniform(3, 9), 1),
+            'genres': genres,
+        })
+    return movies
+
+
+def _summary(movie):
+    summary = {key: value for key, value in movie.items() if key not in ('genres', 'runtime')}
+    summary['genre_ids'] = [genre['id'] for genre in movie['genres']]
+    return summary
+
+
+class FakeTMDBServer:
+    """Local stand-in for the parts of the TMDB v3 API the app uses.
+
+    Serves /search/movie, /movie/popular, /movie/{id} and /genre/movie/list
+    from a generated catalog. It can add latency and fail the first N
+    requests with 503 so retry and caching behaviour can be tested and
+    benchmarked without network access.
+
+        with FakeTMDBServer(movies=500) as server:
+            client = TMDBClient(base_url=server.url)
+    """
+
+    def __init__(self, movies=100, host='127.0.0.1', port=0, latency=0.0, fail_first=0, seed=0):
+        self.catalog = fake_catalog(movies, seed=seed)
+        self.by_id = {movie['id']: movie for movie in self.catalog}
+        self.latency = latency
+        self.fail_remaining = fail_first
+        self.requests = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/3'
+
+    @property
+    def request_count(self):
+        with self._lock:
+            return len(self.requests)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def respond(self, path, query):
+        """Return (status, payload) for a request; also used directly by tests"""
+        with self._lock:
+            self.requests.append(path)
+            if self.fail_remaining > 0:
+                self.fail_remaining -= 1
+                return 503, {'status_message': 'Service unavailable (fake).'}
+        if self.latency:
+            time.sleep(self.latency)
+
+        if path == '/3/genre/movie/list':
+            return 200, {'genres': GENRES}
+        if path == '/3/search/movie':
+            needle = query.get('query', [''])[0].lower()
+            results = [_summary(movie) for movie in self.catalog if needle in movie['title'].lower()]
+            return 200, {'page': 1, 'results': results[:PAGE_SIZE], 'total_results': len(results), 'total_pages': 1}
+        if path == '/3/movie/popular':
+            page = int(query.get('page', ['1'])[0])
+            total_pages = max(1, -(-len(self.catalog) // PAGE_SIZE))
+            chunk = self.catalog[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+            return 200, {
+                'page': page,
+                'results': [_summary(movie) for movie in chunk],
+                'total_pages': total_pages,
+                'total_results': len(self.catalog),
+            }
+        match = re.fullmatch(r'/3/movie/(\d+)', path)
+        if match and int(match.group(1)) in self.by_id:
+            return 200, self.by_id[int(match.group(1))]
+        return 404, {'status_message': 'The resource you requested could not be found.'}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                status, payload = server.respond(url.path, parse_qs(url.query))
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,87 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import Movie, Rating, Reservation
+from .response_cache import TRENDING, invalidate
+
+
+def half_life():
+    """Age at which a booking or rating counts half as much as a new one"""
+    return timedelta(hours=getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 72))
+
+
+def window():
+    """Activity older than this no longer counts towards a movie's score"""
+    return timedelta(days=getattr(settings, 'TRENDING_WINDOW_DAYS', 14))
+
+
+def rating_points(stars):
+    """A five-star rating weighs as much as TRENDING_RATING_WEIGHT booked seats"""
+    return getattr(settings, 'TRENDING_RATING_WEIGHT', 2.0) * stars / 5
+
+
+def _hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def decay(then, now=None):
+    """Weight of activity at `then`, in whole hours so live updates and rebuilds agree"""
+    hours = (_hour(now or timezone.now()) - _hour(then)) // timedelta(hours=1)
+    return 0.5 ** (max(hours, 0) * timedelta(hours=1) / half_life())
+
+
+def record_booking(movie_id, seats, booked_at=None):
+    """Add (or, with negative seats, remove) booked seats to a movie's trending score.
+
+    New activity is added at full weight; the decay of older activity is
+    applied by rebuild_trending_scores, which refresh_trending runs
+    periodically, so the ranking is read straight from the index.
+    """
+    weight = decay(booked_at) if booked_at else 1
+    Movie.objects.filter(pk=movie_id).update(trending_score=F('trending_score') + seats * weight)
+
+
+def _hourly(queryset, value):
+    """(movie_id, hour, value) rows for activity inside the window, summed per hour"""
+    return (
+        queryset.filter(created_at__gte=timezone.now() - window())
+        .annotate(hour=TruncHour('created_at'))
+        .values('movie_id', 'hour')
+        .annotate(value=value)
+        .values_list('movie_id', 'hour', 'value')
+    )
+
+
+def compute_trending_scores(now=None):
+    """Time-decayed booking and rating activity per movie, from hourly rollups of the window"""
+    now = now or timezone.now()
+    scores = defaultdict(float)
+    bookings = _hourly(
+        Reservation.objects.filter(is_cancelled=False).annotate(movie_id=F('showtime__movie_id')),
+        Count('selected_seats'),
+    )
+    for movie_id, hour, seats in bookings:
+        scores[movie_id] += seats * decay(hour, now)
+    ratings = _hourly(Rating.objects.all(), Sum('rating'))
+    for movie_id, hour, stars in ratings:
+        scores[movie_id] += rating_points(stars) * decay(hour, now)
+    return scores
+
+
+def rebuild_trending_scores(now=None):
+    """Recompute every movie's trending score; returns the number of movies with a score"""
+    scores = compute_trending_scores(now)
+    movies = list(Movie.objects.filter(pk__in=scores).only('id', 'trending_score'))
+    for movie in movies:
+        movie.trending_score = round(scores[movie.pk], 6)
+    with transaction.atomic():
+        Movie.objects.exclude(pk__in=scores).exclude(trending_score=0).update(trending_score=0)
+        Movie.objects.bulk_update(movies, ['trending_score'], batch_size=1000)
+        invalidate(TRENDING)
+    return len(movies)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import MovieViewSet, ShowtimeViewSet, ReservationViewSet, TheaterViewSet, SeatViewSet, RatingViewSet
+from .views import MovieViewSet, ShowtimeViewSet, ReservationViewSet, TheaterViewSet, SeatViewSet, RatingViewSet, seat_events_view
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -15,6 +15,7 @@ router.register(r'seats', SeatViewSet)
 router.register(r'ratings', RatingViewSet)
 
 urlpatterns = [
+    path('showtimes/<int:pk>/events/', seat_events_view, name='showtime-events'),
     path('', include(router.urls)),
     
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -1,19 +1,82 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser, DjangoModelPermissionsOrAnonReadOnly
 from .models import Movie, Showtime, Reservation, Seat, Theater, Rating
-from .serializers import MovieSerializer, ShowtimeSerializer, ReservationSerializer, UserSerializer, TheaterSerializer, SeatSerializer, RatingSerializer
+from .serializers import MovieSerializer, ShowtimeSerializer, ReservationSerializer, UserSerializer, TheaterSerializer, SeatSerializer, RatingSerializer, SeatHoldSerializer, ScheduleTemplateSerializer, ScheduleSlotSerializer
 from django.db import transaction
-from django.db.models import Sum, Q
-from datetime import timedelta
-
-from .utils import fetch_movie_details_from_tmdb, generate_qr_code_for_reservation
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.db.models import F, Sum, Q
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
+import json
+
+from .utils import fetch_movie_details_from_tmdb
+from .booking import BookingError, cancel_reservation, cancel_showtime_reservations, hold_seats, reserved_seat_ids
+from .events import get_broker
+from .holds import hold_store
+from .scheduling import ScheduleConflict, check_showtime, create_schedule, plan_schedule, refresh_end_times
+from .seatmap import build_seatmap, seatmap_etag
+from .qrcodes import CONTENT_TYPES, check_qr_signature, qr_etag, render_qr
+from .provisioning import ProvisioningError, provision_seats, rebuild_theater_occupancy, refresh_capacity, remove_seat
+from .pagination import OptionalCursorPagination, parse_bound, parse_date_param, requested_ordering
+from .ratings import delete_rating, save_rating
+from .stats import GROUPINGS, sales_by, sales_totals
+from . import metrics, response_cache
+from .response_cache import MOVIES, SHOWTIMES, THEATERS, TRENDING, cached_response
+
+def showtime_queryset():
+    """Showtimes with everything ShowtimeSerializer reads loaded in a fixed number of queries"""
+    return Showtime.objects.select_related('movie', 'theater')
+
+def set_tmdb_id(serializer, tmdb_data, instance=None):
+    """Link the movie to its TMDB entry so catalog imports update it instead of adding a copy"""
+    tmdb_id = tmdb_data.get('tmdb_id')
+    others = Movie.objects.filter(tmdb_id=tmdb_id)
+    if instance is not None:
+        others = others.exclude(pk=instance.pk)
+    # tmdb_id is unique; leave it unset rather than fail if another movie already has it
+    if tmdb_id and not others.exists():
+        serializer.validated_data['tmdb_id'] = tmdb_id
 
 class MovieViewSet(viewsets.ModelViewSet):
     queryset = Movie.objects.all()
     serializer_class = MovieSerializer
     permission_classes = [AllowAny]  # Allow all read access
+    pagination_class = OptionalCursorPagination
+    ordering_options = {
+        'id': ('id',),
+        'title': ('title', 'id'),
+        '-title': ('-title', '-id'),
+        'release_date': ('release_date', 'id'),
+        '-release_date': ('-release_date', '-id'),
+    }
+    default_ordering = 'id'
+
+    def get_queryset(self):
+        queryset = Movie.objects.all()
+        genre = self.request.query_params.get('genre', None)
+        if genre:
+            queryset = queryset.filter(genres__icontains=genre)
+        released_after = parse_date_param(self.request, 'released_after')
+        if released_after:
+            queryset = queryset.filter(release_date__gte=released_after)
+        released_before = parse_date_param(self.request, 'released_before')
+        if released_before:
+            queryset = queryset.filter(release_date__lte=released_before)
+
+        ordering = requested_ordering(self.request, self)
+        if ordering[0].lstrip('-') == 'release_date' and self.paginator.wants_page(self.request):
+            # Cursors can't point at a NULL release date; plain lists keep those movies
+            queryset = queryset.filter(release_date__isnull=False)
+        return queryset.order_by(*ordering)
+
+    @cached_response(MOVIES)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -27,6 +90,7 @@ class MovieViewSet(viewsets.ModelViewSet):
                 serializer.validated_data['poster_path'] = tmdb_data.get('poster_path', serializer.validated_data.get('poster_path'))
                 serializer.validated_data['release_date'] = tmdb_data.get('release_date', serializer.validated_data.get('release_date'))
                 serializer.validated_data['genres'] = tmdb_data.get('genres', serializer.validated_data.get('genres'))
+                set_tmdb_id(serializer, tmdb_data, instance=serializer.instance)
 
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
@@ -38,16 +102,21 @@ class MovieViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
 
+        # Only look the movie up again when its title changed
         movie_title = serializer.validated_data.get('title', instance.title)
-        if movie_title:
+        if movie_title and movie_title != instance.title:
             tmdb_data = fetch_movie_details_from_tmdb(movie_title)
             if tmdb_data:
                 serializer.validated_data['description'] = tmdb_data.get('description', serializer.validated_data.get('description'))
                 serializer.validated_data['poster_path'] = tmdb_data.get('poster_path', serializer.validated_data.get('poster_path'))
                 serializer.validated_data['release_date'] = tmdb_data.get('release_date', serializer.validated_data.get('release_date'))
                 serializer.validated_data['genres'] = tmdb_data.get('genres', serializer.validated_data.get('genres'))
+                set_tmdb_id(serializer, tmdb_data, instance=serializer.instance)
 
+        old_duration = instance.duration
         self.perform_update(serializer)
+        if serializer.instance.duration != old_duration:
+            refresh_end_times(serializer.instance)
 
         if getattr(instance, '_prefetched_objects_cache', None):
             instance._prefetched_objects_cache = {}
@@ -62,6 +131,7 @@ class MovieViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    @cached_response(MOVIES)
     def coming_soon(self, request):
         """Get movies that are coming soon"""
         from django.utils import timezone
@@ -69,7 +139,7 @@ class MovieViewSet(viewsets.ModelViewSet):
         
         # Get movies with release dates in the future or within the next 30 days
         future_date = timezone.now().date() + timedelta(days=30)
-        coming_soon_movies = Movie.objects.filter(
+        coming_soon_movies = self.get_queryset().filter(
             release_date__gte=timezone.now().date(),
             release_date__lte=future_date
         ).order_by('release_date')
@@ -77,77 +147,229 @@ class MovieViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(coming_soon_movies, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    @cached_response(TRENDING, MOVIES, follows_bookings=True)
+    def trending(self, request):
+        """Movies with the most recent booking and rating activity (?limit=, default 10, at most 50)"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({'detail': 'limit must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+        # Scores are precomputed, so this reads the top of movie_trending_idx
+        movies = Movie.objects.filter(trending_score__gt=0).order_by('-trending_score', 'id')[:limit]
+        serializer = self.get_serializer(movies, many=True)
+        return Response(serializer.data)
+
 class TheaterViewSet(viewsets.ModelViewSet):
     queryset = Theater.objects.all()
     serializer_class = TheaterSerializer
-    permission_classes = [AllowAny]  # Allow all read access
+
+    def get_permissions(self):
+        # Anyone may read; writes provision seat rows, so they are admin only
+        if self.action in ('list', 'retrieve'):
+            return [AllowAny()]
+        return [IsAdminUser()]
+
+    @cached_response(THEATERS)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            theater = serializer.save()
+            provision_seats(theater)
+
+    def perform_update(self, serializer):
+        old_grid = (serializer.instance.rows, serializer.instance.seats_per_row)
+        try:
+            with transaction.atomic():
+                theater = serializer.save()
+                if (theater.rows, theater.seats_per_row) != old_grid:
+                    provision_seats(theater)
+                    rebuild_theater_occupancy(theater)
+        except ProvisioningError as e:
+            raise ValidationError({'detail': str(e)})
 
 class SeatViewSet(viewsets.ModelViewSet):
     queryset = Seat.objects.all()
     serializer_class = SeatSerializer
-    permission_classes = [AllowAny]  # Allow all read access
+    pagination_class = OptionalCursorPagination
+    # With ?theater= this walks the (theater, row_number, seat_number) unique index
+    ordering_options = {
+        'grid': ('row_number', 'seat_number'),
+        'id': ('id',),
+    }
+    default_ordering = 'grid'
+
+    def get_permissions(self):
+        # Anyone may read; writes change every showtime's capacity, so they are admin only
+        if self.action in ('list', 'retrieve'):
+            return [AllowAny()]
+        return [IsAdminUser()]
     
     def get_queryset(self):
         queryset = Seat.objects.all()
         theater_id = self.request.query_params.get('theater', None)
         if theater_id is not None:
             queryset = queryset.filter(theater_id=theater_id)
-        return queryset
+        return queryset.order_by(*requested_ordering(self.request, self))
+
+    # Showtimes store their theater's seat count
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            seat = serializer.save()
+            refresh_capacity(seat.theater)
+
+    def perform_destroy(self, instance):
+        try:
+            remove_seat(instance)
+        except ProvisioningError as e:
+            raise ValidationError({'detail': str(e)})
 
 class ShowtimeViewSet(viewsets.ModelViewSet):
     queryset = Showtime.objects.all()
     serializer_class = ShowtimeSerializer
     permission_classes = [AllowAny]  # Allow all read access
+    pagination_class = OptionalCursorPagination
+    ordering_options = {
+        'id': ('id',),
+        'show_time': ('show_time', 'id'),
+        '-show_time': ('-show_time', '-id'),
+        # Both walk showtime_available_idx
+        'seats_available': ('seats_available', 'id'),
+        '-seats_available': ('-seats_available', '-id'),
+    }
+    default_ordering = 'id'
+
+    def get_permissions(self):
+        # Scheduling and deleting showtimes (which cancels their bookings) are admin only
+        if self.action in ('create', 'update', 'partial_update', 'destroy'):
+            return [IsAdminUser()]
+        return super().get_permissions()
     
     def get_queryset(self):
-        queryset = Showtime.objects.all()
+        # Same expression as showtime_available_idx, so filters and ordering on it use the index
+        queryset = showtime_queryset().annotate(seats_available=F('capacity') - F('seats_reserved'))
         movie_id = self.request.query_params.get('movie_id', None)
         if movie_id is not None:
             queryset = queryset.filter(movie_id=movie_id)
-        return queryset
+        theater_id = self.request.query_params.get('theater', None)
+        if theater_id is not None:
+            queryset = queryset.filter(theater_id=theater_id)
+        date_from = parse_bound(self.request, 'date_from')
+        if date_from:
+            queryset = queryset.filter(show_time__gte=date_from)
+        date_to = parse_bound(self.request, 'date_to', end=True)
+        if date_to:
+            queryset = queryset.filter(show_time__lt=date_to)
+        min_seats = self.request.query_params.get('min_seats')
+        if self.request.query_params.get('available') in ('1', 'true'):
+            min_seats = min_seats or 1
+        if min_seats is not None:
+            try:
+                min_seats = int(min_seats)
+            except ValueError:
+                raise ValidationError({'min_seats': 'Must be a number.'})
+            queryset = queryset.filter(seats_available__gte=min_seats)
+        return queryset.order_by(*requested_ordering(self.request, self))
+
+    # Showtimes nest their movie and theater
+    @cached_response(SHOWTIMES, MOVIES, THEATERS, follows_bookings=True)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        show_time = serializer.validated_data.get('show_time')
-        movie = serializer.validated_data.get('movie')
-        theater = serializer.validated_data.get('theater')
-
-        end_time = show_time + timedelta(minutes=movie.duration)
-
-        conflicting_showtimes = Showtime.objects.filter(
-            theater=theater,
-            show_time__lt=end_time,
-            show_time__gte=show_time - timedelta(minutes=movie.duration)
-        ).exclude(pk=getattr(serializer.instance, 'pk', None))
-
-        if conflicting_showtimes.exists():
-            raise serializers.ValidationError("Showtime conflicts with an existing showtime in this theater.")
-
-        serializer.save()
+        self._schedule(serializer)
 
     def perform_update(self, serializer):
-        show_time = serializer.validated_data.get('show_time', serializer.instance.show_time)
-        movie = serializer.validated_data.get('movie', serializer.instance.movie)
-        theater = serializer.validated_data.get('theater', serializer.instance.theater)
+        self._schedule(serializer)
 
-        end_time = show_time + timedelta(minutes=movie.duration)
+    def _schedule(self, serializer):
+        instance = serializer.instance
+        data = serializer.validated_data
+        show_time = data.get('show_time', getattr(instance, 'show_time', None))
+        movie = data.get('movie', getattr(instance, 'movie', None))
+        theater = data.get('theater', getattr(instance, 'theater', None))
 
-        conflicting_showtimes = Showtime.objects.filter(
-            theater=theater,
-            show_time__lt=end_time,
-            show_time__gte=show_time - timedelta(minutes=movie.duration)
-        ).exclude(pk=getattr(serializer.instance, 'pk', None))
-
-        if conflicting_showtimes.exists():
-            raise serializers.ValidationError("Showtime conflicts with an existing showtime in this theater.")
-
-        serializer.save()
+        with transaction.atomic():
+            # Serialize scheduling per theater where the database supports row locks
+            Theater.objects.select_for_update().filter(pk=theater.pk).first()
+            try:
+                check_showtime(theater.pk, movie, show_time, exclude_pk=getattr(instance, 'pk', None))
+            except ScheduleConflict as e:
+                raise ValidationError({'detail': str(e)})
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        # Cancel first so seat events, sales and trending scores drop the bookings
+        with transaction.atomic():
+            cancel_showtime_reservations(instance)
+            instance.delete()
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        """Generate a schedule from a template and insert it in one transaction, reporting every slot"""
+        template = ScheduleTemplateSerializer(data=request.data)
+        template.is_valid(raise_exception=True)
+        data = template.validated_data
+        plan = plan_schedule(
+            data['movies'], data['theaters'], data['start_date'], data['days'],
+            data['slot_times'], data['price'], data['price_rules'],
+        )
+        if not data['dry_run']:
+            create_schedule(plan)
+        counts = {status_name: sum(1 for entry in plan if entry['status'] == status_name) for status_name in ('created', 'planned', 'skipped')}
+        return Response(
+            {**counts, 'slots': ScheduleSlotSerializer(plan, many=True).data},
+            status=status.HTTP_200_OK if data['dry_run'] else status.HTTP_201_CREATED,
+        )
 
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def reserved_seats(self, request, pk=None):
         """Get reserved seats for a showtime - accessible to everyone"""
         showtime = self.get_object()
-        reserved_seat_ids = Seat.objects.filter(reservation__showtime=showtime).values_list('id', flat=True).distinct()
-        return Response(list(reserved_seat_ids))
+        return Response(reserved_seat_ids(showtime))
+
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def seatmap(self, request, pk=None):
+        """Seat grid, taken and held seats for the booking page in one response - accessible to everyone"""
+        showtime = self.get_object()
+        held_ids = hold_store.held_seat_ids(showtime.pk)
+        etag = seatmap_etag(showtime, held_ids)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = Response(build_seatmap(showtime, held_ids))
+        # Seat maps change with every booking, so clients revalidate each time
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    @action(detail=True, methods=['get', 'post'], permission_classes=[AllowAny])
+    def holds(self, request, pk=None):
+        """List held seat ids (GET) or place a temporary hold on seats (POST)"""
+        showtime = self.get_object()
+        if request.method == 'GET':
+            return Response(hold_store.held_seat_ids(showtime.pk))
+
+        if not request.user.is_authenticated:
+            self.permission_denied(request)
+        serializer = SeatHoldSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            hold = hold_seats(request.user, showtime, serializer.validated_data['seat_ids'])
+        except BookingError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(SeatHoldSerializer(hold).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['delete'], url_path=r'holds/(?P<token>[^/.]+)', permission_classes=[IsAuthenticated])
+    def release_hold(self, request, pk=None, token=None):
+        """Release one of the current user's seat holds"""
+        hold = hold_store.get(token)
+        if hold is None or str(hold.showtime_id) != pk or hold.user_id != request.user.pk:
+            return Response({'detail': 'Hold not found.'}, status=status.HTTP_404_NOT_FOUND)
+        hold_store.release(token)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 class ReservationViewSet(viewsets.ModelViewSet):
     queryset = Reservation.objects.all()
@@ -155,7 +377,9 @@ class ReservationViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Reservation.objects.filter(user=self.request.user)
+        return Reservation.objects.filter(user=self.request.user).order_by('-created_at', '-id').select_related(
+            'showtime__movie', 'showtime__theater'
+        ).prefetch_related('selected_seats')
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -167,25 +391,63 @@ class ReservationViewSet(viewsets.ModelViewSet):
         if not showtime_obj or not selected_seat_ids:
             return Response({'detail': 'Showtime and selected seats are required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        with transaction.atomic():
-            already_reserved_seats = Reservation.objects.filter(
-                showtime=showtime_obj,
-                selected_seats__id__in=selected_seat_ids
-            ).exists()
-
-            if already_reserved_seats:
-                return Response({'detail': 'One or more selected seats are already reserved.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            reservation = serializer.save(user=request.user)
+        except BookingError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            seats_to_reserve = Seat.objects.filter(id__in=selected_seat_ids)
-            if len(seats_to_reserve) != len(selected_seat_ids):
-                return Response({'detail': 'One or more selected seat IDs are invalid.'}, status=status.HTTP_400_BAD_REQUEST)
+        # Read back with its seats, showtime, movie and theater loaded, and serialize it once
+        data = self.get_serializer(self.get_queryset().get(pk=reservation.pk)).data
+        return Response(data, status=status.HTTP_201_CREATED, headers=self.get_success_headers(data))
 
-            # Use the serializer's create method which handles QR code generation
-            serializer.validated_data['user'] = request.user
-            reservation = serializer.save(user=request.user)
+    def perform_destroy(self, instance):
+        # Deleting follows the cancellation rules, so past bookings stay in the sales history
+        try:
+            with transaction.atomic():
+                if not instance.is_cancelled:
+                    cancel_reservation(instance)
+                instance.delete()
+        except BookingError as e:
+            raise ValidationError({'detail': str(e)})
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel one of the current user's reservations and free its seats"""
+        reservation = self.get_object()
+        try:
+            cancel_reservation(reservation)
+        except BookingError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(ReservationSerializer(reservation, context={'request': request}).data)
 
-            headers = self.get_success_headers(serializer.data)
-            return Response(ReservationSerializer(reservation, context={'request': request}).data, status=status.HTTP_201_CREATED, headers=headers)
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def qr(self, request, pk=None):
+        """Ticket QR code as ?type=png (default) or ?type=svg.
+
+        Allowed for the reservation's owner, or anyone holding the signed
+        link from qr_code_url so that plain <img> tags work.
+        """
+        image_type = request.query_params.get('type', 'png')
+        if image_type not in CONTENT_TYPES:
+            return Response({'detail': f"type must be one of: {', '.join(CONTENT_TYPES)}."}, status=status.HTTP_400_BAD_REQUEST)
+        reservation = Reservation.objects.filter(pk=pk).only('user_id', 'booking_reference').first()
+        if reservation is None or not reservation.booking_reference:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        is_owner = request.user.is_authenticated and request.user.pk == reservation.user_id
+        signed = check_qr_signature(reservation.booking_reference, request.query_params.get('sig'))
+        if not is_owner and not signed:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        etag = qr_etag(reservation.booking_reference, image_type)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(render_qr(reservation.booking_reference, image_type), content_type=CONTENT_TYPES[image_type])
+        # The image only depends on the booking reference, so it never changes.
+        # Signed URLs can be shared by proxies; the unsigned owner URL must not be.
+        response['ETag'] = etag
+        response['Cache-Control'] = f"{'public' if signed else 'private'}, max-age=31536000, immutable"
+        return response
 
 class RatingViewSet(viewsets.ModelViewSet):
     queryset = Rating.objects.all()
@@ -200,21 +462,27 @@ class RatingViewSet(viewsets.ModelViewSet):
         if not movie_id or not user_id or rating_value is None:
             return Response({'detail': 'Movie, user, and rating are required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            rating_instance = Rating.objects.get(movie_id=movie_id, user_id=user_id)
-            rating_instance.rating = rating_value
-            rating_instance.save()
-            serializer = self.get_serializer(rating_instance)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Rating.DoesNotExist:
-            serializer = self.get_serializer(data=request.data)
+        rating_instance = Rating.objects.filter(movie_id=movie_id, user_id=user_id).first()
+        if rating_instance is not None:
+            serializer = self.get_serializer(rating_instance, data={'rating': rating_value}, partial=True)
             serializer.is_valid(raise_exception=True)
-            self.perform_create(serializer)
-            headers = self.get_success_headers(serializer.data)
-            return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
-        except Exception as e:
-            return Response({'detail': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            self.perform_update(serializer)
+            return Response(serializer.data, status=status.HTTP_200_OK)
 
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def perform_create(self, serializer):
+        save_rating(serializer)
+
+    def perform_update(self, serializer):
+        save_rating(serializer)
+
+    def perform_destroy(self, instance):
+        delete_rating(instance)
 
 
 @api_view(['GET'])
@@ -228,17 +496,90 @@ def is_admin_view(request):
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def total_seats_booked_view(request):
-    total_booked_seats = 0
-    for reservation in Reservation.objects.all():
-        total_booked_seats += reservation.selected_seats.count()
+    total_booked_seats, _ = sales_totals()
     return Response({'total_seats_booked': total_booked_seats})
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def total_revenue_view(request):
-    total_revenue = 0
-    for reservation in Reservation.objects.all():
-        if reservation.showtime and reservation.showtime.price is not None:
-            total_revenue += reservation.showtime.price * reservation.selected_seats.count()
+    _, total_revenue = sales_totals()
     return Response({'total_revenue': total_revenue})
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def sales_stats_view(request):
+    """Seats sold and revenue grouped by ?group_by=showtime|movie|theater|day.
+
+    Served from the daily rollup; pass ?live=true to aggregate the reservation tables instead.
+    """
+    group_by = request.query_params.get('group_by', 'movie')
+    if group_by not in GROUPINGS:
+        return Response({'detail': f"group_by must be one of: {', '.join(GROUPINGS)}."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        date_from = parse_date(request.query_params.get('date_from', '') or '') or None
+        date_to = parse_date(request.query_params.get('date_to', '') or '') or None
+    except ValueError:
+        return Response({'detail': 'Dates must be in YYYY-MM-DD format.'}, status=status.HTTP_400_BAD_REQUEST)
+    live = request.query_params.get('live', '').lower() in ('1', 'true', 'yes')
+
+    total_booked_seats, total_revenue = sales_totals()
+    return Response({
+        'group_by': group_by,
+        'total_seats_booked': total_booked_seats,
+        'total_revenue': total_revenue,
+        'results': sales_by(group_by, live=live, date_from=date_from, date_to=date_to),
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def response_cache_stats_view(request):
+    """Hit and miss counts of the catalog response cache in this process"""
+    return Response(response_cache.stats.snapshot())
+
+
+def metrics_view(request):
+    """Request metrics of this process in the Prometheus text format.
+
+    Plain Django view so scrapers don't need a JWT; protected by
+    METRICS_TOKEN when it is set.
+    """
+    if not settings.METRICS_ENABLED:
+        return HttpResponse(status=404)
+    if settings.METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {settings.METRICS_TOKEN}':
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+async def seat_events_view(request, pk):
+    """Server-sent events with seat changes for one showtime.
+
+    Each message is a JSON delta: reserved, released, held and
+    hold_released carry seat_ids; resync means the client should fetch
+    the seat map again. Plain Django async view, since it must hold the
+    connection open without tying up a worker thread.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'Seat events are only served by the ASGI application.'}, status=501)
+    if not await Showtime.objects.filter(pk=pk).aexists():
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    heartbeat = getattr(settings, 'SEAT_EVENTS_HEARTBEAT_SECONDS', 15)
+
+    async def stream():
+        subscription = get_broker().subscribe(pk)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                event = await subscription.get(timeout=heartbeat)
+                if event is None:
+                    # Lets expired holds be announced even when nothing else touches the store
+                    hold_store.sweep()
+                    yield ': keepalive\n\n'
+                else:
+                    yield f'data: {json.dumps(event)}\n\n'
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response